@@ -12,9 +12,10 @@ from alembic import context
 # this is the Alembic Config object, which provides access to the values within the .ini file
 config = context.config
 
-# Interpret the config file for Python logging.
-if config.config_file_name:
-    fileConfig(config.config_file_name)
+# Interpret the config file for Python logging. CI sets ALEMBIC_SKIP_LOG_CONFIG
+# to skip re-parsing the ini logging sections on every invocation.
+if config.config_file_name and not os.environ.get("ALEMBIC_SKIP_LOG_CONFIG"):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
 logger = logging.getLogger("alembic.env")
 
 # ensure project root is on path so we can import app
@@ -22,26 +23,88 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-# Import models' MetaData for 'autogenerate' support
-try:
-    from app.models import Base  # noqa: E402
-    from app.config import settings  # noqa: E402
-
-    target_metadata = Base.metadata
-
-    # Use DATABASE_URL from settings if not provided in config
-    if not config.get_main_option("sqlalchemy.url"):
-        config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
-
-except Exception as exc:  # pragma: no cover - runtime environment
-    logger.exception("Failed importing app.models for alembic autogenerate: %s", exc)
-    target_metadata = None
+# Commands that only read the version table and never look at model metadata
+_METADATA_FREE_COMMANDS = frozenset({"current", "heads", "history", "show", "stamp"})
+
+
+def _resolve_database_url() -> str | None:
+    """Resolve the database URL once for this run.
+
+    An explicit DATABASE_URL in the environment wins in app.config as well, so
+    read it directly and only import ``app.config`` (which loads the whole
+    ``app`` package) when falling back to .env or the default.
+    """
+    url = os.environ.get("DATABASE_URL")
+    if url:
+        return url
+    try:
+        from app.config import settings  # noqa: E402
+    except Exception as exc:  # pragma: no cover - runtime environment
+        logger.exception("Failed importing app.config for alembic: %s", exc)
+        return None
+    return str(settings.DATABASE_URL)
+
+
+# scripts/run_alembic.sh and run_migrations.sh write the target URL into the
+# [alembic:runtime] section of a temporary ini
+if not config.get_main_option("sqlalchemy.url"):
+    _runtime_url = config.get_section_option("alembic:runtime", "sqlalchemy.url")
+    if _runtime_url:
+        config.set_main_option("sqlalchemy.url", _runtime_url)
+
+# Use DATABASE_URL from settings if not provided in config
+if not config.get_main_option("sqlalchemy.url"):
+    _DB_URL = _resolve_database_url()
+    if _DB_URL:
+        config.set_main_option("sqlalchemy.url", _DB_URL)
+
+
+def _get_target_metadata():
+    """Import the models' MetaData for 'autogenerate' support, only when needed.
+
+    Pulling in ``app.models`` loads the whole ORM tree, which read-only
+    commands such as ``alembic current`` never use.
+    """
+    cmd_opts = getattr(config, "cmd_opts", None)
+    cmd = getattr(cmd_opts, "cmd", None)
+    if cmd and cmd[0].__name__ in _METADATA_FREE_COMMANDS:
+        return None
+    try:
+        from app.models import Base  # noqa: E402
+    except Exception as exc:  # pragma: no cover - runtime environment
+        logger.exception(
+            "Failed importing app.models for alembic autogenerate: %s", exc
+        )
+        return None
+    return Base.metadata
+
+
+def _tune_sqlite(connection) -> None:
+    """Let SQLite commit the migration DDL with as few journal syncs as possible.
+
+    SQLite refuses to change these settings inside a transaction, so they are
+    applied on the bare connection before Alembic opens one.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+    connection.exec_driver_sql("PRAGMA synchronous=NORMAL")
+    connection.exec_driver_sql("PRAGMA temp_store=MEMORY")
+    # 128 MiB page cache and a 256 MiB memory map keep the migration's working
+    # set resident instead of going through the pager for every re-read
+    connection.exec_driver_sql("PRAGMA cache_size=-131072")
+    connection.exec_driver_sql("PRAGMA mmap_size=268435456")
 
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
     url = config.get_main_option("sqlalchemy.url")
-    context.configure(url=url, target_metadata=target_metadata, literal_binds=True)
+    context.configure(
+        url=url,
+        target_metadata=_get_target_metadata(),
+        literal_binds=True,
+        transaction_per_migration=True,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
@@ -56,7 +119,17 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        _tune_sqlite(connection)
+        # Close the implicit transaction opened by the pragmas above so Alembic
+        # owns (and commits) the migration transactions itself.
+        connection.commit()
+        # One transaction per revision, so a failure only rolls back the
+        # revision at fault
+        context.configure(
+            connection=connection,
+            target_metadata=_get_target_metadata(),
+            transaction_per_migration=True,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
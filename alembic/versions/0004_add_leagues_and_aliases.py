@@ -5,6 +5,8 @@ Revises: 0003_add_player_fields
 Create Date: 2025-09-20 12:40:00.000000
 """
 
+from contextlib import contextmanager
+
 import sqlalchemy as sa
 
 from alembic import op
@@ -16,12 +18,31 @@ branch_labels = None
 depends_on = None
 
 
+@contextmanager
+def _sqlite_fk_deferred(conn, table):
+    """Skip per-row FK checks while SQLite copies a table, verify once after.
+
+    The pragma is not restored: SQLite ignores it once the copy has opened a
+    transaction, and env.py drops the connection when the command ends.
+    """
+    if conn.dialect.name != "sqlite":
+        yield
+        return
+    conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+    yield
+    # only the rebuilt table: unrelated legacy violations must not stop the upgrade
+    violations = conn.exec_driver_sql(f"PRAGMA foreign_key_check({table})").fetchall()
+    if violations:
+        raise RuntimeError(f"foreign key violations after rebuild: {violations}")
+
+
 def upgrade():
     conn = op.get_bind()
     inspector = sa.inspect(conn)
+    existing = set(inspector.get_table_names())
 
     # Create leagues table if it doesn't exist
-    if "leagues" not in inspector.get_table_names():
+    if "leagues" not in existing:
         op.create_table(
             "leagues",
             sa.Column("id", sa.Integer(), primary_key=True),
@@ -29,17 +50,19 @@ def upgrade():
             sa.Column("name", sa.String(length=128), nullable=False),
         )
 
-    # Add league_id to teams (nullable initially) using batch for SQLite if column missing
+    # Add league_id to teams (nullable initially) using batch for SQLite if column missing.
+    # Column and FK share one batch block so SQLite copies the table only once.
     team_cols = [c["name"] for c in inspector.get_columns("teams")]
     if "league_id" not in team_cols:
-        with op.batch_alter_table("teams", schema=None) as batch_op:
-            batch_op.add_column(sa.Column("league_id", sa.Integer(), nullable=True))
-            batch_op.create_foreign_key(
-                "fk_teams_league", "leagues", ["league_id"], ["id"]
-            )
+        with _sqlite_fk_deferred(conn, "teams"):
+            with op.batch_alter_table("teams", schema=None) as batch_op:
+                batch_op.add_column(sa.Column("league_id", sa.Integer(), nullable=True))
+                batch_op.create_foreign_key(
+                    "fk_teams_league", "leagues", ["league_id"], ["id"]
+                )
 
     # Create team_aliases table if missing
-    if "team_aliases" not in inspector.get_table_names():
+    if "team_aliases" not in existing:
         op.create_table(
             "team_aliases",
             sa.Column("id", sa.Integer(), primary_key=True),
@@ -52,6 +75,7 @@ def upgrade():
 
 def downgrade():
     op.drop_table("team_aliases")
-    op.drop_constraint("fk_teams_league", "teams", type_="foreignkey")
-    op.drop_column("teams", "league_id")
+    with op.batch_alter_table("teams", schema=None) as batch_op:
+        batch_op.drop_constraint("fk_teams_league", type_="foreignkey")
+        batch_op.drop_column("league_id")
     op.drop_table("leagues")
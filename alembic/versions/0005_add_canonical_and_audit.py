@@ -16,25 +16,15 @@ branch_labels = None
 depends_on = None
 
 
-def table_exists(tablename):
-    conn = op.get_bind()
-    # Check database type and use appropriate query
-    if conn.dialect.name == 'postgresql':
-        res = conn.execute(
-            sa.text("SELECT tablename FROM pg_tables WHERE schemaname='public' AND tablename=:t"),
-            {"t": tablename},
-        ).fetchone()
-    else:  # SQLite
-        res = conn.execute(
-            sa.text("SELECT name FROM sqlite_master WHERE type='table' AND name=:t"),
-            {"t": tablename},
-        ).fetchone()
-    return bool(res)
+def _existing_tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
 
 
 def upgrade():
+    existing = _existing_tables()
+
     # canonical_mappings
-    if not table_exists("canonical_mappings"):
+    if "canonical_mappings" not in existing:
         op.create_table(
             "canonical_mappings",
             sa.Column("id", sa.Integer, primary_key=True),
@@ -45,7 +35,7 @@ def upgrade():
         )
 
     # import_audit
-    if not table_exists("import_audit"):
+    if "import_audit" not in existing:
         op.create_table(
             "import_audit",
             sa.Column("id", sa.Integer, primary_key=True),
@@ -60,7 +50,6 @@ def upgrade():
 
 
 def downgrade():
-    if table_exists("import_audit"):
-        op.drop_table("import_audit")
-    if table_exists("canonical_mappings"):
-        op.drop_table("canonical_mappings")
+    # Let the server skip missing tables instead of checking from Python first
+    op.execute("DROP TABLE IF EXISTS import_audit")
+    op.execute("DROP TABLE IF EXISTS canonical_mappings")
@@ -16,20 +16,36 @@ branch_labels = None
 depends_on = None
 
 
-def table_exists(tablename):
-    """Check if a table exists in the database."""
-    conn = op.get_bind()
-    if conn.dialect.name == 'postgresql':
-        res = conn.execute(
-            sa.text("SELECT tablename FROM pg_tables WHERE schemaname='public' AND tablename=:t"),
-            {"t": tablename},
-        ).fetchone()
-    else:  # SQLite
-        res = conn.execute(
-            sa.text("SELECT name FROM sqlite_master WHERE type='table' AND name=:t"),
-            {"t": tablename},
-        ).fetchone()
-    return bool(res)
+def _existing_tables():
+    """Return the set of table names present in the database."""
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def _create_index(name, table, columns, **kw):
+    """Build an index without blocking writes on the table."""
+    # a failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind, which
+    # if_not_exists would then skip: drop it so the build is retried
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid"
+            " WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    ).first()
+    if invalid:
+        _drop_index(name)
+    op.create_index(
+        name,
+        table,
+        columns,
+        postgresql_concurrently=True,
+        if_not_exists=True,
+        **kw,
+    )
+
+
+def _drop_index(name):
+    op.drop_index(name, postgresql_concurrently=True, if_exists=True)
 
 
 def upgrade():
@@ -38,108 +54,123 @@ def upgrade():
     # Check if we're using PostgreSQL before applying optimizations
     bind = op.get_bind()
     if bind.dialect.name == 'postgresql':
+        existing = _existing_tables()
+
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with op.get_context().autocommit_block():
+            op.execute("SET max_parallel_maintenance_workers = 4")
+            op.execute("SET maintenance_work_mem = '512MB'")
+
+            # Add indexes for better query performance, but only if tables exist
+
+            # Users table indexes
+            if 'users' in existing:
+                _create_index('idx_users_username', 'users', ['username'])
+                _create_index('idx_users_email', 'users', ['email'])
+                _create_index('idx_users_active_only', 'users', ['username'], postgresql_where=sa.text('is_active'))
+                # Append-only timestamps: BRIN summaries are tiny and cheap to maintain
+                _create_index('idx_users_created_at', 'users', ['created_at'], postgresql_using='brin')
+
+            # Players table indexes
+            if 'players' in existing:
+                _create_index('idx_players_name', 'players', ['name'])
+                _create_index('idx_players_role', 'players', ['role'])
+                _create_index('idx_players_costo', 'players', ['costo'])
+                _create_index('idx_players_squadra_reale', 'players', ['squadra_reale'])
+
+            # Teams table indexes
+            if 'teams' in existing:
+                _create_index('idx_teams_name', 'teams', ['name'])
+                _create_index('idx_teams_league_id', 'teams', ['league_id'])
+                _create_index('idx_teams_cash', 'teams', ['cash'])
+
+            # User sessions table indexes (for authentication performance)
+            if 'user_sessions' in existing:
+                _create_index('idx_user_sessions_session_token', 'user_sessions', ['session_token'])
+                _create_index('idx_user_sessions_refresh_token', 'user_sessions', ['refresh_token'])
+                _create_index('idx_user_sessions_active_only', 'user_sessions', ['user_id'], postgresql_where=sa.text('is_active'))
+                _create_index('idx_user_sessions_expires_at', 'user_sessions', ['expires_at'], postgresql_using='brin')
+
+            # Audit logs table indexes (for security and compliance)
+            if 'audit_logs' in existing:
+                _create_index('idx_audit_logs_action', 'audit_logs', ['action'])
+                _create_index('idx_audit_logs_created_at', 'audit_logs', ['created_at'], postgresql_using='brin')
+                _create_index('idx_audit_logs_success', 'audit_logs', ['success'])
+
+            # Team aliases for fast lookups
+            if 'team_aliases' in existing:
+                _create_index('idx_team_aliases_team_id', 'team_aliases', ['team_id'])
+                _create_index('idx_team_aliases_alias', 'team_aliases', ['alias'])
+
+            # Canonical mappings for import performance
+            if 'canonical_mappings' in existing:
+                _create_index('idx_canonical_mappings_variant', 'canonical_mappings', ['variant'])
+                _create_index('idx_canonical_mappings_canonical', 'canonical_mappings', ['canonical'])
+
+            # Covering indexes for common queries: key on the lookup column and
+            # carry the projected columns so Postgres can answer from the index.
+            # They also serve the plain team_id / user_id lookups, so those
+            # columns get no separate single-column index.
+            if 'players' in existing:
+                _create_index('idx_players_team_role', 'players', ['team_id'], postgresql_include=['role', 'name', 'costo'])
+            if 'user_sessions' in existing:
+                _create_index('idx_user_sessions_user_active', 'user_sessions', ['user_id'], postgresql_include=['is_active', 'expires_at'])
+            if 'audit_logs' in existing:
+                _create_index('idx_audit_logs_user_action', 'audit_logs', ['user_id'], postgresql_include=['action', 'created_at'])
+
+            # don't carry the build settings into later revisions of this run
+            op.execute("RESET max_parallel_maintenance_workers")
+            op.execute("RESET maintenance_work_mem")
+
 
-        # Add indexes for better query performance, but only if tables exist
-
-        # Users table indexes
-        if table_exists('users'):
-            op.create_index('idx_users_username', 'users', ['username'])
-            op.create_index('idx_users_email', 'users', ['email'])
-            op.create_index('idx_users_is_active', 'users', ['is_active'])
-            op.create_index('idx_users_created_at', 'users', ['created_at'])
-
-        # Players table indexes
-        if table_exists('players'):
-            op.create_index('idx_players_name', 'players', ['name'])
-            op.create_index('idx_players_role', 'players', ['role'])
-            op.create_index('idx_players_team_id', 'players', ['team_id'])
-            op.create_index('idx_players_costo', 'players', ['costo'])
-            op.create_index('idx_players_squadra_reale', 'players', ['squadra_reale'])
-
-        # Teams table indexes
-        if table_exists('teams'):
-            op.create_index('idx_teams_name', 'teams', ['name'])
-            op.create_index('idx_teams_league_id', 'teams', ['league_id'])
-            op.create_index('idx_teams_cash', 'teams', ['cash'])
-
-        # User sessions table indexes (for authentication performance)
-        if table_exists('user_sessions'):
-            op.create_index('idx_user_sessions_user_id', 'user_sessions', ['user_id'])
-            op.create_index('idx_user_sessions_session_token', 'user_sessions', ['session_token'])
-            op.create_index('idx_user_sessions_refresh_token', 'user_sessions', ['refresh_token'])
-            op.create_index('idx_user_sessions_is_active', 'user_sessions', ['is_active'])
-            op.create_index('idx_user_sessions_expires_at', 'user_sessions', ['expires_at'])
-
-        # Audit logs table indexes (for security and compliance)
-        if table_exists('audit_logs'):
-            op.create_index('idx_audit_logs_user_id', 'audit_logs', ['user_id'])
-            op.create_index('idx_audit_logs_action', 'audit_logs', ['action'])
-            op.create_index('idx_audit_logs_created_at', 'audit_logs', ['created_at'])
-            op.create_index('idx_audit_logs_success', 'audit_logs', ['success'])
-
-        # Team aliases for fast lookups
-        if table_exists('team_aliases'):
-            op.create_index('idx_team_aliases_team_id', 'team_aliases', ['team_id'])
-            op.create_index('idx_team_aliases_alias', 'team_aliases', ['alias'])
-
-        # Canonical mappings for import performance
-        if table_exists('canonical_mappings'):
-            op.create_index('idx_canonical_mappings_variant', 'canonical_mappings', ['variant'])
-            op.create_index('idx_canonical_mappings_canonical', 'canonical_mappings', ['canonical'])
-
-        # Composite indexes for common queries
-        if table_exists('players') and table_exists('teams'):
-            op.create_index('idx_players_team_role', 'players', ['team_id', 'role'])
-        if table_exists('user_sessions'):
-            op.create_index('idx_user_sessions_user_active', 'user_sessions', ['user_id', 'is_active'])
-        if table_exists('audit_logs'):
-            op.create_index('idx_audit_logs_user_action', 'audit_logs', ['user_id', 'action'])
 def downgrade():
     """Remove PostgreSQL-specific optimizations and indexes."""
 
     bind = op.get_bind()
     if bind.dialect.name == 'postgresql':
-
-        # Drop composite indexes
-        op.drop_index('idx_audit_logs_user_action')
-        op.drop_index('idx_user_sessions_user_active')
-        op.drop_index('idx_players_team_role')
-
-        # Drop canonical mappings indexes
-        op.drop_index('idx_canonical_mappings_canonical')
-        op.drop_index('idx_canonical_mappings_variant')
-
-        # Drop team aliases indexes
-        op.drop_index('idx_team_aliases_alias')
-        op.drop_index('idx_team_aliases_team_id')
-
-        # Drop audit logs indexes
-        op.drop_index('idx_audit_logs_success')
-        op.drop_index('idx_audit_logs_created_at')
-        op.drop_index('idx_audit_logs_action')
-        op.drop_index('idx_audit_logs_user_id')
-
-        # Drop user sessions indexes
-        op.drop_index('idx_user_sessions_expires_at')
-        op.drop_index('idx_user_sessions_is_active')
-        op.drop_index('idx_user_sessions_refresh_token')
-        op.drop_index('idx_user_sessions_session_token')
-        op.drop_index('idx_user_sessions_user_id')
-
-        # Drop teams indexes
-        op.drop_index('idx_teams_cash')
-        op.drop_index('idx_teams_league_id')
-        op.drop_index('idx_teams_name')
-
-        # Drop players indexes
-        op.drop_index('idx_players_squadra_reale')
-        op.drop_index('idx_players_costo')
-        op.drop_index('idx_players_team_id')
-        op.drop_index('idx_players_role')
-        op.drop_index('idx_players_name')
-
-        # Drop users indexes
-        op.drop_index('idx_users_created_at')
-        op.drop_index('idx_users_is_active')
-        op.drop_index('idx_users_email')
-        op.drop_index('idx_users_username')
+        with op.get_context().autocommit_block():
+            # Drop composite indexes
+            _drop_index('idx_audit_logs_user_action')
+            _drop_index('idx_user_sessions_user_active')
+            _drop_index('idx_players_team_role')
+
+            # Drop canonical mappings indexes
+            _drop_index('idx_canonical_mappings_canonical')
+            _drop_index('idx_canonical_mappings_variant')
+
+            # Drop team aliases indexes
+            _drop_index('idx_team_aliases_alias')
+            _drop_index('idx_team_aliases_team_id')
+
+            # Drop audit logs indexes
+            _drop_index('idx_audit_logs_success')
+            _drop_index('idx_audit_logs_created_at')
+            _drop_index('idx_audit_logs_action')
+            _drop_index('idx_audit_logs_user_id')  # pre-covering-index name
+
+            # Drop user sessions indexes
+            _drop_index('idx_user_sessions_expires_at')
+            _drop_index('idx_user_sessions_active_only')
+            _drop_index('idx_user_sessions_is_active')  # pre-partial-index name
+            _drop_index('idx_user_sessions_refresh_token')
+            _drop_index('idx_user_sessions_session_token')
+            _drop_index('idx_user_sessions_user_id')  # pre-covering-index name
+
+            # Drop teams indexes
+            _drop_index('idx_teams_cash')
+            _drop_index('idx_teams_league_id')
+            _drop_index('idx_teams_name')
+
+            # Drop players indexes
+            _drop_index('idx_players_squadra_reale')
+            _drop_index('idx_players_costo')
+            _drop_index('idx_players_team_id')  # pre-covering-index name
+            _drop_index('idx_players_role')
+            _drop_index('idx_players_name')
+
+            # Drop users indexes
+            _drop_index('idx_users_created_at')
+            _drop_index('idx_users_active_only')
+            _drop_index('idx_users_is_active')  # pre-partial-index name
+            _drop_index('idx_users_email')
+            _drop_index('idx_users_username')
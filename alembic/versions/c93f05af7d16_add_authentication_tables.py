@@ -15,151 +15,266 @@ down_revision = 'a12e098a2903'
 branch_labels = None
 depends_on = None
 
+# Creation order respects foreign keys between the auth tables
+_AUTH_TABLES = (
+    'users',
+    'roles',
+    'permissions',
+    'user_roles',
+    'role_permissions',
+    'user_sessions',
+    'audit_logs',
+)
+
+# Compiled output of the builders below for the PostgreSQL dialect. A fresh
+# schema gets all auth tables in one statement batch; keep in sync with them.
+_POSTGRES_DDL = """
+CREATE TABLE users (
+    id SERIAL NOT NULL,
+    username VARCHAR(128) NOT NULL,
+    email VARCHAR(256) NOT NULL,
+    hashed_password VARCHAR(255) NOT NULL,
+    full_name VARCHAR(256),
+    is_active BOOLEAN DEFAULT TRUE,
+    is_verified BOOLEAN DEFAULT FALSE,
+    failed_login_attempts INTEGER DEFAULT 0,
+    last_login_attempt TIMESTAMP WITHOUT TIME ZONE,
+    account_locked_until TIMESTAMP WITHOUT TIME ZONE,
+    created_at TIMESTAMP WITHOUT TIME ZONE,
+    updated_at TIMESTAMP WITHOUT TIME ZONE,
+    PRIMARY KEY (id),
+    UNIQUE (username),
+    UNIQUE (email)
+);
+CREATE TABLE roles (
+    id SERIAL NOT NULL,
+    name VARCHAR(128) NOT NULL,
+    description TEXT,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP WITHOUT TIME ZONE,
+    PRIMARY KEY (id),
+    UNIQUE (name)
+);
+CREATE TABLE permissions (
+    id SERIAL NOT NULL,
+    name VARCHAR(128) NOT NULL,
+    description TEXT,
+    resource VARCHAR(128) NOT NULL,
+    action VARCHAR(64) NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (name)
+);
+CREATE INDEX idx_permissions_resource_action ON permissions (resource, action);
+CREATE TABLE user_roles (
+    id SERIAL NOT NULL,
+    user_id INTEGER NOT NULL,
+    role_id INTEGER NOT NULL,
+    assigned_at TIMESTAMP WITHOUT TIME ZONE,
+    assigned_by INTEGER,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE,
+    FOREIGN KEY(role_id) REFERENCES roles (id) ON DELETE CASCADE,
+    FOREIGN KEY(assigned_by) REFERENCES users (id),
+    CONSTRAINT uq_user_role UNIQUE (user_id, role_id)
+);
+CREATE TABLE role_permissions (
+    id SERIAL NOT NULL,
+    role_id INTEGER NOT NULL,
+    permission_id INTEGER NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(role_id) REFERENCES roles (id) ON DELETE CASCADE,
+    FOREIGN KEY(permission_id) REFERENCES permissions (id) ON DELETE CASCADE,
+    CONSTRAINT uq_role_permission UNIQUE (role_id, permission_id)
+);
+CREATE TABLE user_sessions (
+    id SERIAL NOT NULL,
+    user_id INTEGER NOT NULL,
+    session_token VARCHAR(512) NOT NULL,
+    refresh_token VARCHAR(512) NOT NULL,
+    expires_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    refresh_expires_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    ip_address VARCHAR(45),
+    user_agent TEXT,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP WITHOUT TIME ZONE,
+    last_used_at TIMESTAMP WITHOUT TIME ZONE,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE,
+    UNIQUE (session_token),
+    UNIQUE (refresh_token)
+);
+CREATE TABLE audit_logs (
+    id SERIAL NOT NULL,
+    user_id INTEGER,
+    action VARCHAR(128) NOT NULL,
+    resource_type VARCHAR(128),
+    resource_id VARCHAR(128),
+    details TEXT,
+    ip_address VARCHAR(45),
+    user_agent TEXT,
+    success BOOLEAN,
+    created_at TIMESTAMP WITHOUT TIME ZONE,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+"""
+
+
+def _existing_tables():
+    """Return the set of table names present in the database."""
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def _create_users():
+    """Create the users table."""
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(128), nullable=False),
+        sa.Column('email', sa.String(256), nullable=False),
+        sa.Column('hashed_password', sa.String(255), nullable=False),
+        sa.Column('full_name', sa.String(256), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True, server_default=sa.text("TRUE")),
+        sa.Column('is_verified', sa.Boolean(), nullable=True, server_default=sa.text("FALSE")),
+        sa.Column('failed_login_attempts', sa.Integer(), nullable=True, server_default=sa.text("0")),
+        sa.Column('last_login_attempt', sa.DateTime(), nullable=True),
+        sa.Column('account_locked_until', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username'),
+        sa.UniqueConstraint('email')
+    )
+
+
+def _create_roles():
+    """Create the roles table."""
+    op.create_table(
+        'roles',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(128), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True, server_default=sa.text("TRUE")),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+
+
+def _create_permissions():
+    """Create the permissions table."""
+    op.create_table(
+        'permissions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(128), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('resource', sa.String(128), nullable=False),
+        sa.Column('action', sa.String(64), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+        sa.Index('idx_permissions_resource_action', 'resource', 'action')
+    )
 
-def table_exists(tablename):
-    """Check if a table exists in the database."""
-    conn = op.get_bind()
-    if conn.dialect.name == 'postgresql':
-        res = conn.execute(
-            sa.text("SELECT tablename FROM pg_tables WHERE schemaname='public' AND tablename=:t"),
-            {"t": tablename},
-        ).fetchone()
-    else:  # SQLite
-        res = conn.execute(
-            sa.text("SELECT name FROM sqlite_master WHERE type='table' AND name=:t"),
-            {"t": tablename},
-        ).fetchone()
-    return bool(res)
+
+def _create_user_roles():
+    """Create the user_roles junction table."""
+    op.create_table(
+        'user_roles',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('role_id', sa.Integer(), nullable=False),
+        sa.Column('assigned_at', sa.DateTime(), nullable=True),
+        sa.Column('assigned_by', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['assigned_by'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'role_id', name='uq_user_role')
+    )
+
+
+def _create_role_permissions():
+    """Create the role_permissions junction table."""
+    op.create_table(
+        'role_permissions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('role_id', sa.Integer(), nullable=False),
+        sa.Column('permission_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['permission_id'], ['permissions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('role_id', 'permission_id', name='uq_role_permission')
+    )
+
+
+def _create_user_sessions():
+    """Create the user_sessions table."""
+    op.create_table(
+        'user_sessions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('session_token', sa.String(512), nullable=False),
+        sa.Column('refresh_token', sa.String(512), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('refresh_expires_at', sa.DateTime(), nullable=False),
+        sa.Column('ip_address', sa.String(45), nullable=True),
+        sa.Column('user_agent', sa.Text(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True, server_default=sa.text("TRUE")),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_used_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('session_token'),
+        sa.UniqueConstraint('refresh_token')
+    )
+
+
+def _create_audit_logs():
+    """Create the audit_logs table."""
+    op.create_table(
+        'audit_logs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('action', sa.String(128), nullable=False),
+        sa.Column('resource_type', sa.String(128), nullable=True),
+        sa.Column('resource_id', sa.String(128), nullable=True),
+        sa.Column('details', sa.Text(), nullable=True),
+        sa.Column('ip_address', sa.String(45), nullable=True),
+        sa.Column('user_agent', sa.Text(), nullable=True),
+        sa.Column('success', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+_TABLE_BUILDERS = {
+    'users': _create_users,
+    'roles': _create_roles,
+    'permissions': _create_permissions,
+    'user_roles': _create_user_roles,
+    'role_permissions': _create_role_permissions,
+    'user_sessions': _create_user_sessions,
+    'audit_logs': _create_audit_logs,
+}
 
 
 def upgrade():
     """Add authentication and authorization tables."""
+    existing = _existing_tables()
+
+    if op.get_bind().dialect.name == 'postgresql' and existing.isdisjoint(_AUTH_TABLES):
+        op.execute(_POSTGRES_DDL)
+        return
 
-    # Users table
-    if not table_exists('users'):
-        op.create_table(
-            'users',
-            sa.Column('id', sa.Integer(), nullable=False),
-            sa.Column('username', sa.String(128), nullable=False),
-            sa.Column('email', sa.String(256), nullable=False),
-            sa.Column('hashed_password', sa.String(255), nullable=False),
-            sa.Column('full_name', sa.String(256), nullable=True),
-            sa.Column('is_active', sa.Boolean(), nullable=True, server_default=sa.text("TRUE")),
-            sa.Column('is_verified', sa.Boolean(), nullable=True, server_default=sa.text("FALSE")),
-            sa.Column('failed_login_attempts', sa.Integer(), nullable=True, server_default=sa.text("0")),
-            sa.Column('last_login_attempt', sa.DateTime(), nullable=True),
-            sa.Column('account_locked_until', sa.DateTime(), nullable=True),
-            sa.Column('created_at', sa.DateTime(), nullable=True),
-            sa.Column('updated_at', sa.DateTime(), nullable=True),
-            sa.PrimaryKeyConstraint('id'),
-            sa.UniqueConstraint('username'),
-            sa.UniqueConstraint('email')
-        )
-
-    # Roles table
-    if not table_exists('roles'):
-        op.create_table(
-            'roles',
-            sa.Column('id', sa.Integer(), nullable=False),
-            sa.Column('name', sa.String(128), nullable=False),
-            sa.Column('description', sa.Text(), nullable=True),
-            sa.Column('is_active', sa.Boolean(), nullable=True, server_default=sa.text("TRUE")),
-            sa.Column('created_at', sa.DateTime(), nullable=True),
-            sa.PrimaryKeyConstraint('id'),
-            sa.UniqueConstraint('name')
-        )
-
-    # Permissions table
-    if not table_exists('permissions'):
-        op.create_table(
-            'permissions',
-            sa.Column('id', sa.Integer(), nullable=False),
-            sa.Column('name', sa.String(128), nullable=False),
-            sa.Column('description', sa.Text(), nullable=True),
-            sa.Column('resource', sa.String(128), nullable=False),
-            sa.Column('action', sa.String(64), nullable=False),
-            sa.PrimaryKeyConstraint('id'),
-            sa.UniqueConstraint('name'),
-            sa.Index('idx_permissions_resource_action', 'resource', 'action')
-        )
-
-    # User roles junction table
-    if not table_exists('user_roles'):
-        op.create_table(
-            'user_roles',
-            sa.Column('id', sa.Integer(), nullable=False),
-            sa.Column('user_id', sa.Integer(), nullable=False),
-            sa.Column('role_id', sa.Integer(), nullable=False),
-            sa.Column('assigned_at', sa.DateTime(), nullable=True),
-            sa.Column('assigned_by', sa.Integer(), nullable=True),
-            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
-            sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ondelete='CASCADE'),
-            sa.ForeignKeyConstraint(['assigned_by'], ['users.id']),
-            sa.PrimaryKeyConstraint('id'),
-            sa.UniqueConstraint('user_id', 'role_id', name='uq_user_role')
-        )
-
-    # Role permissions junction table
-    if not table_exists('role_permissions'):
-        op.create_table(
-            'role_permissions',
-            sa.Column('id', sa.Integer(), nullable=False),
-            sa.Column('role_id', sa.Integer(), nullable=False),
-            sa.Column('permission_id', sa.Integer(), nullable=False),
-            sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ondelete='CASCADE'),
-            sa.ForeignKeyConstraint(['permission_id'], ['permissions.id'], ondelete='CASCADE'),
-            sa.PrimaryKeyConstraint('id'),
-            sa.UniqueConstraint('role_id', 'permission_id', name='uq_role_permission')
-        )
-
-    # User sessions table
-    if not table_exists('user_sessions'):
-        op.create_table(
-            'user_sessions',
-            sa.Column('id', sa.Integer(), nullable=False),
-            sa.Column('user_id', sa.Integer(), nullable=False),
-            sa.Column('session_token', sa.String(512), nullable=False),
-            sa.Column('refresh_token', sa.String(512), nullable=False),
-            sa.Column('expires_at', sa.DateTime(), nullable=False),
-            sa.Column('refresh_expires_at', sa.DateTime(), nullable=False),
-            sa.Column('ip_address', sa.String(45), nullable=True),
-            sa.Column('user_agent', sa.Text(), nullable=True),
-            sa.Column('is_active', sa.Boolean(), nullable=True, server_default=sa.text("TRUE")),
-            sa.Column('created_at', sa.DateTime(), nullable=True),
-            sa.Column('last_used_at', sa.DateTime(), nullable=True),
-            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
-            sa.PrimaryKeyConstraint('id'),
-            sa.UniqueConstraint('session_token'),
-            sa.UniqueConstraint('refresh_token')
-        )
-
-    # Audit logs table
-    if not table_exists('audit_logs'):
-        op.create_table(
-            'audit_logs',
-            sa.Column('id', sa.Integer(), nullable=False),
-            sa.Column('user_id', sa.Integer(), nullable=True),
-            sa.Column('action', sa.String(128), nullable=False),
-            sa.Column('resource_type', sa.String(128), nullable=True),
-            sa.Column('resource_id', sa.String(128), nullable=True),
-            sa.Column('details', sa.Text(), nullable=True),
-            sa.Column('ip_address', sa.String(45), nullable=True),
-            sa.Column('user_agent', sa.Text(), nullable=True),
-            sa.Column('success', sa.Boolean(), nullable=True),
-            sa.Column('created_at', sa.DateTime(), nullable=True),
-            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
-            sa.PrimaryKeyConstraint('id')
-        )
+    for table in _AUTH_TABLES:
+        if table not in existing:
+            _TABLE_BUILDERS[table]()
 
 
 def downgrade():
     """Remove authentication and authorization tables."""
 
     # Drop tables in reverse order due to foreign key constraints
-    op.drop_table('audit_logs')
-    op.drop_table('user_sessions')
-    op.drop_table('role_permissions')
-    op.drop_table('user_roles')
-    op.drop_table('permissions')
-    op.drop_table('roles')
-    op.drop_table('users')
+    for table in reversed(_AUTH_TABLES):
+        op.drop_table(table)
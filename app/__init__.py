@@ -42,6 +42,12 @@ def create_app(test_config=None):
             "AS Plusvalenza",
         ],
         SQLALCHEMY_DATABASE_URI=None,
+        # compiled template bytecode is written here when set, so a restarted
+        # worker loads templates without re-parsing them
+        TEMPLATE_CACHE_DIR=settings.TEMPLATE_CACHE_DIR,
+        # static URLs carry a content hash (app.utils.static_assets), so browsers
+        # and proxies may keep them for a year
+        SEND_FILE_MAX_AGE_DEFAULT=31536000,
         # Legacy admin config (will be deprecated)
         ADMIN_USER="admin",
         ADMIN_PASS="admin",
@@ -54,6 +60,22 @@ def create_app(test_config=None):
     if test_config:
         app.config.update(test_config)
 
+    # Derived team/role lookups, computed once: O(1) team validation and a fixed
+    # role order that templates iterate without calling dict.items() per render
+    app.config["SQUADRE_TUPLE"] = tuple(app.config["SQUADRE"])
+    app.config["SQUADRE_SET"] = frozenset(app.config["SQUADRE"])
+    app.config["ROSE_STRUCTURE_ITEMS"] = tuple(app.config["ROSE_STRUCTURE"].items())
+    from .utils.templates import init_bytecode_cache, team_bar
+
+    init_bytecode_cache(app)
+
+    app.jinja_env.globals.update(
+        team_bar=team_bar,
+        squadre=app.config["SQUADRE_TUPLE"],
+        rose_structure=app.config["ROSE_STRUCTURE"],
+        rose_structure_items=app.config["ROSE_STRUCTURE_ITEMS"],
+    )
+
     # Configure SQLAlchemy engine/session using DATABASE_URL from settings
     db_uri = settings.DATABASE_URL
 
@@ -81,6 +103,19 @@ def create_app(test_config=None):
     app.extensions["db_engine"] = engine
     app.extensions["db_session_factory"] = SessionLocal
 
+    # legacy sqlite3 connections are request-scoped and pooled (see app.db.get_db)
+    from .db import init_app as init_legacy_db
+
+    init_legacy_db(app)
+
+    from .utils.static_assets import init_app as init_static_assets
+
+    init_static_assets(app)
+
+    from .utils.compression import init_app as init_compression
+
+    init_compression(app)
+
     # Initialize security (JWT, rate limiting)
     jwt_manager, limiter = init_security(app)
     app.extensions["jwt_manager"] = jwt_manager
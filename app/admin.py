@@ -19,6 +19,11 @@ from .utils.team_utils import populate_team_aliases
 
 bp = Blueprint("admin", __name__, url_prefix="/admin")
 
+# Built once at import; the table name is bound per call
+_TABLE_EXISTS_SQL = sa.text(
+    "SELECT name FROM sqlite_master WHERE type='table' AND name=:t"
+)
+
 
 def check_auth(username, password):
     cfg_user = current_app.config.get("ADMIN_USER", "admin")
@@ -52,20 +57,14 @@ def index():
     # session factory available via extensions if needed
     # simple stats
     with engine.connect() as conn:
-        teams_exists = conn.execute(
-            sa.text(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name='teams'\n"
-            )
-        ).fetchone()
+        teams_exists = conn.execute(_TABLE_EXISTS_SQL, {"t": "teams"}).fetchone()
         teams = (
             conn.execute(sa.text("SELECT COUNT(*) FROM teams")).scalar()
             if teams_exists
             else None
         )
         aliases_exists = conn.execute(
-            sa.text(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name='team_aliases'\n"
-            )
+            _TABLE_EXISTS_SQL, {"t": "team_aliases"}
         ).fetchone()
         aliases = (
             conn.execute(sa.text("SELECT COUNT(*) FROM team_aliases")).scalar()
@@ -182,11 +181,7 @@ def aliases():
     offset = (page - 1) * per_page
     rows = []
     with engine.connect() as conn:
-        exists = conn.execute(
-            sa.text(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name='team_aliases'\n"
-            )
-        ).fetchone()
+        exists = conn.execute(_TABLE_EXISTS_SQL, {"t": "team_aliases"}).fetchone()
         if exists:
             if q:
                 rows = conn.execute(
@@ -259,11 +254,7 @@ def canonical():
 
     # list mappings
     with engine.connect() as conn:
-        exists = conn.execute(
-            sa.text(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name='canonical_mappings'\n"
-            )
-        ).fetchone()
+        exists = conn.execute(_TABLE_EXISTS_SQL, {"t": "canonical_mappings"}).fetchone()
         rows = []
         if exists:
             rows = conn.execute(
@@ -392,11 +383,7 @@ def audit():
     per_page = 20
     offset = (page - 1) * per_page
     with engine.connect() as conn:
-        exists = conn.execute(
-            sa.text(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name='import_audit'\n"
-            )
-        ).fetchone()
+        exists = conn.execute(_TABLE_EXISTS_SQL, {"t": "import_audit"}).fetchone()
         rows = []
         total = 0
         if exists:
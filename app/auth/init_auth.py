@@ -6,6 +6,7 @@ Provides commands to initialize roles, permissions, and create initial admin use
 import logging
 from typing import Dict, List
 
+from sqlalchemy import insert
 from sqlalchemy.exc import IntegrityError
 
 from ..models import Permission, Role, RolePermission, User, UserRole
@@ -57,21 +58,21 @@ class AuthInitializer:
                 ("audit.admin", "Manage audit logs", "audit", "admin"),
             ]
 
-            created_count = 0
-            for name, description, resource, action in permissions:
-                existing = session.query(Permission).filter(
-                    Permission.name == name
-                ).first()
-
-                if not existing:
-                    permission = Permission(
-                        name=name,
-                        description=description,
-                        resource=resource,
-                        action=action
-                    )
-                    session.add(permission)
-                    created_count += 1
+            # One lookup for what is already there, one executemany for the rest
+            existing = {name for (name,) in session.query(Permission.name)}
+            rows = [
+                {
+                    "name": name,
+                    "description": description,
+                    "resource": resource,
+                    "action": action,
+                }
+                for name, description, resource, action in permissions
+                if name not in existing
+            ]
+            if rows:
+                session.execute(insert(Permission), rows)
+            created_count = len(rows)
 
             session.commit()
             logger.info(f"Created {created_count} permissions")
@@ -119,38 +120,38 @@ class AuthInitializer:
                 }
             }
 
-            created_count = 0
-            for role_name, config in roles_config.items():
-                # Create role if it doesn't exist
-                role = session.query(Role).filter(Role.name == role_name).first()
-                if not role:
-                    role = Role(
-                        name=role_name,
-                        description=config["description"]
-                    )
-                    session.add(role)
-                    session.flush()  # Get the ID
-                    created_count += 1
+            existing_roles = {name for (name,) in session.query(Role.name)}
+            new_roles = [
+                {"name": role_name, "description": config["description"]}
+                for role_name, config in roles_config.items()
+                if role_name not in existing_roles
+            ]
+            if new_roles:
+                session.execute(insert(Role), new_roles)
+            created_count = len(new_roles)
+
+            # Resolve ids and current assignments up front instead of per pair
+            role_ids = dict(session.query(Role.name, Role.id))
+            permission_ids = dict(session.query(Permission.name, Permission.id))
+            assigned = set(
+                session.query(RolePermission.role_id, RolePermission.permission_id)
+            )
 
-                # Assign permissions to role
+            assignments = []
+            for role_name, config in roles_config.items():
+                role_id = role_ids[role_name]
                 for perm_name in config["permissions"]:
-                    permission = session.query(Permission).filter(
-                        Permission.name == perm_name
-                    ).first()
-
-                    if permission:
-                        # Check if role already has this permission
-                        existing_assignment = session.query(RolePermission).filter(
-                            RolePermission.role_id == role.id,
-                            RolePermission.permission_id == permission.id
-                        ).first()
-
-                        if not existing_assignment:
-                            role_permission = RolePermission(
-                                role_id=role.id,
-                                permission_id=permission.id
-                            )
-                            session.add(role_permission)
+                    permission_id = permission_ids.get(perm_name)
+                    if permission_id is None:
+                        continue
+                    if (role_id, permission_id) in assigned:
+                        continue
+                    assigned.add((role_id, permission_id))
+                    assignments.append(
+                        {"role_id": role_id, "permission_id": permission_id}
+                    )
+            if assignments:
+                session.execute(insert(RolePermission), assignments)
 
             session.commit()
             logger.info(f"Created {created_count} roles")
@@ -34,6 +34,8 @@ class Config:
 
     # Cache (optional)
     REDIS_URL: str = config('REDIS_URL', default='')
+    # Directory for compiled template bytecode, reused across restarts (optional)
+    TEMPLATE_CACHE_DIR: str = config('TEMPLATE_CACHE_DIR', default='')
 
     # Email (optional)
     EMAIL_HOST: str = config('EMAIL_HOST', default='')
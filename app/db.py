@@ -3,23 +3,571 @@
 Provides a single place to create sqlite3 connections with the correct row_factory
 and a default path. Scripts and modules should call `get_connection(db_path=None)` so
 we can change creation logic in one place later (for example to switch to SQLAlchemy).
+
+Request handlers should use `get_db()` instead: it hands out one connection per
+application context, taken from a small per-database pool so SQLite's page cache
+survives between requests, and `close_db` returns it to the pool on teardown.
+Those connections run in autocommit mode; wrap each request's writes in
+`txn(conn)` so they commit once, together. GET and HEAD requests get a
+read-only connection from a separate pool.
+
+Deployments create the legacy tables and indexes up front with
+``flask init-db``; `get_db()` only falls back to doing it when a single
+catalog lookup shows something is missing.
 """
 
+import atexit
+import logging
 import os
+import queue
 import sqlite3
-from typing import Optional
+import threading
+from contextlib import contextmanager
+from typing import Dict, FrozenSet, Iterator, Optional, Set, Tuple
+from urllib.parse import quote
 
+import click
+from flask import current_app, g, has_request_context, request
+from flask.cli import with_appcontext
 
-def get_connection(db_path: Optional[str] = None) -> sqlite3.Connection:
-    """Return a sqlite3.Connection configured with Row factory.
+# WAL lets readers proceed while a writer commits and only appends to the log
+# on COMMIT. journal_mode is persisted in the database file, so it is switched
+# once per file and process (see get_connection)
+_SQL_JOURNAL_WAL = "PRAGMA journal_mode=WAL"
 
-    If db_path is not provided, uses the environment variable GIOCATORI_DB or the
-    repository default at ../giocatori.db.
+# Per-connection settings, applied to every connection
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL;"
+    "PRAGMA temp_store=MEMORY;"
+    "PRAGMA mmap_size=268435456;"
+    "PRAGMA cache_size=-20000;"
+    "PRAGMA busy_timeout=5000;"
+)
+
+# Idle connections kept per database file and access mode
+POOL_SIZE = 4
+
+# Request methods served from read-only connections
+_READ_METHODS = frozenset({"GET", "HEAD"})
+
+
+def numeric_expr(column_sql: str) -> str:
+    """SQL reading a text column such as ``"Costo"`` ("1,5", "12 €") as a number.
+
+    Shared by the ``costo_num`` triggers and the queries that still parse
+    other text columns, so both read numbers the same way.
     """
+    clean = column_sql
+    for ch in (",", "%", "€", " "):
+        clean = f"REPLACE({clean}, '{ch}', '')"
+    return f"CAST({clean} AS REAL)"
+
+
+def escape_like(text: str) -> str:
+    """Escape LIKE wildcards in ``text`` for a ``LIKE ? ESCAPE '\\'`` pattern."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# giocatori.costo_num holds numeric_expr("Costo"), kept in sync by triggers so
+# sorting and team totals read a plain (indexable) REAL instead of re-parsing
+# the text of every row
+_COSTO_NUM_TRIGGERS = (
+    ("trg_giocatori_costo_num_ins", "AFTER INSERT ON giocatori"),
+    ("trg_giocatori_costo_num_upd", 'AFTER UPDATE OF "Costo" ON giocatori'),
+)
+_SQL_SYNC_COSTO_NUM = (
+    "UPDATE giocatori SET costo_num = %s WHERE rowid = NEW.rowid"
+    % numeric_expr('NEW."Costo"')
+)
+
+# giocatori.role_code: the role letter of "R." as a virtual generated column, so
+# role filters and per-role counts are an indexed IN()/equality instead of a
+# chain of LIKE 'P%' prefix patterns
+ROLE_CODE_SQL = 'upper(substr("R.", 1, 1))'
+_SQL_ADD_ROLE_CODE = (
+    "ALTER TABLE giocatori ADD COLUMN role_code TEXT"
+    f" GENERATED ALWAYS AS ({ROLE_CODE_SQL}) VIRTUAL"
+)
+
+# Players that count towards a roster: an option without a contract does not
+VISIBLE_ROSTER_SQL = "NOT (opzione IS NOT NULL AND anni_contratto IS NULL)"
+
+# Secondary indexes on the legacy giocatori table: (name, required columns, target).
+# Roster and team-cash queries filter by team and bucket by role, the search and
+# suggestions match on (and page by) the player name, and cost-sorted market
+# pages seek on the numeric cost.
+_LEGACY_INDEXES = (
+    ("ix_giocatori_squadra_ruolo", {"squadra", "R."}, 'giocatori("squadra", "R.")'),
+    ("ix_giocatori_nome", {"Nome"}, 'giocatori("Nome" COLLATE NOCASE)'),
+    ("ix_giocatori_costo", {"costo_num"}, 'giocatori("costo_num")'),
+    ("ix_giocatori_role_code", {"role_code"}, 'giocatori("role_code")'),
+    # partial covering index for the grouped team summary: only roster rows,
+    # with everything it reads (a virtual role_code would not cover)
+    (
+        "ix_giocatori_rosa",
+        {"FantaSquadra", "costo_num", "R.", "opzione", "anni_contratto"},
+        'giocatori("FantaSquadra", "costo_num", "R.", opzione, anni_contratto)'
+        f" WHERE {VISIBLE_ROSTER_SQL}",
+    ),
+    # "does this team own anyone" probes; free agents (NULL) stay out of it
+    (
+        "ix_giocatori_fantasquadra",
+        {"FantaSquadra"},
+        'giocatori("FantaSquadra") WHERE "FantaSquadra" IS NOT NULL',
+    ),
+    # exact-match market filters (squadra is covered by ix_giocatori_squadra_ruolo)
+    ("ix_giocatori_ruolo", {"ruolo"}, 'giocatori("ruolo")'),
+    ("ix_giocatori_opzione", {"opzione"}, 'giocatori("opzione")'),
+)
+
+# Full-text index behind the market search: an external-content FTS5 table over
+# the text columns below (those present), kept in sync by triggers
+SEARCH_TABLE = "giocatori_fts"
+_SEARCH_COLUMNS = ("Nome", "Sq.", "squadra", "FantaSquadra", "opzione")
+_SEARCH_TRIGGERS = (
+    "trg_giocatori_fts_ins",
+    "trg_giocatori_fts_del",
+    "trg_giocatori_fts_upd",
+)
+
+# Trigram index over the player names behind the "did you mean" suggestions:
+# substring matches (LIKE '%abc%') answered from the index instead of a scan
+NAME_TRIGRAM_TABLE = "giocatori_nomi_tri"
+_NAME_TRIGRAM_TRIGGERS = (
+    "trg_giocatori_nomi_tri_ins",
+    "trg_giocatori_nomi_tri_del",
+    "trg_giocatori_nomi_tri_upd",
+)
+
+# Team cash table used by the legacy market; shared with app.services.market_service
+SQL_CREATE_FANTATEAM = (
+    "CREATE TABLE IF NOT EXISTS fantateam (squadra TEXT PRIMARY KEY, carryover REAL,"
+    " cassa_iniziale REAL, cassa_attuale REAL)"
+)
+
+_pools: Dict[Tuple[str, bool], "queue.LifoQueue[sqlite3.Connection]"] = {}
+_pools_lock = threading.Lock()
+# PRAGMA schema_version of each file when its legacy schema was last found complete
+_schema_checked: Dict[str, int] = {}
+_schema_lock = threading.Lock()
+_wal_paths: Set[str] = set()
+_local_writes = 0
+_local_writes_lock = threading.Lock()
+
+
+class _Connection(sqlite3.Connection):
+    """sqlite3 connection that can carry per-connection caches."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # {table: (schema_version, frozenset of column names)}
+        self.columns_cache: Dict[str, Tuple[int, FrozenSet[str]]] = {}
+
+
+def _resolve_path(db_path: Optional[str]) -> str:
     if db_path is None:
         db_path = os.environ.get("GIOCATORI_DB")
     if not db_path:
         db_path = os.path.join(os.path.dirname(__file__), "..", "giocatori.db")
-    conn = sqlite3.connect(db_path)
+    return db_path
+
+
+def get_connection(
+    db_path: Optional[str] = None,
+    check_same_thread: bool = True,
+    readonly: bool = False,
+) -> sqlite3.Connection:
+    """Return a sqlite3.Connection configured with Row factory.
+
+    If db_path is not provided, uses the environment variable GIOCATORI_DB or the
+    repository default at ../giocatori.db. The first read-write connection to a
+    file switches it to WAL mode; every connection uses ``synchronous=NORMAL``
+    and waits up to 5s on a locked database instead of failing immediately.
+
+    With ``readonly=True`` the file is opened through a ``mode=ro`` URI: SQLite
+    skips its write-side bookkeeping and any write raises
+    ``sqlite3.OperationalError``. The file must already exist.
+    """
+    path = _resolve_path(db_path)
+    if readonly:
+        path = "file:%s?mode=ro" % quote(os.path.abspath(path))
+    conn = sqlite3.connect(
+        path,
+        check_same_thread=check_same_thread,
+        factory=_Connection,
+        # pooled connections live long enough for the prepared statements of
+        # every request handler to stay cached (the default keeps 128)
+        cached_statements=256,
+        uri=readonly,
+    )
     conn.row_factory = sqlite3.Row
+    conn.executescript(_CONNECTION_PRAGMAS)
+    if not readonly and path not in _wal_paths:
+        conn.execute(_SQL_JOURNAL_WAL)
+        _wal_paths.add(path)
     return conn
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> FrozenSet[str]:
+    """Return the column names of ``table`` (empty if the table is missing).
+
+    On connections from get_connection() the result is cached per connection
+    and re-read only when ``PRAGMA schema_version`` moves, so long-lived pooled
+    connections don't re-scan the schema on every call.
+    """
+    cache = getattr(conn, "columns_cache", None)
+    if cache is not None:
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        hit = cache.get(table)
+        if hit is not None and hit[0] == version:
+            return hit[1]
+    # table_xinfo: table_info leaves out generated columns such as role_code
+    cols = frozenset(row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})"))
+    if cache is not None:
+        cache[table] = (version, cols)
+    return cols
+
+
+def ensure_legacy_indexes(conn: sqlite3.Connection) -> None:
+    """Create the legacy table indexes whose columns exist on this database.
+
+    Idempotent. Importers that rebuild ``giocatori`` (pandas ``to_sql`` with
+    ``if_exists="replace"``) drop more than its indexes and should call
+    ``ensure_legacy_schema`` afterwards instead.
+    """
+    try:
+        cols = table_columns(conn, "giocatori")
+        for name, needed, target in _LEGACY_INDEXES:
+            if needed <= cols:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+        conn.commit()
+    except sqlite3.DatabaseError as e:
+        logging.debug("ensure_legacy_indexes skipped: %s", e)
+
+
+def legacy_schema_ready(conn: sqlite3.Connection) -> bool:
+    """Return True when ``fantateam`` and the applicable legacy indexes exist.
+
+    Catalog lookups only, no DDL: this is what request handling pays on a
+    database prepared by ``flask init-db``.
+    """
+    try:
+        cols = table_columns(conn, "giocatori")
+    except sqlite3.DatabaseError as e:
+        logging.debug("legacy_schema_ready check failed: %s", e)
+        return False
+    if "Costo" in cols and "costo_num" not in cols:
+        return False
+    if "R." in cols and "role_code" not in cols:
+        return False
+    wanted = {"fantateam"} | {
+        name for name, needed, _ in _LEGACY_INDEXES if needed <= cols
+    }
+    if "Costo" in cols:
+        wanted |= {name for name, _ in _COSTO_NUM_TRIGGERS}
+    if "Nome" in cols:
+        wanted |= {SEARCH_TABLE, *_SEARCH_TRIGGERS}
+        wanted |= {NAME_TRIGRAM_TABLE, *_NAME_TRIGRAM_TRIGGERS}
+    marks = ",".join("?" * len(wanted))
+    try:
+        rows = conn.execute(
+            f"SELECT name FROM sqlite_master WHERE name IN ({marks})", tuple(wanted)
+        ).fetchall()
+    except sqlite3.DatabaseError as e:
+        logging.debug("legacy_schema_ready check failed: %s", e)
+        return False
+    return {r[0] for r in rows} == wanted
+
+
+def _ensure_costo_num(conn: sqlite3.Connection) -> None:
+    """Add, backfill and keep in sync the numeric ``costo_num`` column."""
+    cols = table_columns(conn, "giocatori")
+    if "Costo" not in cols:
+        return
+    with txn(conn):
+        if "costo_num" not in cols:
+            conn.execute("ALTER TABLE giocatori ADD COLUMN costo_num REAL")
+            conn.execute(
+                "UPDATE giocatori SET costo_num = %s" % numeric_expr('"Costo"')
+            )
+        for name, event in _COSTO_NUM_TRIGGERS:
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {name} {event}"
+                f" BEGIN {_SQL_SYNC_COSTO_NUM}; END"
+            )
+
+
+def _ensure_role_code(conn: sqlite3.Connection) -> None:
+    """Add the generated ``role_code`` column (virtual, nothing to backfill)."""
+    cols = table_columns(conn, "giocatori")
+    if "R." in cols and "role_code" not in cols:
+        with txn(conn):
+            conn.execute(_SQL_ADD_ROLE_CODE)
+
+
+def _rebuild_fts(conn, table, triggers, columns, tokenize) -> None:
+    """(Re)build an external-content FTS5 mirror of giocatori ``columns``.
+
+    Dropped and rebuilt from scratch, so it also recovers after an importer
+    replaced giocatori (which drops the triggers and changes the rowids).
+    """
+    names = ", ".join(f'"{c}"' for c in columns)
+    new = ", ".join(f'NEW."{c}"' for c in columns)
+    old = ", ".join(f'OLD."{c}"' for c in columns)
+    ins, dele, upd = triggers
+    with txn(conn):
+        for trigger in triggers:
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(
+            f"CREATE VIRTUAL TABLE {table} USING fts5({names},"
+            f" content='giocatori', content_rowid='rowid', tokenize='{tokenize}')"
+        )
+        conn.execute(
+            f"CREATE TRIGGER {ins} AFTER INSERT ON giocatori BEGIN"
+            f" INSERT INTO {table}(rowid, {names}) VALUES (NEW.rowid, {new});"
+            " END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER {dele} AFTER DELETE ON giocatori BEGIN"
+            f" INSERT INTO {table}({table}, rowid, {names})"
+            f" VALUES ('delete', OLD.rowid, {old}); END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER {upd} AFTER UPDATE OF {names} ON giocatori BEGIN"
+            f" INSERT INTO {table}({table}, rowid, {names})"
+            f" VALUES ('delete', OLD.rowid, {old});"
+            f" INSERT INTO {table}(rowid, {names}) VALUES (NEW.rowid, {new});"
+            " END"
+        )
+        conn.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+
+
+def _ensure_search_index(conn: sqlite3.Connection) -> None:
+    """(Re)build the FTS5 search table and the trigram name index."""
+    cols = table_columns(conn, "giocatori")
+    searched = [c for c in _SEARCH_COLUMNS if c in cols]
+    if "Nome" not in searched:
+        return
+    _rebuild_fts(
+        conn,
+        SEARCH_TABLE,
+        _SEARCH_TRIGGERS,
+        searched,
+        "unicode61 remove_diacritics 2",
+    )
+    # the trigram tokenizer needs SQLite 3.34+
+    _rebuild_fts(conn, NAME_TRIGRAM_TABLE, _NAME_TRIGRAM_TRIGGERS, ["Nome"], "trigram")
+
+
+def ensure_legacy_schema(conn: sqlite3.Connection) -> None:
+    """Create or upgrade the legacy tables, triggers and indexes.
+
+    Creates ``fantateam``, adds ``giocatori.costo_num`` with its sync
+    triggers and the generated ``giocatori.role_code``, builds the secondary
+    indexes, the FTS5 search table and the trigram name index. Safe to re-run.
+    """
+    try:
+        conn.execute(SQL_CREATE_FANTATEAM)
+        conn.commit()
+    except sqlite3.DatabaseError as e:
+        logging.debug("ensure_legacy_schema: create fantateam failed: %s", e)
+    try:
+        _ensure_costo_num(conn)
+        _ensure_role_code(conn)
+        conn.commit()
+    except sqlite3.DatabaseError as e:
+        logging.debug("ensure_legacy_schema: costo_num upgrade failed: %s", e)
+    ensure_legacy_indexes(conn)
+    try:
+        _ensure_search_index(conn)
+    except sqlite3.DatabaseError as e:
+        # e.g. SQLite without FTS5 (or, before 3.34, the trigram tokenizer):
+        # the search and the name suggestions keep using LIKE
+        logging.debug("ensure_legacy_schema: search index failed: %s", e)
+
+
+@contextmanager
+def txn(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Run the enclosed statements as one transaction and commit once.
+
+    ``BEGIN IMMEDIATE`` takes the write lock up front, so a read-then-write
+    sequence never fails halfway with SQLITE_BUSY while upgrading from a
+    read lock. Any exception rolls everything back and is re-raised. When the
+    connection is already inside a transaction the block becomes a savepoint
+    of it, so helpers can use ``txn`` whether or not their caller did.
+    """
+    if conn.in_transaction:
+        conn.execute("SAVEPOINT txn")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK TO txn")
+            conn.execute("RELEASE txn")
+            raise
+        conn.execute("RELEASE txn")
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def _close(conn: sqlite3.Connection) -> None:
+    try:
+        # refresh planner statistics for tables this connection queried a lot
+        conn.execute("PRAGMA optimize")
+    except sqlite3.Error as e:
+        logging.debug("PRAGMA optimize failed on close: %s", e)
+    conn.close()
+
+
+def _get_pool(db_path: str, readonly: bool) -> "queue.LifoQueue[sqlite3.Connection]":
+    key = (os.path.abspath(db_path), readonly)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = queue.LifoQueue(maxsize=POOL_SIZE)
+        return pool
+
+
+def _checkout(db_path: str, readonly: bool = False) -> sqlite3.Connection:
+    try:
+        return _get_pool(db_path, readonly).get_nowait()
+    except queue.Empty:
+        # pooled connections move between worker threads
+        conn = get_connection(db_path, check_same_thread=False, readonly=readonly)
+        # autocommit: request code groups its writes explicitly with txn()
+        conn.isolation_level = None
+        return conn
+
+
+def _checkin(db_path: str, conn: sqlite3.Connection, readonly: bool = False) -> None:
+    try:
+        # never hand a half-finished transaction to the next request
+        if conn.in_transaction:
+            conn.rollback()
+        _get_pool(db_path, readonly).put_nowait(conn)
+    except (queue.Full, sqlite3.Error) as e:
+        logging.debug("Closing sqlite connection instead of pooling it: %s", e)
+        _close(conn)
+
+
+def _schema_version(conn: sqlite3.Connection) -> int:
+    # bumped by DDL only, unlike data_version(), which moves on every commit
+    return conn.execute("PRAGMA schema_version").fetchone()[0]
+
+
+def get_db() -> sqlite3.Connection:
+    """Return the sqlite3 connection bound to the current application context.
+
+    The first call in a context checks a connection out of the pool for the
+    configured ``DB_PATH``; later calls return the same handle. GET and HEAD
+    requests get a read-only connection, everything else (and code running
+    outside a request) a writable one. If the database file does not exist
+    yet, reads fall back to a writable connection, which creates it.
+    """
+    conn = g.get("_db")
+    if conn is None:
+        db_path = _resolve_path(current_app.config.get("DB_PATH"))
+        readonly = has_request_context() and request.method in _READ_METHODS
+        try:
+            conn = _checkout(db_path, readonly)
+        except sqlite3.OperationalError as e:
+            if not readonly:
+                raise
+            logging.debug("Read-only open of %s failed, using rw: %s", db_path, e)
+            readonly = False
+            conn = _checkout(db_path)
+        if _schema_checked.get(db_path) != _schema_version(conn):
+            # once per database file and DDL change to it (an importer may have
+            # replaced giocatori, dropping its triggers and indexes); also
+            # switches a new file to WAL. Concurrent requests wait here instead
+            # of racing the upgrade.
+            with _schema_lock:
+                if _schema_checked.get(db_path) != _schema_version(conn):
+                    rw = conn if not readonly else _checkout(db_path)
+                    if not legacy_schema_ready(rw):
+                        ensure_legacy_schema(rw)
+                    _schema_checked[db_path] = _schema_version(rw)
+                    if rw is not conn:
+                        _checkin(db_path, rw)
+        g._db = conn
+        g._db_path = db_path
+        g._db_readonly = readonly
+    return conn
+
+
+def close_db(exc: Optional[BaseException] = None) -> None:
+    """Return the context's connection to its pool (teardown_appcontext hook)."""
+    conn = g.pop("_db", None)
+    db_path = g.pop("_db_path", None)
+    readonly = g.pop("_db_readonly", False)
+    if conn is not None:
+        _checkin(db_path, conn, readonly)
+
+
+def close_pools() -> None:
+    """Close every idle pooled connection (tests, shutdown)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+        # files may be recreated before the next checkout
+        _wal_paths.clear()
+    for pool in pools:
+        while True:
+            try:
+                _close(pool.get_nowait())
+            except queue.Empty:
+                break
+
+
+# closing the idle pooled connections on exit checkpoints the WAL (the last
+# connection to a file also removes -wal/-shm) and stores PRAGMA optimize stats
+atexit.register(close_pools)
+
+
+def bump_data_version() -> None:
+    """Record a write made by this process so data_version() changes at once."""
+    global _local_writes
+    with _local_writes_lock:
+        _local_writes += 1
+
+
+def data_version(db_path: Optional[str] = None) -> tuple:
+    """Return a cheap stamp that changes whenever the legacy database changes.
+
+    Combines this process's write counter with the size and mtime of the
+    database file and its WAL, so commits made by other workers or by scripts
+    produce a new stamp too. Read caches use it as part of their key.
+    """
+    path = _resolve_path(db_path)
+    stamp = [_local_writes]
+    for suffix in ("", "-wal"):
+        try:
+            st = os.stat(path + suffix)
+            stamp += [st.st_mtime_ns, st.st_size]
+        except OSError:
+            stamp += [0, 0]
+    return tuple(stamp)
+
+
+@click.command("init-db")
+@with_appcontext
+def init_db_command() -> None:
+    """Create the legacy sqlite tables and indexes (run once per deployment)."""
+    db_path = _resolve_path(current_app.config.get("DB_PATH"))
+    conn = get_connection(db_path)
+    try:
+        ensure_legacy_schema(conn)
+    finally:
+        conn.close()
+    click.echo(f"Initialized legacy database at {os.path.abspath(db_path)}")
+
+
+def init_app(app) -> None:
+    app.teardown_appcontext(close_db)
+    app.cli.add_command(init_db_command)
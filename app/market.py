@@ -1,135 +1,116 @@
+import base64
+import binascii
+import functools
+import hashlib
+import json
 import logging
+import os
 import sqlite3
 import urllib.parse
+import dataclasses
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 
-from flask import Blueprint, current_app, jsonify, redirect, render_template, request
+from flask import (
+    Blueprint,
+    current_app,
+    jsonify,
+    make_response,
+    redirect,
+    render_template,
+    request,
+    stream_template,
+)
+from markupsafe import Markup
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.db import get_connection
-from app.services.market_service import MarketService
+from app.db import (
+    SEARCH_TABLE,
+    bump_data_version,
+    data_version,
+    escape_like,
+    get_db,
+    numeric_expr,
+)
+from app.services.market_service import (
+    ROLE_BUCKETS,
+    ROSE_ROLES,
+    MarketService,
+    build_team_summary,
+)
+from app.utils.templates import get_template, render_cached
 
 bp = Blueprint("market", __name__)
 
+# MarketService keeps no per-instance state; one instance serves every request
+_MARKET_SVC = MarketService()
 
-@bp.route("/", methods=["GET"])
-def index():
-    DB_PATH = current_app.config.get("DB_PATH")
-    SQUADRE = current_app.config.get("SQUADRE")
-    ROSE_STRUCTURE = current_app.config.get("ROSE_STRUCTURE")
 
-    query = request.args.get("q", "").strip()
-    ruolo = request.args.get("ruolo", "").strip()
-    squadra = request.args.get("squadra", "").strip()
-    roles_selected = request.args.getlist("roles")
-    costo_min = request.args.get("costo_min", "").strip()
-    costo_max = request.args.get("costo_max", "").strip()
-    opzione = request.args.get("opzione", "").strip()
-    anni_contratto = request.args.get("anni_contratto", "").strip()
-    page = int(request.args.get("page", 1))
-    per_page = 50
+@functools.lru_cache(maxsize=256)
+def _cached_fetchall(db_path, version, sql, params):
+    return get_db().execute(sql, params).fetchall()
 
-    conn = get_connection(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("PRAGMA table_info(giocatori)")
-    columns_info = cur.fetchall()
-    columns = [row["name"] for row in columns_info]
-    if "#" in columns:
-        columns = [c for c in columns if c != "#"]
-    for hide_col in ["Fuori lista", "Under", "R.MANTRA", "FVM/1000"]:
-        if hide_col in columns:
-            columns = [c for c in columns if c != hide_col]
-    safe_columns = []
-    for col in columns:
-        if col.replace("_", "").isalnum():
-            safe_columns.append(col)
-    if not safe_columns:
-        safe_columns = columns
 
-    sql = "SELECT rowid AS id, * FROM giocatori WHERE 1=1"
-    params = []
-    if query:
-        like = f"%{query}%"
-        where = " OR ".join([f'"{col}" LIKE ?' for col in safe_columns])
-        sql += f" AND ({where})"
-        params += [like] * len(safe_columns)
-    if ruolo:
-        sql += " AND ruolo LIKE ?"
-        params.append(f"%{ruolo}%")
-    role_map = {
-        "Portieri": ["P"],
-        "Difensori": ["D"],
-        "Centrocampisti": ["C"],
-        "Attaccanti": ["A"],
-    }
-    if not roles_selected:
-        roles_selected = list(role_map.keys())
-    codes = []
-    for rcat in roles_selected:
-        codes += role_map.get(rcat, [])
-    if codes:
-        role_where = " OR ".join(['"R." LIKE ?' for _ in codes])
-        sql += f" AND ({role_where})"
-        params += [f"{c}%" for c in codes]
-    else:
-        sql += " AND 0"
-    if squadra:
-        sql += " AND squadra LIKE ?"
-        params.append(f"%{squadra}%")
-    if costo_min:
-        sql += " AND costo >= ?"
-        params.append(costo_min)
-    if costo_max:
-        sql += " AND costo <= ?"
-        params.append(costo_max)
-    if opzione:
-        sql += " AND opzione LIKE ?"
-        params.append(f"%{opzione}%")
-    if anni_contratto:
-        sql += " AND anni_contratto = ?"
-        params.append(anni_contratto)
+def _fetchall_cached(sql, params):
+    """Run a read-only query through a per-process result cache.
 
-    count_sql = "SELECT COUNT(*) FROM giocatori WHERE 1=1"
-    count_params = []
-    if query:
-        like = f"%{query}%"
-        where = " OR ".join([f'"{col}" LIKE ?' for col in safe_columns])
-        count_sql += f" AND ({where})"
-        count_params += [like] * len(safe_columns)
-    if ruolo:
-        count_sql += " AND ruolo LIKE ?"
-        count_params.append(f"%{ruolo}%")
-    if squadra:
-        count_sql += " AND squadra LIKE ?"
-        count_params.append(f"%{squadra}%")
-    if costo_min:
-        count_sql += " AND costo >= ?"
-        count_params.append(costo_min)
-    if costo_max:
-        count_sql += " AND costo <= ?"
-        count_params.append(costo_max)
-    if opzione:
-        count_sql += " AND opzione LIKE ?"
-        count_params.append(f"%{opzione}%")
-    if anni_contratto:
-        count_sql += " AND anni_contratto = ?"
-        count_params.append(anni_contratto)
-    if not roles_selected:
-        roles_selected = list(role_map.keys())
-    codes = []
-    for rcat in roles_selected:
-        codes += role_map.get(rcat, [])
-    if codes:
-        role_where = " OR ".join(['"R." LIKE ?' for _ in codes])
-        count_sql += f" AND ({role_where})"
-        count_params += [f"{c}%" for c in codes]
-    else:
-        count_sql += " AND 0"
-    cur.execute(count_sql, count_params)
-    total = cur.fetchone()[0]
+    The key includes data_version(), so any committed write (here, in another
+    worker or from a script) makes later calls hit the database again.
+    """
+    db_path = current_app.config.get("DB_PATH")
+    return _cached_fetchall(db_path, data_version(db_path), sql, tuple(params))
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_team_summaries(db_path, version, squadre, rose_items):
+    return tuple(_MARKET_SVC.get_team_summaries(get_db(), squadre, dict(rose_items)))
+
+
+# giocatori columns never shown in the search table (costo_num and role_code
+# are derived from Costo and R., see app.db)
+_HIDDEN_COLUMNS = frozenset(
+    {"#", "Fuori lista", "Under", "R.MANTRA", "FVM/1000", "costo_num", "role_code"}
+)
+
+
+@dataclass(frozen=True)
+class _GiocatoriSchema:
+    """Search-table metadata derived from the giocatori columns."""
+
+    columns: Tuple[str, ...]
+    safe_columns: Tuple[str, ...]
+    name_col: str
+    allowed_sorts: Dict[str, str]
+    display_to_sortkey: Dict[str, str]
+    quot_col: Optional[str]
+    # numeric sort key -> SQL expression ordering it
+    numeric_sorts: Dict[str, str]
+    # the FTS5 search table (app.db.SEARCH_TABLE) exists
+    fts: bool = False
+    # the generated role_code column (app.db) exists
+    role_code: bool = False
 
-    # Sorting
-    sort_by = request.args.get("sort_by", "").strip()
-    sort_dir = request.args.get("sort_dir", "asc").lower()
+
+def _has_numeric_affinity(declared_type: str) -> bool:
+    """True when SQLite gives a column of ``declared_type`` numeric affinity.
+
+    Such columns (e.g. the INTEGER/REAL ones pandas creates on import) already
+    hold numbers, so they sort as they are instead of through numeric_expr().
+    """
+    t = (declared_type or "").upper()
+    if "INT" in t:
+        return True
+    if any(k in t for k in ("CHAR", "CLOB", "TEXT")) or not t or "BLOB" in t:
+        return False
+    return True
+
+
+def _build_giocatori_schema(all_columns, numeric_columns=()) -> _GiocatoriSchema:
+    all_columns = tuple(all_columns)
+    columns = tuple(c for c in all_columns if c not in _HIDDEN_COLUMNS)
+    safe_columns = tuple(c for c in columns if c.replace("_", "").isalnum())
+    if not safe_columns:
+        safe_columns = columns
 
     def q(colname):
         return f'"{colname}"'
@@ -166,18 +147,361 @@ def index():
         ):
             allowed_sorts.setdefault("pgv", q(c))
 
+    display_to_sortkey = {}
+    if "Nome" in columns and "nome" in allowed_sorts:
+        display_to_sortkey["Nome"] = "nome"
+    if "Sq." in columns and "sq" in allowed_sorts:
+        display_to_sortkey["Sq."] = "sq"
+    if "FantaSquadra" in columns and "fantasquadra" in allowed_sorts:
+        display_to_sortkey["FantaSquadra"] = "fantasquadra"
+    for k, expr in allowed_sorts.items():
+        display_to_sortkey[expr.strip('"')] = k
+
+    numeric_sorts = {
+        k: (
+            allowed_sorts[k]
+            if allowed_sorts[k].strip('"') in numeric_columns
+            else numeric_expr(allowed_sorts[k])
+        )
+        for k in ("mv", "fm", "quot", "pgv", "costo")
+        if k in allowed_sorts
+    }
+    if allowed_sorts.get("costo") == '"Costo"' and "costo_num" in all_columns:
+        # stored copy of numeric_expr("Costo"), indexed
+        numeric_sorts["costo"] = '"costo_num"'
+
+    return _GiocatoriSchema(
+        columns=columns,
+        safe_columns=safe_columns,
+        # column holding the player name, looked up once instead of per row
+        name_col=next((c for c in ("Nome", "nome") if c in columns), "id"),
+        allowed_sorts=allowed_sorts,
+        display_to_sortkey=display_to_sortkey,
+        quot_col=quot_col,
+        numeric_sorts=numeric_sorts,
+        role_code="role_code" in all_columns,
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_giocatori_schema(db_path, version):
+    conn = get_db()
+    cur = conn.execute("PRAGMA table_xinfo(giocatori)")
+    info = cur.fetchall()
+    schema = _build_giocatori_schema(
+        (row[1] for row in info),
+        {row[1] for row in info if _has_numeric_affinity(row[2])},
+    )
+    fts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (SEARCH_TABLE,)
+    ).fetchone()
+    return dataclasses.replace(schema, fts=fts is not None)
+
+
+def _giocatori_schema() -> _GiocatoriSchema:
+    """Return the search-table metadata, rebuilt only after the database changes.
+
+    Keyed on data_version() like the query cache, so importers that rebuild
+    giocatori are picked up without an explicit invalidation. Callers must not
+    mutate the shared dicts.
+    """
+    db_path = current_app.config.get("DB_PATH")
+    return _cached_giocatori_schema(db_path, data_version(db_path))
+
+
+def _fts_prefix_query(text: str) -> str:
+    """FTS5 MATCH expression: every word of ``text`` as a quoted token prefix."""
+    return " ".join('"%s"*' % word.replace('"', '""') for word in text.split())
+
+
+def _match_operator(value: str) -> Tuple[str, str]:
+    """Return ``(operator, parameter)`` filtering a column by a user value.
+
+    Plain values match exactly (``=``), so the column's index can be used.
+    Values with ``%``/``_`` keep LIKE semantics; with no ``%`` at all they
+    only match as a prefix. Only a ``%`` typed by the user makes it a
+    contains search.
+    """
+    if "%" not in value and "_" not in value:
+        return "=", value
+    return "LIKE", value if "%" in value else value + "%"
+
+
+def _encode_cursor(values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(token: str, n_keys: int):
+    """Decode a pagination cursor; None if it is malformed or for other keys."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != n_keys:
+        return None
+    return values
+
+
+def _seek_clause(keys, values, forward=True):
+    """Build the keyset predicate for rows after (or before) ``values``.
+
+    ``keys`` are ``(expression, descending)`` pairs in ORDER BY order. NULLs
+    sort first ascending and last descending, as in SQLite, so they are
+    compared explicitly instead of through ``>``/``<``.
+    """
+    terms = []
+    params = []
+    equal = []
+    equal_params = []
+    for (expr, desc), value in zip(keys, values):
+        later = desc != forward  # rows that come later have a larger key
+        if value is None:
+            term, term_params = (f"{expr} IS NOT NULL", []) if later else (None, [])
+        elif later:
+            term, term_params = f"{expr} > ?", [value]
+        else:
+            term, term_params = f"({expr} < ? OR {expr} IS NULL)", [value]
+        if term:
+            terms.append(" AND ".join(equal + [term]))
+            params += equal_params + term_params
+        if value is None:
+            equal.append(f"{expr} IS NULL")
+        else:
+            equal.append(f"{expr} = ?")
+            equal_params.append(value)
+    if not terms:
+        return " AND 0", []
+    return " AND (" + " OR ".join(f"({t})" for t in terms) + ")", params
+
+
+def _assets_stamp():
+    """Newest mtime under the template and static folders, read once per app."""
+    stamp = current_app.extensions.get("market_assets_stamp")
+    if stamp is None:
+        stamp = 0
+        for folder in (current_app.template_folder, current_app.static_folder):
+            for root, _dirs, files in os.walk(folder or ""):
+                for name in files:
+                    stamp = max(stamp, os.stat(os.path.join(root, name)).st_mtime_ns)
+        current_app.extensions["market_assets_stamp"] = stamp
+    return stamp
+
+
+def _pages_version():
+    """Stamp of everything the market pages render, or None if not cheaply known.
+
+    The pages read the legacy sqlite file and, when it has data, the ORM
+    database; a non-sqlite ORM backend has no file stamp to compare.
+    """
+    orm_version = ()
+    engine = current_app.extensions.get("db_engine")
+    if engine is not None:
+        if engine.dialect.name != "sqlite":
+            return None
+        if engine.url.database and engine.url.database != ":memory:":
+            orm_version = data_version(engine.url.database)
+    return (
+        data_version(current_app.config.get("DB_PATH")),
+        orm_version,
+        _assets_stamp(),
+    )
+
+
+def _conditional(view):
+    """Answer GETs with 304 Not Modified while the underlying data is unchanged.
+
+    The weak ETag covers the data version and the full request path, so the
+    JS refreshes after a save or a header sort skip the query and render
+    entirely when nothing changed.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        # the first connection to a file may still switch it to WAL and add
+        # the legacy indexes; do that before taking the stamp
+        get_db()
+        version = _pages_version()
+        if version is None:
+            return view(*args, **kwargs)
+        etag = hashlib.sha1(repr((version, request.full_path)).encode()).hexdigest()[
+            :20
+        ]
+        if request.if_none_match.contains_weak(etag):
+            resp = make_response("", 304)
+        else:
+            resp = make_response(view(*args, **kwargs))
+        resp.set_etag(etag, weak=True)
+        # let browsers keep the copy but always revalidate it
+        resp.cache_control.no_cache = True
+        return resp
+
+    return wrapper
+
+
+@functools.lru_cache(maxsize=512)
+def _search_sql(filters, safe_columns, role_code, keys, seek_mask, forward):
+    """Build the SQL of one search shape: ``(page_sql, count_sql, seek_slots)``.
+
+    ``filters`` says which filters are present (and how they match), not
+    their values, so requests differing only in bound values reuse the same
+    strings (and SQLite's prepared statements). ``seek_mask`` holds the cursor
+    position of each non-NULL cursor value (``None`` for NULLs), or is
+    ``None`` without a cursor; ``seek_slots`` lists the cursor positions to
+    bind after the filter parameters.
+    """
+    text_mode, ruolo_op, n_codes, squadra_op, has_min, has_max, opzione_op, has_anni = (
+        filters
+    )
+    where_sql = " WHERE 1=1"
+    if text_mode == "prefix":
+        # too short for a useful token prefix: anchored, index-backed name match
+        where_sql += " AND \"Nome\" LIKE ? ESCAPE '\\'"
+    elif text_mode == "fts":
+        where_sql += (
+            f" AND rowid IN (SELECT rowid FROM {SEARCH_TABLE}"
+            f" WHERE {SEARCH_TABLE} MATCH ?)"
+        )
+    elif text_mode == "like":
+        where = " OR ".join([f'"{col}" LIKE ?' for col in safe_columns])
+        where_sql += f" AND ({where})"
+    if ruolo_op:
+        where_sql += f" AND ruolo {ruolo_op} ?"
+    if n_codes and role_code:
+        where_sql += f" AND role_code IN ({','.join('?' * n_codes)})"
+    elif n_codes:
+        role_where = " OR ".join(['"R." LIKE ?'] * n_codes)
+        where_sql += f" AND ({role_where})"
+    else:
+        where_sql += " AND 0"
+    if squadra_op:
+        where_sql += f" AND squadra {squadra_op} ?"
+    if has_min:
+        where_sql += " AND costo >= ?"
+    if has_max:
+        where_sql += " AND costo <= ?"
+    if opzione_op:
+        where_sql += f" AND opzione {opzione_op} ?"
+    if has_anni:
+        where_sql += " AND anni_contratto = ?"
+
+    # seek and order on the key expressions themselves, so the NOCASE Nome,
+    # costo_num and rowid indexes can serve the range seek
+    seek_sql, seek_slots = "", ()
+    if seek_mask is not None:
+        seek_sql, slots = _seek_clause(keys, seek_mask, forward)
+        seek_slots = tuple(slots)
+    key_cols = "".join(f", {expr} AS _k{i}" for i, (expr, _) in enumerate(keys))
+    order_sql = ", ".join(
+        f"{expr} {'DESC' if desc == forward else 'ASC'}" for expr, desc in keys
+    )
+    page_sql = (
+        f"SELECT rowid AS id, *{key_cols} FROM giocatori{where_sql}{seek_sql}"
+        f" ORDER BY {order_sql} LIMIT ?"
+    )
+    return page_sql, "SELECT COUNT(*) FROM giocatori" + where_sql, seek_slots
+
+
+def _search():
+    """Run the player search described by ``request.args``.
+
+    Returns the template context shared by the index page and the
+    players-table fragment.
+    """
+    query = request.args.get("q", "").strip()
+    ruolo = request.args.get("ruolo", "").strip()
+    squadra = request.args.get("squadra", "").strip()
+    roles_selected = request.args.getlist("roles")
+    costo_min = request.args.get("costo_min", "").strip()
+    costo_max = request.args.get("costo_max", "").strip()
+    opzione = request.args.get("opzione", "").strip()
+    anni_contratto = request.args.get("anni_contratto", "").strip()
+    # page is only a display counter carried along the cursor links
+    try:
+        page = max(1, int(request.args.get("page", 1)))
+    except ValueError:
+        page = 1
+    per_page = 50
+
+    schema = _giocatori_schema()
+    columns = schema.columns
+    safe_columns = schema.safe_columns
+    allowed_sorts = schema.allowed_sorts
+
+    # filter parameters, in the order _search_sql() places their clauses
+    params = []
+    text_mode = None
+    if query and schema.fts and len(query) < 2:
+        text_mode = "prefix"
+        params.append(escape_like(query) + "%")
+    elif query and schema.fts:
+        text_mode = "fts"
+        params.append(_fts_prefix_query(query))
+    elif query:
+        text_mode = "like"
+        params += [f"%{query}%"] * len(safe_columns)
+    ruolo_op = None
+    if ruolo:
+        ruolo_op, value = _match_operator(ruolo)
+        params.append(value)
+    role_map = {
+        "Portieri": ["P"],
+        "Difensori": ["D"],
+        "Centrocampisti": ["C"],
+        "Attaccanti": ["A"],
+    }
+    if not roles_selected:
+        roles_selected = list(role_map.keys())
+    codes = []
+    for rcat in roles_selected:
+        codes += role_map.get(rcat, [])
+    params += codes if schema.role_code else [f"{c}%" for c in codes]
+    squadra_op = None
+    if squadra:
+        squadra_op, value = _match_operator(squadra)
+        params.append(value)
+    if costo_min:
+        params.append(costo_min)
+    if costo_max:
+        params.append(costo_max)
+    opzione_op = None
+    if opzione:
+        opzione_op, value = _match_operator(opzione)
+        params.append(value)
+    if anni_contratto:
+        params.append(anni_contratto)
+    filters = (
+        text_mode,
+        ruolo_op,
+        len(codes),
+        squadra_op,
+        bool(costo_min),
+        bool(costo_max),
+        opzione_op,
+        bool(anni_contratto),
+    )
+
+    # Sorting
+    sort_by = request.args.get("sort_by", "").strip()
+    sort_dir = request.args.get("sort_dir", "asc").lower()
+
     base_args = request.args.to_dict(flat=False)
     base_args.pop("sort_by", None)
     base_args.pop("sort_dir", None)
+    # a new sort order starts again from the first page
+    for arg in ("page", "after", "before"):
+        base_args.pop(arg, None)
+    # the other arguments are encoded once; each link only appends its sort
+    base_qs = urllib.parse.urlencode(base_args, doseq=True)
+    prefix = "?" + base_qs + "&" if base_qs else "?"
     sort_links = {}
     for key in allowed_sorts.keys():
-        a = dict(base_args)
-        a["sort_by"] = key
-        a["sort_dir"] = "asc"
-        asc_q = urllib.parse.urlencode(a, doseq=True)
-        a["sort_dir"] = "desc"
-        desc_q = urllib.parse.urlencode(a, doseq=True)
-        sort_links[key] = {"asc": "?" + asc_q, "desc": "?" + desc_q}
+        sort_q = prefix + "sort_by=" + urllib.parse.quote_plus(key)
+        sort_links[key] = {
+            "asc": sort_q + "&sort_dir=asc",
+            "desc": sort_q + "&sort_dir=desc",
+        }
     header_toggle_links = {}
     active_sort_key = sort_by
     active_sort_dir = sort_dir
@@ -187,126 +511,147 @@ def index():
         else:
             header_toggle_links[k] = sort_links[k]["asc"]
 
-    display_to_sortkey = {}
-    if "Nome" in columns and "nome" in allowed_sorts:
-        display_to_sortkey["Nome"] = "nome"
-    if "Sq." in columns and "sq" in allowed_sorts:
-        display_to_sortkey["Sq."] = "sq"
-    if "FantaSquadra" in columns and "fantasquadra" in allowed_sorts:
-        display_to_sortkey["FantaSquadra"] = "fantasquadra"
-    for k, expr in allowed_sorts.items():
-        colname = expr.strip('"')
-        display_to_sortkey[colname] = k
+    # Keyset pagination: rows are ordered by (sort key, Nome, rowid) and a page
+    # starts right after (or before) the key of the last (first) row shown, so
+    # deep pages are an index seek instead of skipping OFFSET rows.
+    keys = []
     if sort_by in allowed_sorts:
-        direction = "ASC" if sort_dir != "desc" else "DESC"
-        if sort_by in ("mv", "fm", "quot", "pgv", "costo"):
-            clean = f"REPLACE(REPLACE(REPLACE(REPLACE({allowed_sorts[sort_by]}, ',', ''), '%', ''), '€', ''), ' ', '')"
-            order_expr = f"CAST({clean} AS REAL) {direction}"
+        if sort_by in schema.numeric_sorts:
+            keys.append((schema.numeric_sorts[sort_by], sort_dir == "desc"))
         else:
-            order_expr = f"{allowed_sorts[sort_by]} COLLATE NOCASE {direction}"
+            keys.append(
+                (f"{allowed_sorts[sort_by]} COLLATE NOCASE", sort_dir == "desc")
+            )
         if "Nome" in columns:
-            order_expr = f"{order_expr}, {q('Nome')} COLLATE NOCASE ASC"
-        sql = sql.rstrip()
-        sql += f" ORDER BY {order_expr}"
+            keys.append(('"Nome" COLLATE NOCASE', False))
+    keys.append(("rowid", False))
 
-    offset = (page - 1) * per_page
-    sql += f" LIMIT {per_page} OFFSET {offset}"
-    cur.execute(sql, params)
-    results = cur.fetchall()
-    conn.close()
+    after = _decode_cursor(request.args.get("after", ""), len(keys))
+    before = None
+    if after is None:
+        before = _decode_cursor(request.args.get("before", ""), len(keys))
+    forward = before is None
+    cursor_values = after or before
+    seek_mask = None
+    if cursor_values is not None:
+        seek_mask = tuple(None if v is None else i for i, v in enumerate(cursor_values))
 
-    suggestions = []
-    if query and len(query) >= 2 and len(results) < 5:
-        try:
-            conn = get_connection(DB_PATH)
-            svc = MarketService()
-            suggestion_results = svc.get_name_suggestions(conn, query, limit=8)
-            for name in suggestion_results:
-                if (
-                    not any(
-                        r.get("Nome") == name for r in results if "Nome" in r.keys()
-                    )
-                    and name.lower() != query.lower()
-                ):
-                    suggestions.append(name)
-            conn.close()
-        except (sqlite3.DatabaseError, ValueError, TypeError) as e:
-            logging.exception("Failed to build name suggestions: %s", e)
-            suggestions = []
+    page_sql, count_sql, seek_slots = _search_sql(
+        filters, safe_columns, schema.role_code, tuple(keys), seek_mask, forward
+    )
+    seek_params = [cursor_values[i] for i in seek_slots]
+    rows = _fetchall_cached(page_sql, params + seek_params + [per_page + 1])
+    # the count does not depend on the cursor, so once per filter set and
+    # data_version() it comes from the query cache
+    total = _fetchall_cached(count_sql, params)[0][0]
+    more = len(rows) > per_page
+    results = rows[:per_page]
+    if not forward:
+        results = results[::-1]
+
+    def cursor(row):
+        return _encode_cursor(row[f"_k{i}"] for i in range(len(keys)))
+
+    page_args = dict(base_args)
+    if sort_by:
+        page_args.update(sort_by=[sort_by], sort_dir=[sort_dir])
+    page_links = {}
+    has_prev = more if not forward else after is not None
+    has_next = more if forward else True
+    if results and has_prev:
+        prev_args = dict(page_args, before=[cursor(results[0])])
+        prev_args["page"] = [str(max(1, page - 1))]
+        page_links["prev"] = "?" + urllib.parse.urlencode(prev_args, doseq=True)
+    if results and has_next:
+        next_args = dict(page_args, after=[cursor(results[-1])])
+        next_args["page"] = [str(page + 1)]
+        page_links["next"] = "?" + urllib.parse.urlencode(next_args, doseq=True)
+    return {
+        "columns": columns,
+        "results": results,
+        "query": query,
+        "ruolo": ruolo,
+        "squadra": squadra,
+        "costo_min": costo_min,
+        "costo_max": costo_max,
+        "opzione": opzione,
+        "anni_contratto": anni_contratto,
+        "page": page,
+        "per_page": per_page,
+        "page_links": page_links,
+        "name_col": schema.name_col,
+        "total": total,
+        "roles_selected": roles_selected,
+        "allowed_sorts": allowed_sorts,
+        "quot_col": schema.quot_col,
+        "sort_links": sort_links,
+        "display_to_sortkey": schema.display_to_sortkey,
+        "header_toggle_links": header_toggle_links,
+    }
+
+
+def _team_summaries():
+    """Return ``(team_casse, team_casse_missing)`` for the team cash boxes.
 
-    # compute team summaries: prefer ORM if available, otherwise fall back to sqlite3
+    Prefers the ORM when available and falls back to the sqlite tables.
+    """
+    SQUADRE = current_app.config.get("SQUADRE")
+    ROSE_STRUCTURE = current_app.config.get("ROSE_STRUCTURE")
     team_casse = []
     try:
         SessionLocal = current_app.extensions.get("db_session_factory")
         if SessionLocal:
             session = SessionLocal()
             try:
+                from sqlalchemy import func
+
+                from app.utils.team_utils import resolve_teams_by_alias
+
                 from .models import Player
 
+                targets = tuple(ROSE_STRUCTURE.get(role, 0) for role in ROSE_ROLES)
+                teams = resolve_teams_by_alias(session, SQUADRE)
+                # spend and role counts of every resolved team in one grouped
+                # query instead of loading each team's players
+                spent_by_id = {}
+                counts_by_id = {}
+                if teams:
+                    rows = (
+                        session.query(
+                            Player.team_id,
+                            func.substr(Player.role, 1, 1),
+                            func.count(),
+                            func.coalesce(func.sum(Player.costo), 0),
+                        )
+                        .filter(Player.team_id.in_({t.id for t in teams.values()}))
+                        .group_by(Player.team_id, func.substr(Player.role, 1, 1))
+                    )
+                    for team_id, letter, n, spent in rows:
+                        spent = float(spent) + spent_by_id.get(team_id, 0.0)
+                        spent_by_id[team_id] = spent
+                        bucket = ROLE_BUCKETS.get(letter or "")
+                        if bucket:
+                            counts = counts_by_id.setdefault(
+                                team_id, dict.fromkeys("PDCA", 0)
+                            )
+                            counts[bucket[1]] += n
                 for s in SQUADRE:
-                    from app.utils.team_utils import resolve_team_by_alias
-
-                    team_obj = resolve_team_by_alias(session, s)
+                    team_obj = teams.get(s)
                     starting = (
                         float(team_obj.cash)
                         if team_obj and team_obj.cash is not None
                         else 300.0
                     )
-                    # sum costs of players assigned to this team
-                    spent = 0.0
-                    counts = {}
-                    players = []
-                    if team_obj:
-                        players = team_obj.players
-                    else:
-                        # no Team row, try to find Player.team by name match
-                        players = (
-                            session.query(Player)
-                            .filter(Player.team_id.isnot(None))
-                            .all()
-                        )
-                        players = [p for p in players if p.team and p.team.name == s]
-                    for p in players:
-                        # p may not have a numeric cost field in ORM model; ignore cost unless custom attribute exists
-                        try:
-                            costo_val = float(getattr(p, "costo", 0) or 0)
-                        except (ValueError, TypeError):
-                            costo_val = 0.0
-                        spent += costo_val
-                        rcode = (p.role or "")[:1].upper() if p.role else ""
-                        # normalize legacy goalkeeper code 'G' to 'P'
-                        if rcode == "G":
-                            rcode = "P"
-                        counts[rcode] = counts.get(rcode, 0) + 1
-                    portieri_count = int(counts.get("P", 0)) + int(counts.get("G", 0))
-                    dif_count = int(counts.get("D", 0))
-                    cen_count = int(counts.get("C", 0))
-                    att_count = int(counts.get("A", 0))
-                    missing_portieri = max(
-                        0, ROSE_STRUCTURE.get("Portieri", 0) - portieri_count
-                    )
-                    missing_dif = max(0, ROSE_STRUCTURE.get("Difensori", 0) - dif_count)
-                    missing_cen = max(
-                        0, ROSE_STRUCTURE.get("Centrocampisti", 0) - cen_count
-                    )
-                    missing_att = max(
-                        0, ROSE_STRUCTURE.get("Attaccanti", 0) - att_count
-                    )
-                    missing_total = (
-                        missing_portieri + missing_dif + missing_cen + missing_att
-                    )
+                    team_id = team_obj.id if team_obj else None
+                    counts = counts_by_id.get(team_id) or dict.fromkeys("PDCA", 0)
                     team_casse.append(
-                        {
-                            "squadra": s,
-                            "starting": starting,
-                            "spent": spent,
-                            "remaining": starting - spent,
-                            "missing": missing_total,
-                            "missing_portieri": missing_portieri,
-                            "missing_dif": missing_dif,
-                            "missing_cen": missing_cen,
-                            "missing_att": missing_att,
-                        }
+                        build_team_summary(
+                            s,
+                            starting,
+                            spent_by_id.get(team_id, 0.0),
+                            tuple(counts.values()),
+                            targets,
+                        )
                     )
             finally:
                 session.close()
@@ -316,90 +661,161 @@ def index():
 
     if not team_casse:
         try:
-            conn = get_connection(DB_PATH)
-            svc = MarketService()
-            team_casse = svc.get_team_summaries(conn, SQUADRE, ROSE_STRUCTURE)
-            conn.close()
+            db_path = current_app.config.get("DB_PATH")
+            team_casse = list(
+                _cached_team_summaries(
+                    db_path,
+                    data_version(db_path),
+                    current_app.config["SQUADRE_TUPLE"],
+                    current_app.config["ROSE_STRUCTURE_ITEMS"],
+                )
+            )
         except (sqlite3.DatabaseError, ValueError, TypeError) as e:
             logging.exception("Service get_team_summaries failed: %s", e)
             team_casse = []
     team_casse.sort(key=lambda x: x["remaining"], reverse=True)
     team_casse_missing = sorted(team_casse, key=lambda x: x["missing"])
 
+    return team_casse, team_casse_missing
+
+
+def _team_cash_html():
+    """Rendered team cash boxes, reused until the data version changes."""
+
+    def context():
+        team_casse, team_casse_missing = _team_summaries()
+        return {"team_casse": team_casse, "team_casse_missing": team_casse_missing}
+
+    version = _pages_version()
+    if version is None:
+        return Markup(get_template("partials/team_cash.html").render(**context()))
+    return render_cached("partials/team_cash.html", version, context)
+
+
+# search filters besides the text query (see _search)
+_FILTER_ARGS = (
+    "ruolo",
+    "squadra",
+    "costo_min",
+    "costo_max",
+    "opzione",
+    "anni_contratto",
+)
+
+
+@bp.route("/", methods=["GET"])
+@_conditional
+def index():
+    ctx = _search()
+    query = ctx["query"]
+    results = ctx["results"]
+
+    suggestions = []
+    # "did you mean" only helps a plain name search on its first page
+    filtered = any(ctx[arg] for arg in _FILTER_ARGS)
+    if (
+        query
+        and len(query) >= 2
+        and len(results) < 5
+        and ctx["page"] == 1
+        and not filtered
+    ):
+        try:
+            suggestion_results = _MARKET_SVC.get_name_suggestions(
+                get_db(), query, limit=8
+            )
+            name_col = ctx["name_col"]
+            shown = {r[name_col] for r in results}
+            for name in suggestion_results:
+                if name not in shown and name.lower() != query.lower():
+                    suggestions.append(name)
+        except (sqlite3.DatabaseError, ValueError, TypeError) as e:
+            logging.exception("Failed to build name suggestions: %s", e)
+            suggestions = []
+
     # pagination HTML handled in template; provide necessary context
     return render_template(
-        "index.html",
-        columns=columns,
-        results=results,
+        get_template("index.html"),
         suggestions=suggestions,
-        query=query,
-        ruolo=ruolo,
-        squadra=squadra,
-        costo_min=costo_min,
-        costo_max=costo_max,
-        opzione=opzione,
-        anni_contratto=anni_contratto,
-        page=page,
-        per_page=per_page,
-        total=total,
         request=request,
-        squadre=SQUADRE,
-        roles_selected=roles_selected,
-        allowed_sorts=allowed_sorts,
-        quot_col=quot_col,
-        sort_links=sort_links,
-        display_to_sortkey=display_to_sortkey,
-        header_toggle_links=header_toggle_links,
-        team_casse=team_casse,
-        team_casse_missing=team_casse_missing,
+        team_cash_html=_team_cash_html(),
+        **ctx,
     )
 
 
+@bp.route("/players_table", methods=["GET"])
+@_conditional
+def players_table():
+    """Players table fragment for the index page, same query string as ``/``."""
+    return render_template(get_template("partials/players_table.html"), **_search())
+
+
+@bp.route("/api/team_cash", methods=["GET"])
+@_conditional
+def api_team_cash():
+    """Team cash and missing-player summaries as JSON, in display order."""
+    team_casse, team_casse_missing = _team_summaries()
+    return jsonify({"team_casse": team_casse, "team_casse_missing": team_casse_missing})
+
+
 @bp.route("/assegna_giocatore", methods=["POST"])
 def assegna_giocatore():
-    DB_PATH = current_app.config.get("DB_PATH")
     id = request.form.get("id")
     squadra = request.form.get("squadra")
     costo = request.form.get("costo")
     anni_contratto = request.form.get("anni_contratto")
     opzione = "SI" if request.form.get("opzione") == "on" else "NO"
-    service = MarketService()
     # re-use service validation; keep canonical team check from app config
-    error_msg = service.validate_player_assignment(id, squadra, costo, anni_contratto)
-    if squadra and squadra not in current_app.config.get("SQUADRE"):
+    error_msg = _MARKET_SVC.validate_player_assignment(
+        id, squadra, costo, anni_contratto
+    )
+    if squadra and squadra not in current_app.config["SQUADRE_SET"]:
         error_msg = "Squadra selezionata non valida."
     if error_msg:
         return (error_msg, 400)
 
-    conn = get_connection(DB_PATH)
-    try:
-        res = service.assign_player(conn, id, squadra, costo, anni_contratto, opzione)
-        if not res.get("success"):
-            avail = res.get("available")
-            if avail is None:
-                avail = 300.0
-            needed = 0.0
-            try:
-                needed = (
-                    float(str(costo).replace(",", "").replace("€", "").strip())
-                    if costo not in (None, "")
-                    else 0.0
-                )
-            except (ValueError, TypeError):
-                needed = 0.0
-            return (
-                f"Fondi insufficienti per assegnare (costo: {needed} > disponibile: {avail}).",
-                400,
+    res = _MARKET_SVC.assign_player(
+        get_db(), id, squadra, costo, anni_contratto, opzione
+    )
+    bump_data_version()
+    if not res.get("success"):
+        avail = res.get("available")
+        if avail is None:
+            avail = 300.0
+        needed = 0.0
+        try:
+            needed = (
+                float(str(costo).replace(",", "").replace("€", "").strip())
+                if costo not in (None, "")
+                else 0.0
             )
-    finally:
-        conn.close()
+        except (ValueError, TypeError):
+            needed = 0.0
+        return (
+            f"Fondi insufficienti per assegnare (costo: {needed} > disponibile: {avail}).",
+            400,
+        )
 
+    if request.accept_mimetypes.best == "application/json":
+        # the index page's assign dialog: answer with the refreshed team cash
+        # boxes and players table (for the search in the query string) instead
+        # of redirecting it into a full page render it discards
+        team_casse, team_casse_missing = _team_summaries()
+        players_html = render_template(
+            get_template("partials/players_table.html"), **_search()
+        )
+        return jsonify(
+            {
+                "team_casse": team_casse,
+                "team_casse_missing": team_casse_missing,
+                "players_html": players_html,
+            }
+        )
     return redirect("/")
 
 
 @bp.route("/update_player", methods=["POST"])
 def update_player():
-    DB_PATH = current_app.config.get("DB_PATH")
     data = request.get_json() or {}
     pid = data.get("id")
     squadra = data.get("squadra")
@@ -409,7 +825,7 @@ def update_player():
     error_msg = None
     if not pid or not str(pid).isdigit():
         error_msg = "ID giocatore non valido."
-    if squadra and squadra not in current_app.config.get("SQUADRE"):
+    if squadra and squadra not in current_app.config["SQUADRE_SET"]:
         error_msg = "Squadra selezionata non valida."
     try:
         costo_val = (
@@ -431,31 +847,22 @@ def update_player():
             400,
         )
     # delegate to MarketService for the heavy lifting
-    service = MarketService()
     # normalize empty team -> None behavior inside service
-    conn = get_connection(DB_PATH)
-    try:
-        res = service.update_player(conn, pid, squadra, costo, anni_contratto, opzione)
-        # service returns either an updated row dict or an error mapping
-        if isinstance(res, dict) and res.get("error"):
-            # keep previous JSON error shape
-            return (jsonify(res), 400)
-        return jsonify(res)
-    finally:
-        conn.close()
+    res = _MARKET_SVC.update_player(
+        get_db(), pid, squadra, costo, anni_contratto, opzione
+    )
+    bump_data_version()
+    # service returns either an updated row dict or an error mapping
+    if isinstance(res, dict) and res.get("error"):
+        # keep previous JSON error shape
+        return (jsonify(res), 400)
+    return jsonify(res)
 
 
-@bp.route("/rose", methods=["GET"])
-def rose():
-    DB_PATH = current_app.config.get("DB_PATH")
+def _rose_context() -> Dict:
+    """Template context of the rose page (runs its queries)."""
     # Prefer ORM data if present; fall back to legacy sqlite3 queries when needed
-    ROSE_STRUCTURE = current_app.config.get("ROSE_STRUCTURE")
-    ruolo_map = {
-        "P": "Portieri",
-        "D": "Difensori",
-        "C": "Centrocampisti",
-        "A": "Attaccanti",
-    }
+    ROSE_STRUCTURE = current_app.config["ROSE_STRUCTURE"]
 
     # attempt ORM query
     orm_rows = []
@@ -491,24 +898,19 @@ def rose():
     if orm_rows:
         teams_in_rows = {r["FantaSquadra"] for r in orm_rows if r["FantaSquadra"]}
         all_teams = list(
-            dict.fromkeys(
-                list(current_app.config.get("SQUADRE")) + sorted(teams_in_rows)
-            )
+            dict.fromkeys(list(current_app.config["SQUADRE"]) + sorted(teams_in_rows))
         )
-        rose_map = {s: {r: [] for r in ROSE_STRUCTURE.keys()} for s in all_teams}
+        rose_map: Dict[str, Dict[str, List[Dict[str, Any]]]] = {
+            s: {r: [] for r in ROSE_STRUCTURE.keys()} for s in all_teams
+        }
         for row in orm_rows:
             sname = row["FantaSquadra"]
             codice_ruolo = (row.get("ruolo") or "").strip()
-            key = None
-            if codice_ruolo:
-                ch = codice_ruolo[0].upper()
-                if ch == "G":
-                    ch = "P"
-                key = ruolo_map.get(ch)
-            if not key:
+            bucket = ROLE_BUCKETS.get(codice_ruolo[:1])
+            if bucket is None:
                 continue
             if sname in rose_map:
-                rose_map[sname][key].append(
+                rose_map[sname][bucket[0]].append(
                     {
                         "id": row["id"],
                         "nome": row["nome"],
@@ -519,70 +921,43 @@ def rose():
                         "opzione": row.get("opzione"),
                     }
                 )
-        return render_template(
-            "rose.html", squadre=all_teams, rose_structure=ROSE_STRUCTURE, rose=rose_map
-        )
+        return {"squadre": all_teams, "rose": rose_map}
 
     # fallback: use MarketService helpers which are resilient to missing columns
     try:
-        conn = get_connection(DB_PATH)
-        svc = MarketService()
-        # get a mapping of teams -> roster using the service; then compute teams seen in rows
-        # We'll construct a rose_map similar to the original behavior
-        # First, collect rows via a simple query using the service logic
-        # Reuse get_team_summaries to determine teams and spent/missing, and then build rose map
-        rows_map = {}
-        teams_in_rows = set()
-        for s in current_app.config.get("SQUADRE"):
-            team_roster, starting_pot, total_spent, cassa = svc.get_team_roster(
-                conn, s, ROSE_STRUCTURE
-            )
-            # team_roster is per-role mapping; if any players exist, register the team
-            has_players = any(len(lst) > 0 for lst in team_roster.values())
-            if has_players:
-                teams_in_rows.add(s)
-            rows_map[s] = team_roster
-        all_teams = list(
-            dict.fromkeys(
-                list(current_app.config.get("SQUADRE")) + sorted(teams_in_rows)
-            )
-        )
-        # ensure a consistent rose_map structure
-        rose_map = {s: {r: [] for r in ROSE_STRUCTURE.keys()} for s in all_teams}
-        for s, roster in rows_map.items():
-            if s in rose_map:
-                rose_map[s] = roster
-        conn.close()
-        return render_template(
-            "rose.html", squadre=all_teams, rose_structure=ROSE_STRUCTURE, rose=rose_map
-        )
+        # every configured team's roster, bucketed by role, in one query
+        squadre = list(current_app.config["SQUADRE"])
+        rosters = _MARKET_SVC.get_team_rosters(get_db(), squadre, ROSE_STRUCTURE)
+        return {"squadre": list(rosters), "rose": rosters}
     except (sqlite3.DatabaseError, ValueError, TypeError) as e:
         logging.exception("Service-based rose fallback failed: %s", e)
         # final fallback: empty rose
-        return render_template(
-            "rose.html",
-            squadre=current_app.config.get("SQUADRE"),
-            rose_structure=ROSE_STRUCTURE,
-            rose={
+        return {
+            "rose": {
                 s: {r: [] for r in ROSE_STRUCTURE.keys()}
-                for s in current_app.config.get("SQUADRE")
-            },
-        )
+                for s in current_app.config["SQUADRE"]
+            }
+        }
+
+
+@bp.route("/rose", methods=["GET"])
+@_conditional
+def rose():
+    version = _pages_version()
+    if version is None:
+        return stream_template(get_template("rose.html"), **_rose_context())
+    # the page is the same for every visitor until the next write: render it
+    # once per data version instead of once per request
+    return render_cached("rose.html", version, _rose_context)
 
 
 @bp.route("/squadra/<team_name>", methods=["GET"])
+@_conditional
 def squadra(team_name):
     from urllib.parse import unquote
 
     tname = unquote(team_name)
-    DB_PATH = current_app.config.get("DB_PATH")
     # prefer ORM if available
-    ruolo_map = {
-        "P": "Portieri",
-        "D": "Difensori",
-        "C": "Centrocampisti",
-        "A": "Attaccanti",
-    }
     ROSE_STRUCTURE = current_app.config.get("ROSE_STRUCTURE")
     team_roster = {r: [] for r in ROSE_STRUCTURE.keys()}
     try:
@@ -603,15 +978,10 @@ def squadra(team_name):
                     )
                     players = [p for p in players if p.team and p.team.name == tname]
                 for p in players:
-                    codice = (p.role or "").strip()
-                    key = None
-                    if codice:
-                        ch = codice[0].upper()
-                        if ch == "G":
-                            ch = "P"
-                        key = ruolo_map.get(ch)
-                    if not key:
+                    bucket = ROLE_BUCKETS.get((p.role or "").lstrip()[:1])
+                    if bucket is None:
                         continue
+                    key, ch = bucket
                     team_roster[key].append(
                         {
                             "id": p.id,
@@ -635,33 +1005,22 @@ def squadra(team_name):
                 # assignments in the `giocatori` table for this team (FantaSquadra),
                 # prefer the sqlite fallback so users see the up-to-date roster.
                 if not players:
-                    try:
-                        conn_check = get_connection(DB_PATH)
-                        cur_check = conn_check.cursor()
-                        cur_check.execute(
-                            "SELECT 1 FROM giocatori WHERE FantaSquadra = ? LIMIT 1",
-                            (tname,),
-                        )
-                        if cur_check.fetchone():
-                            session.close()
-                            conn_check.close()
-                            # Trigger outer except/fallback path
-                            raise Exception("use sqlite fallback")
-                    finally:
-                        try:
-                            conn_check.close()
-                        except Exception as e:
-                            logging.debug("Failed to close conn_check: %s", e)
-
-                return render_template(
-                    "team.html",
+                    cur_check = get_db().execute(
+                        "SELECT 1 FROM giocatori WHERE FantaSquadra = ? LIMIT 1",
+                        (tname,),
+                    )
+                    if cur_check.fetchone():
+                        session.close()
+                        # Trigger outer except/fallback path
+                        raise Exception("use sqlite fallback")
+
+                return stream_template(
+                    get_template("team.html"),
                     tname=tname,
                     roster=team_roster,
-                    rose_structure=ROSE_STRUCTURE,
                     starting_pot=starting_pot,
                     total_spent=total_spent,
                     cassa=cassa,
-                    squadre=current_app.config.get("SQUADRE"),
                 )
             finally:
                 session.close()
@@ -670,39 +1029,28 @@ def squadra(team_name):
 
     # Use the MarketService sqlite fallback (it handles missing FantaSquadra column)
     try:
-        conn = get_connection(DB_PATH)
-        svc = MarketService()
-        team_roster, starting_pot, total_spent, cassa = svc.get_team_roster(
-            conn, tname, ROSE_STRUCTURE
+        team_roster, starting_pot, total_spent, cassa = _MARKET_SVC.get_team_roster(
+            get_db(), tname, ROSE_STRUCTURE
         )
-        conn.close()
         # only render if the service found assigned players for this team
         if any(len(lst) for lst in team_roster.values()):
-            return render_template(
-                "team.html",
+            return stream_template(
+                get_template("team.html"),
                 tname=tname,
                 roster=team_roster,
-                rose_structure=ROSE_STRUCTURE,
                 starting_pot=starting_pot,
                 total_spent=total_spent,
                 cassa=cassa,
-                squadre=current_app.config.get("SQUADRE"),
             )
     except Exception as e:
         logging.exception("Service-based team_roster lookup failed: %s", e)
         # fall back to default empty roster rendering
-        try:
-            conn.close()
-        except Exception as e:
-            logging.debug("Failed to close conn after service error: %s", e)
     # final fallback: render with computed variables (should rarely reach here)
-    return render_template(
-        "team.html",
+    return stream_template(
+        get_template("team.html"),
         tname=tname,
         roster=team_roster,
-        rose_structure=ROSE_STRUCTURE,
         starting_pot=300.0,
         total_spent=0.0,
         cassa=300.0,
-        squadre=current_app.config.get("SQUADRE"),
     )
@@ -2,7 +2,7 @@
 
 import logging
 
-from flask import Blueprint, current_app, jsonify, render_template, request
+from flask import Blueprint, jsonify, render_template, request
 
 from app.database import get_db_session, get_repositories
 from app.security.config import get_rate_limit
@@ -13,6 +13,7 @@ from app.security.decorators import (
     require_roles,
     security_headers,
 )
+from app.utils.templates import get_template
 
 # Alias for easier use
 jwt_required = jwt_required_with_logging()
@@ -937,8 +938,7 @@ def index():
             team_casse.sort(key=lambda x: x["remaining"], reverse=True)
 
             return render_template(
-                "index.html",
-                squadre=current_app.config.get("SQUADRE", []),
+                get_template("index.html"),
                 team_casse=team_casse,
                 team_casse_missing=team_casse_missing,
                 query="",
@@ -951,8 +951,7 @@ def index():
     except Exception as e:
         logger.error(f"Error loading homepage: {e}")
         return render_template(
-            "index.html",
-            squadre=current_app.config.get("SQUADRE", []),
+            get_template("index.html"),
             team_casse=[],
             team_casse_missing=[],
             query="",
@@ -1013,33 +1012,13 @@ def rose():
                 rose_data[team.name] = team_roster
 
             return render_template(
-                "rose.html",
+                get_template("rose.html"),
                 rose=rose_data,
-                rose_structure=current_app.config.get(
-                    "ROSE_STRUCTURE",
-                    {
-                        "Portieri": 3,
-                        "Difensori": 8,
-                        "Centrocampisti": 8,
-                        "Attaccanti": 6,
-                    },
-                ),
-                squadre=current_app.config.get("SQUADRE", []),
             )
     except Exception as e:
         logger.error(f"Error loading rose: {e}")
         return render_template(
-            "rose.html",
+            get_template("rose.html"),
             rose={},
-            rose_structure=current_app.config.get(
-                "ROSE_STRUCTURE",
-                {
-                    "Portieri": 3,
-                    "Difensori": 8,
-                    "Centrocampisti": 8,
-                    "Attaccanti": 6,
-                },
-            ),
-            squadre=current_app.config.get("SQUADRE", []),
             error="Error loading team rosters",
         )
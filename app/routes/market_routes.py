@@ -4,7 +4,6 @@ import logging
 
 from flask import (
     Blueprint,
-    current_app,
     jsonify,
     render_template,
     request,
@@ -125,7 +124,6 @@ def index():
                 opzione=opzione,
                 anni_contratto=anni_contratto,
                 team_names=team_names,
-                squadre=current_app.config.get("SQUADRE", []),
                 current_page=page,
                 total_pages=total_pages,
                 has_prev=has_prev,
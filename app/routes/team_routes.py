@@ -50,11 +50,9 @@ def team_page(team_name: str):
                     "team.html",
                     tname=team_name,
                     roster=team_roster,
-                    rose_structure=ROSE_STRUCTURE,
                     starting_pot=300.0,
                     total_spent=0.0,
                     cassa=300.0,
-                    squadre=current_app.config.get("SQUADRE", []),
                     error="Team not found"
                 )
 
@@ -94,11 +92,9 @@ def team_page(team_name: str):
                 "team.html",
                 tname=team.name,
                 roster=team_roster,
-                rose_structure=ROSE_STRUCTURE,
                 starting_pot=starting_pot,
                 total_spent=total_spent,
                 cassa=cassa,
-                squadre=current_app.config.get("SQUADRE", []),
                 team_stats=team_stats
             )
 
@@ -110,11 +106,9 @@ def team_page(team_name: str):
             "team.html",
             tname=team_name,
             roster={role: [] for role in current_app.config.get("ROSE_STRUCTURE", {}).keys()},
-            rose_structure=current_app.config.get("ROSE_STRUCTURE", {}),
             starting_pot=300.0,
             total_spent=0.0,
             cassa=300.0,
-            squadre=current_app.config.get("SQUADRE", []),
             error="Error loading team data"
         )
 
@@ -1,6 +1,231 @@
+import functools
 import logging
 import sqlite3
-from typing import Any, Dict, List, Optional
+from collections import namedtuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.db import (
+    NAME_TRIGRAM_TABLE,
+    ROLE_CODE_SQL,
+    SQL_CREATE_FANTATEAM,
+    VISIBLE_ROSTER_SQL,
+    escape_like,
+    numeric_expr,
+    table_columns,
+    txn,
+)
+
+# Cash helper statements. Kept as module constants so every call passes the
+# same SQL text and hits the connection's prepared-statement cache.
+_SQL_TEAM_CASH = "SELECT cassa_iniziale, cassa_attuale FROM fantateam WHERE squadra=?"
+_SQL_ALL_TEAM_CASH = "SELECT squadra, cassa_iniziale, cassa_attuale FROM fantateam"
+_SQL_TEAM_CASH_AVAILABLE = "SELECT cassa_attuale FROM fantateam WHERE squadra=?"
+# UPSERT updates the existing row in place (INSERT OR REPLACE deletes and
+# re-inserts it); a new team starts from the given amount, an existing one keeps
+# its carryover and starting cash
+_SQL_SET_TEAM_CASH = """
+    INSERT INTO fantateam(squadra, carryover, cassa_iniziale, cassa_attuale)
+    VALUES (?, 0, ?, ?)
+    ON CONFLICT(squadra) DO UPDATE
+      SET cassa_attuale = excluded.cassa_attuale,
+          carryover = COALESCE(carryover, 0),
+          cassa_iniziale = COALESCE(cassa_iniziale, excluded.cassa_iniziale)
+"""
+# Create-or-charge in one statement: a missing row starts at 300, a NULL
+# cassa_attuale falls back to cassa_iniziale, and the charge only applies when
+# enough cash is left. RETURNING yields a row only on success.
+_SQL_CHARGE_TEAM = """
+    INSERT INTO fantateam(squadra, carryover, cassa_iniziale, cassa_attuale)
+    SELECT ?, 0, 300.0, 300.0 - ? WHERE 300.0 >= ?
+    ON CONFLICT(squadra) DO UPDATE
+      SET cassa_attuale = COALESCE(cassa_attuale, cassa_iniziale, 300.0) - ?
+      WHERE COALESCE(cassa_attuale, cassa_iniziale, 300.0) >= ?
+    RETURNING cassa_attuale
+"""
+_SQL_REFUND_TEAM = """
+    INSERT INTO fantateam(squadra, carryover, cassa_iniziale, cassa_attuale)
+    VALUES (?, 0, 300.0, 300.0 + ?)
+    ON CONFLICT(squadra) DO UPDATE
+      SET cassa_attuale = COALESCE(cassa_attuale, cassa_iniziale, 300.0) + ?
+"""
+
+
+# Name suggestions, shortest first: names containing the first three letters
+# of the query, found through the trigram index (LIKE '%abc%' without it), or
+# starting with a two-letter query, which is too short for a trigram.
+_SQL_NAME_SUGGESTIONS_TRIGRAM = (
+    "SELECT DISTINCT Nome FROM giocatori WHERE rowid IN"
+    f" (SELECT rowid FROM {NAME_TRIGRAM_TABLE} WHERE {NAME_TRIGRAM_TABLE} MATCH ?)"
+    " ORDER BY LENGTH(Nome) ASC LIMIT ?"
+)
+_SQL_NAME_SUGGESTIONS_LIKE = (
+    "SELECT DISTINCT Nome FROM giocatori WHERE Nome LIKE ? ESCAPE '\\'"
+    " ORDER BY LENGTH(Nome) ASC LIMIT ?"
+)
+
+# Player fields update_player answers with: (expression, key, required column);
+# fields whose column is missing from a minimal giocatori table are left out
+_PLAYER_ROW_FIELDS = (
+    ("rowid", "id", None),
+    ('"Nome"', "nome", "Nome"),
+    ('"Sq."', "squadra_reale", "Sq."),
+    ('"R."', "ruolo", "R."),
+    ('"Costo"', "costo", "Costo"),
+    ("anni_contratto", "anni_contratto", "anni_contratto"),
+    ("opzione", "opzione", "opzione"),
+    ("squadra", "squadra", "squadra"),
+)
+
+# Columns an assignment writes, in the order of the values passed to
+# _assignment_update_sql statements
+_ASSIGNMENT_COLUMNS = ("squadra", "FantaSquadra", "Costo", "anni_contratto", "opzione")
+
+
+@functools.lru_cache(maxsize=16)
+def _assignment_update_sql(cols: frozenset, returning: bool):
+    """UPDATE of a player's assignment, built once per giocatori schema.
+
+    Only the _ASSIGNMENT_COLUMNS present in ``cols`` are set, so minimal
+    tables need no retry after a failed prepare. Returns the SQL and the
+    positions, within an _ASSIGNMENT_COLUMNS-ordered tuple, of the values it
+    binds before the rowid. With ``returning`` the statement also answers
+    with the _PLAYER_ROW_FIELDS present.
+    """
+    present = [i for i, c in enumerate(_ASSIGNMENT_COLUMNS) if c in cols]
+    set_sql = ", ".join(f'"{_ASSIGNMENT_COLUMNS[i]}"=?' for i in present)
+    sql = f"UPDATE giocatori SET {set_sql} WHERE rowid=?"
+    if returning:
+        sql += " RETURNING " + ", ".join(
+            f"{expr} AS {alias}"
+            for expr, alias, column in _PLAYER_ROW_FIELDS
+            if column is None or column in cols
+        )
+    return sql, tuple(present)
+
+
+# Amount a player counts against the team cash (no cost counts as 0)
+_SPENT_EXPR = numeric_expr("COALESCE(\"Costo\", '0')")
+
+
+# Roster roles in the (P, D, C, A) order of the per-team counts
+ROSE_ROLES = ("Portieri", "Difensori", "Centrocampisti", "Attaccanti")
+_NO_PLAYERS = (0.0, 0, 0, 0, 0)
+# First letter of a role (either case) -> (roster bucket, canonical code), for
+# rows read through the ORM; the SQL paths use _ROLE_KEY_SQL instead
+ROLE_BUCKETS = {
+    c: bucket
+    for code, bucket in (
+        ("P", ("Portieri", "P")),
+        ("G", ("Portieri", "P")),
+        ("D", ("Difensori", "D")),
+        ("C", ("Centrocampisti", "C")),
+        ("A", ("Attaccanti", "A")),
+    )
+    for c in (code, code.lower())
+}
+
+
+# Role letter for the roster pages: unlike role_code, leading blanks are skipped,
+# as the ORM paths strip them
+_ROSTER_ROLE_SQL = 'upper(substr(ltrim("R."), 1, 1))'
+# Roster page bucket and canonical one-letter code (legacy 'G' goalkeepers
+# become 'P') of a player, computed by the roster queries
+_ROLE_KEY_SQL = (
+    f"CASE {_ROSTER_ROLE_SQL} WHEN 'P' THEN 'Portieri' WHEN 'G' THEN 'Portieri'"
+    " WHEN 'D' THEN 'Difensori' WHEN 'C' THEN 'Centrocampisti'"
+    " WHEN 'A' THEN 'Attaccanti' END"
+)
+# Player entry of the rose/team templates: attribute access for Jinja without
+# building a dict per row
+RosterPlayer = namedtuple(
+    "RosterPlayer", "id nome ruolo squadra_reale costo anni_contratto opzione"
+)
+# role bucket first, then the RosterPlayer fields in order, so a row's tail
+# slice is the player
+_ROSTER_ENTRY_COLUMNS = f"""
+    {_ROLE_KEY_SQL} AS role_key,
+    g.rowid AS id, g."Nome" AS nome,
+    CASE {_ROSTER_ROLE_SQL} WHEN 'G' THEN 'P' ELSE {_ROSTER_ROLE_SQL} END AS ruolo,
+    g."Sq." AS squadra_reale, g."Costo" AS costo, g.anni_contratto, g.opzione
+"""
+_PLAYER_SLICE = slice(-len(RosterPlayer._fields), None)
+
+
+def build_team_summary(squadra, starting, spent, counts, targets) -> Dict:
+    """Cash box data for one team.
+
+    ``counts`` and ``targets`` are (P, D, C, A) tuples of players owned and
+    wanted; ``targets`` is computed once from ROSE_STRUCTURE by the caller.
+    """
+    missing = [t - c if t > c else 0 for t, c in zip(targets, counts)]
+    return {
+        "squadra": squadra,
+        "starting": starting,
+        "spent": spent,
+        "remaining": starting - spent,
+        "missing": sum(missing),
+        "missing_portieri": missing[0],
+        "missing_dif": missing[1],
+        "missing_cen": missing[2],
+        "missing_att": missing[3],
+    }
+
+
+@functools.lru_cache(maxsize=16)
+def _team_summary_sql(team_col: str, spent_expr: str, n_teams: int):
+    """Grouped spent/role-count query over ``n_teams`` teams (built once per shape).
+
+    Roles are read through role_code's own expression rather than the virtual
+    column: reading "R." lets the partial ix_giocatori_rosa index (app.db)
+    cover the whole query.
+    """
+    marks = ",".join("?" * n_teams)
+    role_expr = ROLE_CODE_SQL
+    return f"""
+        SELECT "{team_col}",
+               TOTAL({spent_expr}),
+               SUM({role_expr} IN ('P', 'G')),
+               SUM({role_expr} = 'D'),
+               SUM({role_expr} = 'C'),
+               SUM({role_expr} = 'A')
+        FROM giocatori
+        WHERE "{team_col}" IN ({marks})
+          AND {VISIBLE_ROSTER_SQL}
+        GROUP BY "{team_col}"
+    """
+
+
+@functools.lru_cache(maxsize=16)
+def _team_rosters_sql(team_col: str, n_teams: int) -> str:
+    """Visible roster rows of ``n_teams`` teams, role bucket included."""
+    marks = ",".join("?" * n_teams)
+    return f"""
+        SELECT "{team_col}" AS team, {_ROSTER_ENTRY_COLUMNS}
+        FROM giocatori AS g
+        WHERE "{team_col}" IN ({marks})
+          AND {VISIBLE_ROSTER_SQL}
+          AND role_key IS NOT NULL
+    """
+
+
+@functools.lru_cache(maxsize=4)
+def _team_roster_sql(team_col: str, spent_expr: str) -> str:
+    """One team's visible roster, starting cash and spend, in a single statement.
+
+    The one-row anchor keeps the cash row when the team has no players yet;
+    such a row has a NULL id and adds nothing to the windowed total. fantateam
+    shares no column with the roster predicate or the role expressions, so
+    they need no table prefix.
+    """
+    return f"""
+        SELECT f.cassa_iniziale AS cassa_iniziale,
+               TOTAL({spent_expr}) OVER () AS total_spent,
+               {_ROSTER_ENTRY_COLUMNS}
+        FROM (SELECT ? AS team) AS t
+        LEFT JOIN giocatori AS g
+          ON g."{team_col}" = t.team AND {VISIBLE_ROSTER_SQL}
+        LEFT JOIN fantateam AS f ON f.squadra = t.team
+    """
 
 
 class InsufficientFunds(Exception):
@@ -65,35 +290,34 @@ class MarketService:
         self, conn: sqlite3.Connection, table: str, column: str
     ) -> bool:
         """Return True if the given column exists in the table on this connection."""
-        cur = conn.cursor()
         try:
-            cur.execute(f"PRAGMA table_info({table})")
-            cols = [r[1] if isinstance(r, tuple) else r["name"] for r in cur.fetchall()]
-            return column in cols
+            return column in table_columns(conn, table)
         except (sqlite3.DatabaseError, AttributeError) as e:
             logging.debug("_table_has_column failed for %s.%s: %s", table, column, e)
             return False
 
     # Team cash helpers (migrated from app.py) -------------------------------------------------
-    def get_team_cash(self, conn: sqlite3.Connection, team: str):
-        # ensure fantateam table exists (tests may use minimal DBs)
-        cur = conn.cursor()
+    def _cash_execute(self, conn: sqlite3.Connection, sql: str, params: tuple):
+        """Execute a fantateam statement, creating the table on first use.
+
+        ``flask init-db`` creates fantateam up front, so the DDL only runs on
+        minimal databases (tests, fresh files) instead of before every statement.
+        """
         try:
-            cur.execute(
-                "CREATE TABLE IF NOT EXISTS fantateam (squadra TEXT PRIMARY KEY, carryover REAL, cassa_iniziale REAL, cassa_attuale REAL)"
-            )
-        except sqlite3.DatabaseError as e:
-            # ignore if DB doesn't support DDL here; caller will get meaningful error
-            logging.debug("get_team_cash: create table failed: %s", e)
-            pass
+            return conn.execute(sql, params)
+        except sqlite3.OperationalError as e:
+            if "no such table" not in str(e):
+                raise
+            try:
+                conn.execute(SQL_CREATE_FANTATEAM)
+            except sqlite3.DatabaseError as e2:
+                # e.g. a read-only connection; the caller gets the original error
+                logging.debug("create fantateam failed: %s", e2)
+                raise e
+            return conn.execute(sql, params)
 
-        # reuse cur for actual query
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT cassa_iniziale, cassa_attuale FROM fantateam WHERE squadra=?",
-            (team,),
-        )
-        r = cur.fetchone()
+    def get_team_cash(self, conn: sqlite3.Connection, team: str):
+        r = self._cash_execute(conn, _SQL_TEAM_CASH, (team,)).fetchone()
         if r:
             iniziale = float(r[0]) if r[0] is not None else 300.0
             attuale = float(r[1]) if r[1] is not None else iniziale
@@ -102,101 +326,39 @@ class MarketService:
             attuale = 300.0
         return iniziale, attuale
 
-    def update_team_cash(self, conn: sqlite3.Connection, team: str, new_attuale: float):
-        cur = conn.cursor()
-        try:
-            cur.execute(
-                "CREATE TABLE IF NOT EXISTS fantateam (squadra TEXT PRIMARY KEY, carryover REAL, cassa_iniziale REAL, cassa_attuale REAL)"
-            )
-        except sqlite3.DatabaseError as e:
-            logging.debug("update_team_cash: create table failed: %s", e)
-            pass
-        cur.execute(
-            "SELECT carryover, cassa_iniziale FROM fantateam WHERE squadra=?", (team,)
-        )
+    def get_all_team_cash(self, conn: sqlite3.Connection) -> Dict[str, tuple]:
+        """Return ``{squadra: (cassa_iniziale, cassa_attuale)}`` for every fantateam row.
+
+        One query for all teams; pages that show several teams should use this
+        and look teams up in the mapping instead of calling get_team_cash per team.
+        Teams without a row are absent, callers default them to 300.0.
+        """
+        cash: Dict[str, tuple] = {}
+        for r in conn.execute(_SQL_ALL_TEAM_CASH):
+            iniziale = float(r[1]) if r[1] is not None else 300.0
+            attuale = float(r[2]) if r[2] is not None else iniziale
+            cash[r[0]] = (iniziale, attuale)
+        return cash
+
+    def _team_cash_available(self, conn: sqlite3.Connection, team: str) -> float:
+        cur = conn.execute(_SQL_TEAM_CASH_AVAILABLE, (team,))
         r = cur.fetchone()
-        if r and r[0] is not None:
-            carryover = float(r[0]) if r[0] is not None else 0.0
-            cassa_iniziale = float(r[1]) if r[1] is not None else new_attuale
-        else:
-            carryover = 0.0
-            cassa_iniziale = new_attuale
-        cur.execute(
-            "INSERT OR REPLACE INTO fantateam(squadra, carryover, cassa_iniziale, cassa_attuale) VALUES (?,?,?,?)",
-            (team, carryover, cassa_iniziale, new_attuale),
-        )
+        return float(r[0]) if r and r[0] is not None else 300.0
+
+    def update_team_cash(self, conn: sqlite3.Connection, team: str, new_attuale: float):
+        self._cash_execute(conn, _SQL_SET_TEAM_CASH, (team, new_attuale, new_attuale))
 
     def atomic_charge_team(
         self, conn: sqlite3.Connection, team: str, amount: float
     ) -> bool:
-        cur = conn.cursor()
-        try:
-            cur.execute(
-                "CREATE TABLE IF NOT EXISTS fantateam (squadra TEXT PRIMARY KEY, carryover REAL, cassa_iniziale REAL, cassa_attuale REAL)"
-            )
-        except sqlite3.DatabaseError as e:
-            logging.debug("atomic_charge_team: create table failed: %s", e)
-            pass
-        cur.execute(
-            "SELECT carryover, cassa_iniziale, cassa_attuale FROM fantateam WHERE squadra=?",
-            (team,),
+        cur = self._cash_execute(
+            conn, _SQL_CHARGE_TEAM, (team, amount, amount, amount, amount)
         )
-        r = cur.fetchone()
-        if not r:
-            cur.execute(
-                "INSERT INTO fantateam(squadra, carryover, cassa_iniziale, cassa_attuale) VALUES (?,?,?,?)",
-                (team, 0, 300.0, 300.0),
-            )
-        else:
-            if r[2] is None:
-                iniz = float(r[1]) if r[1] is not None else 300.0
-                cur.execute(
-                    "UPDATE fantateam SET cassa_attuale=? WHERE squadra=?", (iniz, team)
-                )
-        cur.execute(
-            "UPDATE fantateam SET cassa_attuale = cassa_attuale - ? WHERE squadra=? AND cassa_attuale >= ?",
-            (amount, team, amount),
-        )
-        return cur.rowcount > 0
+        # drain the cursor so the statement is finished before the caller commits
+        return bool(cur.fetchall())
 
     def refund_team(self, conn: sqlite3.Connection, team: str, amount: float):
-        cur = conn.cursor()
-        try:
-            cur.execute(
-                "CREATE TABLE IF NOT EXISTS fantateam (squadra TEXT PRIMARY KEY, carryover REAL, cassa_iniziale REAL, cassa_attuale REAL)"
-            )
-        except sqlite3.DatabaseError as e:
-            logging.debug("refund_team: create table failed: %s", e)
-            pass
-        cur.execute(
-            "SELECT carryover, cassa_iniziale, cassa_attuale FROM fantateam WHERE squadra=?",
-            (team,),
-        )
-        r = cur.fetchone()
-        if r:
-            cur_att = r[2]
-            if cur_att is not None:
-                try:
-                    new = float(cur_att) + amount
-                except (ValueError, TypeError):
-                    new = amount
-                cur.execute(
-                    "UPDATE fantateam SET cassa_attuale=? WHERE squadra=?", (new, team)
-                )
-            else:
-                try:
-                    iniz = float(r[1]) if r[1] is not None else 300.0
-                except (ValueError, TypeError):
-                    iniz = 300.0
-                new = iniz + amount
-                cur.execute(
-                    "UPDATE fantateam SET cassa_attuale=? WHERE squadra=?", (new, team)
-                )
-        else:
-            cur.execute(
-                "INSERT INTO fantateam(squadra, carryover, cassa_iniziale, cassa_attuale) VALUES (?,?,?,?)",
-                (team, 0, 300.0, 300.0 + amount),
-            )
+        self._cash_execute(conn, _SQL_REFUND_TEAM, (team, amount, amount))
 
     # High-level operations -------------------------------------------------------------------
     def assign_player(
@@ -209,125 +371,92 @@ class MarketService:
         opzione: Optional[str],
     ) -> Dict[str, Any]:
         """Perform assign/move/unassign logic. Returns dict with keys: success(bool), error(optional), available(optional)."""
-        cur = conn.cursor()
         squadra_val, costo_val, anni_contratto, opzione = (
             self.normalize_assignment_values(squadra, costo, anni_contratto, opzione)
         )
+        # refund, charge and row update commit together or not at all
+        try:
+            with txn(conn):
+                self._write_assignment(
+                    conn, id, squadra_val, costo_val, anni_contratto, opzione
+                )
+        except InsufficientFunds as e:
+            return {
+                "success": False,
+                "error": "Fondi insufficienti",
+                "available": e.available,
+            }
+        return {"success": True}
 
+    def _current_assignment(
+        self, conn: sqlite3.Connection, pid, has_fanta: bool
+    ) -> Tuple[Optional[str], float]:
+        """Return ``(team, cost)`` a player is currently assigned with.
+
+        The team is FantaSquadra when set, else the legacy squadra column.
+        The cost is the same figure the team totals count (costo_num when the
+        table has it), so a refund gives back what was counted as spent.
+        Callers run inside txn(), whose write lock keeps this read and their
+        UPDATE consistent.
+        """
+        team_sql = (
+            'COALESCE(NULLIF("FantaSquadra", \'\'), "squadra")'
+            if has_fanta
+            else '"squadra"'
+        )
+        if self._table_has_column(conn, "giocatori", "costo_num"):
+            cost_sql = '"costo_num"'
+        else:
+            cost_sql = '"Costo"'
+        prev = conn.execute(
+            f"SELECT {team_sql}, {cost_sql} FROM giocatori WHERE rowid=?", (pid,)
+        ).fetchone()
+        if not prev:
+            return None, 0.0
+        try:
+            cost = float(prev[1]) if prev[1] not in (None, "") else 0.0
+        except (ValueError, TypeError):
+            cost = 0.0
+        return prev[0], cost
+
+    def _write_assignment(
+        self,
+        conn: sqlite3.Connection,
+        id: str,
+        squadra_val: Optional[str],
+        costo_val: float,
+        anni_contratto,
+        opzione,
+    ) -> None:
+        """Statements behind assign_player; runs inside its transaction."""
         # Find current assignment
-        # Read legacy `squadra` and optionally `FantaSquadra` if the column exists
         has_fanta = self._table_has_column(conn, "giocatori", "FantaSquadra")
-        if has_fanta:
-            cur.execute(
-                'SELECT "squadra", "FantaSquadra", Costo FROM giocatori WHERE rowid=?',
-                (id,),
-            )
-            prev = cur.fetchone()
-            prev_team = None
-            prev_cost = 0.0
-            if prev:
-                # prefer FantaSquadra (column 1) when available, otherwise fall back to squadra (column 0)
-                prev_team = prev[1] if prev[1] not in (None, "") else prev[0]
-                try:
-                    prev_cost = float(prev[2]) if prev[2] not in (None, "") else 0.0
-                except (ValueError, TypeError):
-                    prev_cost = 0.0
-        else:
-            cur.execute('SELECT "squadra", Costo FROM giocatori WHERE rowid=?', (id,))
-            prev = cur.fetchone()
-            prev_team = None
-            prev_cost = 0.0
-            if prev:
-                prev_team = prev[0]
-                try:
-                    prev_cost = float(prev[1]) if prev[1] not in (None, "") else 0.0
-                except (ValueError, TypeError):
-                    prev_cost = 0.0
+        prev_team, prev_cost = self._current_assignment(conn, id, has_fanta)
 
         # Unassign
         if squadra_val is None:
             if prev_team and prev_cost > 0:
                 self.refund_team(conn, prev_team, prev_cost)
             # Clear squadra (and FantaSquadra if present) when unassigning so roster pages update
-            if has_fanta:
-                cur.execute(
-                    'UPDATE giocatori SET "squadra"=?, "FantaSquadra"=?, "Costo"=?, "anni_contratto"=?, "opzione"=? WHERE rowid=?',
-                    (None, None, None, None, None, id),
-                )
-            else:
-                cur.execute(
-                    'UPDATE giocatori SET "squadra"=?, "Costo"=?, "anni_contratto"=?, "opzione"=? WHERE rowid=?',
-                    (None, None, None, None, id),
-                )
-            conn.commit()
-            return {"success": True}
-
-        # moving: refund prev first
-        if prev_team and prev_team != squadra_val and prev_cost > 0:
-            self.refund_team(conn, prev_team, prev_cost)
-
-        # attempt atomic charge
-        if costo_val > 0:
-            ok = self.atomic_charge_team(conn, squadra_val, costo_val)
-            if not ok:
-                conn.rollback()
-                cur.execute(
-                    "SELECT cassa_attuale FROM fantateam WHERE squadra=?",
-                    (squadra_val,),
-                )
-                rr = cur.fetchone()
-                avail = float(rr[0]) if rr and rr[0] is not None else 300.0
-                return {
-                    "success": False,
-                    "error": "Fondi insufficienti",
-                    "available": avail,
-                }
-
-        # Keep legacy `squadra` in sync with `FantaSquadra` so different parts of the app see the change
-        if has_fanta:
-            # Try updating with the full expected column set, but be tolerant of missing
-            # legacy columns. Retry progressively removing optional columns when the
-            # DB schema doesn't include them so minimal test DBs work.
-            try:
-                cur.execute(
-                    'UPDATE giocatori SET "squadra"=?, "FantaSquadra"=?, "Costo"=?, "anni_contratto"=?, "opzione"=? WHERE rowid=?',
-                    (squadra_val, squadra_val, costo_val, anni_contratto, opzione, id),
-                )
-            except sqlite3.OperationalError as e:
-                logging.debug(
-                    "Update with full column set failed, retrying reduced sets: %s", e
-                )
-                # First retry: drop anni_contratto if missing
-                try:
-                    cur.execute(
-                        'UPDATE giocatori SET "squadra"=?, "FantaSquadra"=?, "Costo"=?, "opzione"=? WHERE rowid=?',
-                        (squadra_val, squadra_val, costo_val, opzione, id),
-                    )
-                except sqlite3.OperationalError:
-                    # Second retry: drop opzione as well (very minimal schema)
-                    cur.execute(
-                        'UPDATE giocatori SET "squadra"=?, "FantaSquadra"=?, "Costo"=? WHERE rowid=?',
-                        (squadra_val, squadra_val, costo_val, id),
-                    )
+            values: Tuple[Any, ...] = (None, None, None, None, None)
         else:
-            try:
-                cur.execute(
-                    'UPDATE giocatori SET "squadra"=?, "Costo"=?, "anni_contratto"=?, "opzione"=? WHERE rowid=?',
-                    (squadra_val, costo_val, anni_contratto, opzione, id),
-                )
-            except sqlite3.OperationalError:
-                try:
-                    cur.execute(
-                        'UPDATE giocatori SET "squadra"=?, "Costo"=?, "opzione"=? WHERE rowid=?',
-                        (squadra_val, costo_val, opzione, id),
-                    )
-                except sqlite3.OperationalError:
-                    cur.execute(
-                        'UPDATE giocatori SET "squadra"=?, "Costo"=? WHERE rowid=?',
-                        (squadra_val, costo_val, id),
+            # moving: refund prev first
+            if prev_team and prev_team != squadra_val and prev_cost > 0:
+                self.refund_team(conn, prev_team, prev_cost)
+
+            # attempt atomic charge
+            if costo_val > 0:
+                ok = self.atomic_charge_team(conn, squadra_val, costo_val)
+                if not ok:
+                    raise InsufficientFunds(
+                        costo_val, self._team_cash_available(conn, squadra_val)
                     )
-        conn.commit()
-        return {"success": True}
+            # Keep legacy `squadra` in sync with `FantaSquadra` so different parts of the app see the change
+            values = (squadra_val, squadra_val, costo_val, anni_contratto, opzione)
+
+        # columns missing from minimal legacy tables are left out of the SET
+        sql, present = _assignment_update_sql(table_columns(conn, "giocatori"), False)
+        conn.execute(sql, tuple(values[i] for i in present) + (id,))
 
     def update_player(
         self,
@@ -339,7 +468,6 @@ class MarketService:
         opzione: Optional[str],
     ) -> Dict[str, Any]:
         # Similar to assign_player but returns the updated row as dict
-        cur = conn.cursor()
         if squadra == "" or squadra is None:
             squadra_val = None
             anni_contratto = None
@@ -356,95 +484,56 @@ class MarketService:
         except (ValueError, TypeError):
             costo_val = 0.0
 
-        # read legacy `squadra` and optionally `FantaSquadra` if the column exists
+        try:
+            with txn(conn):
+                row = self._write_player_update(
+                    conn, pid, squadra_val, costo_val, anni_contratto, opzione
+                )
+        except InsufficientFunds as e:
+            return {
+                "error": "Fondi insufficienti",
+                "needed": e.needed,
+                "available": e.available,
+            }
+        return dict(row) if row else {}
+
+    def _write_player_update(
+        self,
+        conn: sqlite3.Connection,
+        pid: str,
+        squadra_val: Optional[str],
+        costo_val: float,
+        anni_contratto,
+        opzione,
+    ) -> Optional[sqlite3.Row]:
+        """Statements behind update_player; runs inside its transaction.
+
+        Returns the updated row (RETURNING), or None when ``pid`` is unknown.
+        """
         has_fanta = self._table_has_column(conn, "giocatori", "FantaSquadra")
-        if has_fanta:
-            cur.execute(
-                'SELECT "squadra", "FantaSquadra", Costo FROM giocatori WHERE rowid=?',
-                (pid,),
-            )
-            prev = cur.fetchone()
-            prev_team = None
-            prev_cost = 0.0
-            if prev:
-                # prefer FantaSquadra (column 1) when available, otherwise fall back to squadra (column 0)
-                prev_team = prev[1] if prev[1] not in (None, "") else prev[0]
-                try:
-                    prev_cost = float(prev[2]) if prev[2] not in (None, "") else 0.0
-                except (ValueError, TypeError):
-                    prev_cost = 0.0
-        else:
-            cur.execute('SELECT "squadra", Costo FROM giocatori WHERE rowid=?', (pid,))
-            prev = cur.fetchone()
-            prev_team = None
-            prev_cost = 0.0
-            if prev:
-                prev_team = prev[0]
-                try:
-                    prev_cost = float(prev[1]) if prev[1] not in (None, "") else 0.0
-                except (ValueError, TypeError):
-                    prev_cost = 0.0
+        prev_team, prev_cost = self._current_assignment(conn, pid, has_fanta)
 
         if squadra_val is None and prev_team:
             if prev_cost > 0:
                 self.refund_team(conn, prev_team, prev_cost)
-            if has_fanta:
-                cur.execute(
-                    'UPDATE giocatori SET "squadra"=?, "FantaSquadra"=?, "Costo"=?, "anni_contratto"=?, "opzione"=? WHERE rowid=?',
-                    (None, None, None, None, None, pid),
-                )
-            else:
-                cur.execute(
-                    'UPDATE giocatori SET "squadra"=?, "Costo"=?, "anni_contratto"=?, "opzione"=? WHERE rowid=?',
-                    (None, None, None, None, pid),
-                )
-            conn.commit()
-            cur.execute(
-                'SELECT rowid as id, "Nome" as nome, "Sq." as squadra_reale, "R." as ruolo, "Costo" as costo, anni_contratto, opzione, squadra FROM giocatori WHERE rowid=?',
-                (pid,),
-            )
-            row = cur.fetchone()
-            return dict(row) if row else {}
-
-        if prev_team and prev_team != squadra_val and prev_cost > 0:
-            self.refund_team(conn, prev_team, prev_cost)
-
-        if squadra_val and costo_val > 0:
-            ok = self.atomic_charge_team(conn, squadra_val, costo_val)
-            if not ok:
-                conn.rollback()
-                cur.execute(
-                    "SELECT cassa_attuale FROM fantateam WHERE squadra=?",
-                    (squadra_val,),
-                )
-                r = cur.fetchone()
-                avail = float(r[0]) if r and r[0] is not None else 300.0
-                return {
-                    "error": "Fondi insufficienti",
-                    "needed": costo_val,
-                    "available": avail,
-                }
-
-        # Update using the appropriate column set depending on whether the
-        # legacy DB includes the FantaSquadra column. Some test DBs are minimal
-        # and won't have this column, so avoid referencing it when absent.
-        if has_fanta:
-            cur.execute(
-                'UPDATE giocatori SET "squadra"=?, "FantaSquadra"=?, "Costo"=?, "anni_contratto"=?, "opzione"=? WHERE rowid=?',
-                (squadra_val, squadra_val, costo_val, anni_contratto, opzione, pid),
-            )
+            values: Tuple[Any, ...] = (None, None, None, None, None)
         else:
-            cur.execute(
-                'UPDATE giocatori SET "squadra"=?, "Costo"=?, "anni_contratto"=?, "opzione"=? WHERE rowid=?',
-                (squadra_val, costo_val, anni_contratto, opzione, pid),
-            )
-        conn.commit()
-        cur.execute(
-            'SELECT rowid as id, "Nome" as nome, "Sq." as squadra_reale, "R." as ruolo, "Costo" as costo, anni_contratto, opzione, squadra FROM giocatori WHERE rowid=?',
-            (pid,),
-        )
-        row = cur.fetchone()
-        return dict(row) if row else {}
+            if prev_team and prev_team != squadra_val and prev_cost > 0:
+                self.refund_team(conn, prev_team, prev_cost)
+
+            if squadra_val and costo_val > 0:
+                ok = self.atomic_charge_team(conn, squadra_val, costo_val)
+                if not ok:
+                    raise InsufficientFunds(
+                        costo_val, self._team_cash_available(conn, squadra_val)
+                    )
+            # FantaSquadra (when the table has it) follows squadra
+            values = (squadra_val, squadra_val, costo_val, anni_contratto, opzione)
+
+        # the row for the response comes back from the UPDATE itself
+        sql, present = _assignment_update_sql(table_columns(conn, "giocatori"), True)
+        rows = conn.execute(sql, tuple(values[i] for i in present) + (pid,)).fetchall()
+        return rows[0] if rows else None
 
     # Utility/read helpers -----------------------------------------------------
     def get_name_suggestions(
@@ -452,37 +541,41 @@ class MarketService:
     ):
         """Return a list of distinct player name suggestions for a short query.
 
-        This mirrors the lightweight suggestion SQL used in the legacy code.
+        Names containing the first three letters of ``query`` (starting with
+        it for two-letter queries), shortest first.
         """
         suggestions: List[str] = []
         if not query or len(query) < 2:
             return suggestions
 
         try:
-            cur = conn.cursor()
-            suggestion_sql = (
-                "SELECT DISTINCT Nome FROM giocatori "
-                "WHERE Nome LIKE ? OR Nome LIKE ? OR Nome LIKE ? "
-                "ORDER BY LENGTH(Nome) ASC LIMIT ?"
-            )
-            query_variants = [
-                f"%{query[:min(4, len(query))]}%",
-                f"%{query[:min(3, len(query))]}%",
-                f"%{query}%",
-            ]
-            params = query_variants + [limit]
-            cur.execute(suggestion_sql, params)
-            rows = cur.fetchall()
+            # the old '%q[:4]%' OR '%q[:3]%' OR '%q%' variants all reduce to
+            # containing q[:3]
+            stem = query[:3]
+            if len(stem) < 3:
+                rows = conn.execute(
+                    _SQL_NAME_SUGGESTIONS_LIKE, (escape_like(stem) + "%", limit)
+                ).fetchall()
+            else:
+                try:
+                    rows = conn.execute(
+                        _SQL_NAME_SUGGESTIONS_TRIGRAM,
+                        ('"%s"' % stem.replace('"', '""'), limit),
+                    ).fetchall()
+                except sqlite3.OperationalError as e:
+                    # no trigram index on this database (see app.db)
+                    logging.debug("name suggestions without trigram index: %s", e)
+                    rows = conn.execute(
+                        _SQL_NAME_SUGGESTIONS_LIKE,
+                        ("%" + escape_like(stem) + "%", limit),
+                    ).fetchall()
 
             # Normalize query for comparison so we don't return an exact case-insensitive match
             q_norm = query.strip().lower()
             for r in rows:
-                # rows may be tuples or sqlite3.Row - handle both
-                if isinstance(r, (list, tuple)):
-                    name = r[0]
-                else:
-                    # sqlite3.Row supports indexing and key access
-                    name = r["Nome"] if "Nome" in r.keys() else r[0]
+                # Nome is the only selected column; index access works for
+                # plain tuples and sqlite3.Row alike
+                name = r[0]
                 if not name:
                     continue
                 # skip exact case-insensitive match
@@ -496,166 +589,76 @@ class MarketService:
 
         return suggestions
 
+    def _spent_expr(self, conn: sqlite3.Connection) -> str:
+        """SQL for a player's cost, read from costo_num when the column exists."""
+        if self._table_has_column(conn, "giocatori", "costo_num"):
+            return 'COALESCE("costo_num", 0)'
+        return _SPENT_EXPR
+
     def get_team_summaries(self, conn: sqlite3.Connection, squadre, rose_structure):
         """Compute team summaries (starting, spent, remaining, missing counts) using sqlite fallback.
 
         Returns list of dicts matching the shape expected by the templates.
         """
-        cur = conn.cursor()
         has_fanta = self._table_has_column(conn, "giocatori", "FantaSquadra")
+        team_col = "FantaSquadra" if has_fanta else "squadra"
+        spent_expr = self._spent_expr(conn)
+        team_cash = self.get_all_team_cash(conn)
+        # spent and per-role counts for every team in one grouped scan instead
+        # of two queries per team
+        totals: Dict[str, tuple] = {}
+        if squadre:
+            sql = _team_summary_sql(team_col, spent_expr, len(squadre))
+            for row in conn.execute(sql, tuple(squadre)):
+                totals[row[0]] = tuple(row[1:])
+        targets = tuple(rose_structure.get(role, 0) for role in ROSE_ROLES)
         team_casse: List[Dict] = []
         for s in squadre:
-            cur.execute(
-                "SELECT cassa_iniziale, cassa_attuale FROM fantateam WHERE squadra=?",
-                (s,),
-            )
-            tr = cur.fetchone()
-            if tr and tr[0] is not None:
-                starting = float(tr[0])
-            else:
-                starting = 300.0
-            if has_fanta:
-                cur.execute(
-                    """
-                    SELECT COALESCE(SUM(CAST(
-                        REPLACE(REPLACE(REPLACE(REPLACE(COALESCE("Costo", '0'), ',', ''), '%', ''), '€', ''), ' ', '')
-                    AS REAL)), 0)
-                    FROM giocatori
-                    WHERE FantaSquadra = ?
-                      AND NOT (opzione IS NOT NULL AND anni_contratto IS NULL)
-                """,
-                    (s,),
-                )
-            else:
-                # legacy column 'squadra' fallback
-                cur.execute(
-                    """
-                    SELECT COALESCE(SUM(CAST(
-                        REPLACE(REPLACE(REPLACE(REPLACE(COALESCE("Costo", '0'), ',', ''), '%', ''), '€', ''), ' ', '')
-                    AS REAL)), 0)
-                    FROM giocatori
-                    WHERE squadra = ?
-                      AND NOT (opzione IS NOT NULL AND anni_contratto IS NULL)
-                """,
-                    (s,),
-                )
-            spent_row = cur.fetchone()
-            spent = (
-                float(spent_row[0]) if spent_row and spent_row[0] is not None else 0.0
-            )
-            remaining = starting - spent
-            if has_fanta:
-                cur.execute(
-                    """
-                    SELECT SUBSTR("R.",1,1) as code, COUNT(*) as cnt
-                    FROM giocatori
-                    WHERE FantaSquadra = ?
-                      AND NOT (opzione IS NOT NULL AND anni_contratto IS NULL)
-                    GROUP BY SUBSTR("R.",1,1)
-                """,
-                    (s,),
-                )
-            else:
-                cur.execute(
-                    """
-                    SELECT SUBSTR("R.",1,1) as code, COUNT(*) as cnt
-                    FROM giocatori
-                    WHERE squadra = ?
-                      AND NOT (opzione IS NOT NULL AND anni_contratto IS NULL)
-                    GROUP BY SUBSTR("R.",1,1)
-                """,
-                    (s,),
-                )
-            counts: Dict[str, int] = {row[0]: row[1] for row in cur.fetchall()}
-            portieri_count = int(counts.get("P", 0)) + int(counts.get("G", 0))
-            dif_count = int(counts.get("D", 0))
-            cen_count = int(counts.get("C", 0))
-            att_count = int(counts.get("A", 0))
-            missing_portieri = max(
-                0, rose_structure.get("Portieri", 0) - portieri_count
-            )
-            missing_dif = max(0, rose_structure.get("Difensori", 0) - dif_count)
-            missing_cen = max(0, rose_structure.get("Centrocampisti", 0) - cen_count)
-            missing_att = max(0, rose_structure.get("Attaccanti", 0) - att_count)
-            missing_total = missing_portieri + missing_dif + missing_cen + missing_att
-            team_casse.append(
-                {
-                    "squadra": s,
-                    "starting": starting,
-                    "spent": spent,
-                    "remaining": remaining,
-                    "missing": missing_total,
-                    "missing_portieri": missing_portieri,
-                    "missing_dif": missing_dif,
-                    "missing_cen": missing_cen,
-                    "missing_att": missing_att,
-                }
-            )
+            # TOTAL() is always a float, so spent needs no conversion
+            spent, *counts = totals.get(s, _NO_PLAYERS)
+            starting = team_cash.get(s, (300.0, 300.0))[0]
+            team_casse.append(build_team_summary(s, starting, spent, counts, targets))
         return team_casse
 
+    def get_team_rosters(self, conn: sqlite3.Connection, squadre, rose_structure):
+        """Return {team: {role: [player, ...]}} for ``squadre`` in one query."""
+        rosters: Dict[str, Dict[str, List[RosterPlayer]]] = {
+            s: {r: [] for r in rose_structure.keys()} for s in squadre
+        }
+        if not squadre:
+            return rosters
+        has_fanta = self._table_has_column(conn, "giocatori", "FantaSquadra")
+        team_col = "FantaSquadra" if has_fanta else "squadra"
+        sql = _team_rosters_sql(team_col, len(rosters))
+        for row in conn.execute(sql, tuple(rosters)):
+            rosters[row["team"]][row["role_key"]].append(
+                RosterPlayer._make(row[_PLAYER_SLICE])
+            )
+        return rosters
+
     def get_team_roster(self, conn: sqlite3.Connection, tname: str, rose_structure):
         """Return roster mapping and basic cassa computation for a team using sqlite fallback.
 
         Returns (team_roster, starting_pot, total_spent, cassa)
         """
-        ruolo_map = {
-            "P": "Portieri",
-            "D": "Difensori",
-            "C": "Centrocampisti",
-            "A": "Attaccanti",
-        }
-        team_roster: Dict[str, List[Dict[str, Any]]] = {
+        team_roster: Dict[str, List[RosterPlayer]] = {
             r: [] for r in rose_structure.keys()
         }
-        cur = conn.cursor()
         has_fanta = self._table_has_column(conn, "giocatori", "FantaSquadra")
-        if has_fanta:
-            cur.execute(
-                'SELECT rowid as id, "Nome" as nome, "Sq." as squadra_reale, "R." as ruolo, "Costo" as costo, anni_contratto, opzione FROM giocatori WHERE FantaSquadra = ? AND NOT (opzione IS NOT NULL AND anni_contratto IS NULL)',
-                (tname,),
-            )
-        else:
-            # fallback to legacy squadra column
-            cur.execute(
-                'SELECT rowid as id, "Nome" as nome, "Sq." as squadra_reale, "R." as ruolo, "Costo" as costo, anni_contratto, opzione FROM giocatori WHERE squadra = ? AND NOT (opzione IS NOT NULL AND anni_contratto IS NULL)',
-                (tname,),
-            )
-        rows = cur.fetchall()
+        # fallback to legacy squadra column
+        team_col = "FantaSquadra" if has_fanta else "squadra"
+        sql = _team_roster_sql(team_col, self._spent_expr(conn))
+        rows = self._cash_execute(conn, sql, (tname,)).fetchall()
+        starting = rows[0]["cassa_iniziale"]
+        # TOTAL() is always a float
+        total_spent = rows[0]["total_spent"]
         for row in rows:
-            codice = (row["ruolo"] or "").strip()
-            key = None
-            if codice:
-                ch = codice[0].upper()
-                # normalize legacy goalkeeper code 'G' to canonical 'P'
-                if ch == "G":
-                    ch = "P"
-                key = ruolo_map.get(ch)
-            if not key:
-                continue
-            team_roster[key].append(
-                {
-                    "id": row["id"],
-                    "nome": row["nome"],
-                    # store canonical single-letter role code
-                    "ruolo": ch,
-                    "squadra_reale": row["squadra_reale"],
-                    "costo": row["costo"],
-                    "anni_contratto": row["anni_contratto"],
-                    "opzione": row["opzione"],
-                }
-            )
+            # the anchor row of a team without players, or an unknown role
+            if row["role_key"] is not None:
+                team_roster[row["role_key"]].append(
+                    RosterPlayer._make(row[_PLAYER_SLICE])
+                )
 
-        cur.execute(
-            "SELECT cassa_iniziale, cassa_attuale FROM fantateam WHERE squadra=?",
-            (tname,),
-        )
-        team_row = cur.fetchone()
-        if team_row:
-            starting_pot = float(team_row[0])
-        else:
-            starting_pot = 300.0
-        total_spent = sum(
-            [float(r["costo"]) for r in rows if r["costo"] not in (None, "")]
-        )
+        starting_pot = float(starting) if starting is not None else 300.0
         cassa = starting_pot - total_spent
         return team_roster, starting_pot, total_spent, cassa
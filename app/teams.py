@@ -2,22 +2,18 @@ import logging
 
 from flask import Blueprint, current_app, render_template
 
-from app.db import get_connection
-from app.services.market_service import MarketService
+from app.db import get_db
+from app.services.market_service import ROLE_BUCKETS, MarketService
+from app.utils.templates import get_template
 
 bp = Blueprint("teams", __name__, url_prefix="/teams")
 
+_MARKET_SVC = MarketService()
+
 
 @bp.route("/<team_name>")
 def team_page(team_name):
     # decode is handled by Flask; use DB to fetch roster for this team
-    DB_PATH = current_app.config.get("DB_PATH")
-    ruolo_map = {
-        "P": "Portieri",
-        "D": "Difensori",
-        "C": "Centrocampisti",
-        "A": "Attaccanti",
-    }
     team_roster = {r: [] for r in current_app.config.get("ROSE_STRUCTURE", {}).keys()}
     # prefer ORM
     try:
@@ -40,16 +36,11 @@ def team_page(team_name):
                         p for p in players if p.team and p.team.name == team_name
                     ]
                 for p in players:
-                    codice = (p.role or "").strip()
-                    key = None
-                    if codice:
-                        ch = codice[0].upper()
-                        # normalize legacy 'G' (goalkeeper) to canonical 'P'
-                        if ch == "G":
-                            ch = "P"
-                        key = ruolo_map.get(ch)
-                    if not key:
+                    # legacy 'G' (goalkeeper) comes back as canonical 'P'
+                    bucket = ROLE_BUCKETS.get((p.role or "").lstrip()[:1])
+                    if bucket is None:
                         continue
+                    key, ch = bucket
                     team_roster[key].append(
                         {
                             "id": p.id,
@@ -74,18 +65,14 @@ def team_page(team_name):
                 # prefer the sqlite fallback so users see the up-to-date roster.
                 try:
                     if not players:
-                        conn_check = get_connection(DB_PATH)
-                        cur_check = conn_check.cursor()
-                        cur_check.execute(
+                        cur_check = get_db().execute(
                             "SELECT 1 FROM giocatori WHERE FantaSquadra = ? LIMIT 1",
                             (team_name,),
                         )
                         if cur_check.fetchone():
-                            conn_check.close()
                             session.close()
                             # fallthrough to sqlite fallback below
                             raise RuntimeError("use sqlite fallback")
-                        conn_check.close()
                 except Exception as e:
                     # close session and let fallback code below handle sqlite; log for visibility
                     try:
@@ -99,10 +86,9 @@ def team_page(team_name):
 
                 session.close()
                 return render_template(
-                    "team.html",
+                    get_template("team.html"),
                     tname=team_name,
                     roster=team_roster,
-                    rose_structure=current_app.config.get("ROSE_STRUCTURE", {}),
                     starting_pot=starting_pot,
                     total_spent=total_spent,
                     cassa=cassa,
@@ -116,17 +102,13 @@ def team_page(team_name):
     # fallback to sqlite
     # fallback to sqlite via MarketService helper
     try:
-        conn = get_connection(DB_PATH)
-        svc = MarketService()
-        team_roster, starting_pot, total_spent, cassa = svc.get_team_roster(
-            conn, team_name, current_app.config.get("ROSE_STRUCTURE", {})
+        team_roster, starting_pot, total_spent, cassa = _MARKET_SVC.get_team_roster(
+            get_db(), team_name, current_app.config.get("ROSE_STRUCTURE", {})
         )
-        conn.close()
         return render_template(
-            "team.html",
+            get_template("team.html"),
             tname=team_name,
             roster=team_roster,
-            rose_structure=current_app.config.get("ROSE_STRUCTURE", {}),
             starting_pot=starting_pot,
             total_spent=total_spent,
             cassa=cassa,
@@ -136,10 +118,9 @@ def team_page(team_name):
         logging.exception("Service-based team_roster lookup failed: %s", e)
         # preserve existing fallback behavior: empty roster and default cash
         return render_template(
-            "team.html",
+            get_template("team.html"),
             tname=team_name,
             roster=team_roster,
-            rose_structure=current_app.config.get("ROSE_STRUCTURE", {}),
             starting_pot=300.0,
             total_spent=0.0,
             cassa=300.0,
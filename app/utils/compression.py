@@ -0,0 +1,95 @@
+"""Gzip for text responses (HTML pages, JSON, the static JS/CSS)."""
+
+import gzip
+from typing import Dict, Tuple
+
+from flask import Flask, Response, request
+
+_COMPRESSIBLE = frozenset(
+    (
+        "text/html",
+        "text/css",
+        "text/plain",
+        "text/javascript",
+        "application/javascript",
+        "application/json",
+    )
+)
+# below this, the gzip header and the extra CPU outweigh the saved bytes
+MIN_SIZE = 500
+# static files are read into memory to be compressed; larger ones go as they are
+MAX_SIZE = 1 << 20
+# gzip bytes of static files by (path, ETag): each version is compressed once;
+# cleared wholesale when it grows past _STATIC_MAX entries
+_static_gzip: Dict[Tuple[str, str], bytes] = {}
+_STATIC_MAX = 32
+
+
+def _compressible(response: Response) -> bool:
+    if response.status_code != 200:
+        return False
+    if response.is_streamed and not response.direct_passthrough:
+        return False
+    if response.mimetype not in _COMPRESSIBLE:
+        return False
+    if "Content-Encoding" in response.headers:
+        return False
+    length = response.content_length
+    return length is None or MIN_SIZE <= length <= MAX_SIZE
+
+
+def init_app(app: Flask) -> None:
+    """Gzip text responses for clients that accept it.
+
+    Streamed pages (``stream_template``) are left alone, since buffering them
+    would defeat the streaming. So are responses already encoded, non-200
+    answers (304s carry no body) and bodies too small to gain anything. Static
+    files are compressed once per version and served from memory afterwards.
+    """
+
+    @app.after_request
+    def _gzip(response):
+        if not _compressible(response):
+            return response
+        # the body differs by Accept-Encoding even when this client gets identity
+        response.vary.add("Accept-Encoding")
+        if "gzip" not in request.accept_encodings:
+            return response
+        etag, weak = response.get_etag()
+        if response.direct_passthrough:
+            # send_file() bodies (static assets), tagged by mtime, size and path
+            if not etag:
+                return response
+            data = _gzip_static(response, etag)
+        else:
+            data = response.get_data()
+            if len(data) < MIN_SIZE:
+                return response
+            data = gzip.compress(data, compresslevel=6)
+        response.set_data(data)
+        response.headers["Content-Encoding"] = "gzip"
+        if etag and not weak:
+            # the gzip bytes differ from the identity ones the tag was made for
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def _gzip_static(response: Response, etag: str) -> bytes:
+    """Return the gzip body of a send_file() response, compressing it at most once."""
+    key = (request.path, etag)
+    source = response.response
+    try:
+        data = _static_gzip.get(key)
+        if data is None:
+            if len(_static_gzip) >= _STATIC_MAX:
+                _static_gzip.clear()
+            # paid once per file version, so the best ratio is affordable
+            data = _static_gzip[key] = gzip.compress(
+                b"".join(response.iter_encoded()), compresslevel=9
+            )
+    finally:
+        close = getattr(source, "close", None)
+        if close is not None:
+            close()
+    response.direct_passthrough = False
+    return data
@@ -211,28 +211,41 @@ def apply_roster(db_path, team_players, audit_info: dict | None = None):
                             )
                             s.rollback()
 
-        # update team cash balances using SQL to preserve fantateam semantics
-        for team_name in team_players.keys():
-            r = s.execute(
-                text("SELECT cassa_iniziale FROM fantateam WHERE squadra=:team"),
-                {"team": team_name},
-            ).fetchone()
-            starting = float(r[0]) if r and r[0] is not None else 300.0
-            spent_row = s.execute(
+        # update team cash balances using SQL to preserve fantateam semantics:
+        # read every starting pot and every team's spend once, then upsert all
+        # rows in a single batch instead of three statements per team
+        starting_by_team = {
+            row[0]: float(row[1])
+            for row in s.execute(
+                text("SELECT squadra, cassa_iniziale FROM fantateam")
+            ).fetchall()
+            if row[1] is not None
+        }
+        spent_by_team = {
+            row[0]: float(row[1] or 0.0)
+            for row in s.execute(
                 text(
-                    'SELECT COALESCE(SUM(CAST(REPLACE(REPLACE(REPLACE(COALESCE("Costo", "0"), ",", ""), "%", ""), " ", "") AS REAL)),0) as spent FROM giocatori WHERE squadra=:team AND NOT (opzione = "SI" AND anni_contratto IS NULL)'
-                ),
-                {"team": team_name},
-            ).fetchone()
-            spent = (
-                float(spent_row[0]) if spent_row and spent_row[0] is not None else 0.0
+                    'SELECT squadra, COALESCE(SUM(CAST(REPLACE(REPLACE(REPLACE(COALESCE("Costo", "0"), ",", ""), "%", ""), " ", "") AS REAL)),0) as spent FROM giocatori WHERE squadra IS NOT NULL AND NOT (opzione = "SI" AND anni_contratto IS NULL) GROUP BY squadra'
+                )
+            ).fetchall()
+        }
+        cash_rows = []
+        for team_name in team_players.keys():
+            starting = starting_by_team.get(team_name, 300.0)
+            cash_rows.append(
+                {
+                    "t": team_name,
+                    "start": starting,
+                    "att": starting - spent_by_team.get(team_name, 0.0),
+                }
             )
-            new_attuale = starting - spent
+        if cash_rows:
             s.execute(
                 text(
-                    "INSERT OR REPLACE INTO fantateam(squadra, carryover, cassa_iniziale, cassa_attuale) VALUES (:t,0,:start,:att)"
+                    "INSERT INTO fantateam(squadra, carryover, cassa_iniziale, cassa_attuale) VALUES (:t,0,:start,:att) "
+                    "ON CONFLICT(squadra) DO UPDATE SET cassa_iniziale=excluded.cassa_iniziale, cassa_attuale=excluded.cassa_attuale"
                 ),
-                {"t": team_name, "start": starting, "att": new_attuale},
+                cash_rows,
             )
 
         # commit ORM transaction
@@ -0,0 +1,52 @@
+"""Content-hashed static URLs so browsers can cache the assets indefinitely."""
+
+import hashlib
+import os
+from typing import Dict, Tuple
+
+from flask import Flask, request
+
+# (app static folder, filename) -> (mtime_ns, digest)
+_digests: Dict[Tuple[str, str], Tuple[int, str]] = {}
+
+
+def _digest(static_folder: str, filename: str) -> str:
+    """Short content hash of a static file, recomputed only when it changes."""
+    path = os.path.join(static_folder, filename)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return ""
+    key = (static_folder, filename)
+    cached = _digests.get(key)
+    if cached is None or cached[0] != mtime:
+        with open(path, "rb") as f:
+            cached = _digests[key] = (mtime, hashlib.sha1(f.read()).hexdigest()[:12])
+    return cached[1]
+
+
+def init_app(app: Flask) -> None:
+    """Version ``url_for('static', ...)`` links and mark them immutable.
+
+    Every static URL gets a ``?v=<hash>`` of the file contents, so a changed
+    asset gets a new URL and the long ``SEND_FILE_MAX_AGE_DEFAULT`` never
+    serves a stale copy. Unversioned requests (hand-written ``/static/...``
+    links) are revalidated instead.
+    """
+
+    @app.url_defaults
+    def _static_version(endpoint, values):
+        if endpoint == "static" and "v" not in values and app.static_folder:
+            digest = _digest(app.static_folder, values.get("filename", ""))
+            if digest:
+                values["v"] = digest
+
+    @app.after_request
+    def _static_immutable(response):
+        if request.endpoint == "static":
+            if "v" in request.args:
+                response.cache_control.immutable = True
+            else:
+                response.cache_control.max_age = None
+                response.cache_control.no_cache = True
+        return response
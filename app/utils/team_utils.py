@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from difflib import get_close_matches
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 
 from sqlalchemy.orm import Session
 
@@ -68,6 +68,34 @@ def resolve_team_by_alias(
     return None
 
 
+def resolve_teams_by_alias(session: Session, names: Iterable[str]) -> Dict[str, Team]:
+    """Resolve several names at once, like ``resolve_team_by_alias`` without a league.
+
+    Two queries in all (exact Team.name, then TeamAlias.alias for the rest)
+    instead of up to two per name. Unresolved names are left out.
+    """
+    wanted = {name: name.strip() for name in names if name}
+    if not wanted:
+        return {}
+    by_name: Dict[str, Team] = {}
+    for t in (
+        session.query(Team)
+        .filter(Team.name.in_(set(wanted.values())))
+        .order_by(Team.id)
+    ):
+        by_name.setdefault(t.name, t)
+    missing = set(wanted.values()) - set(by_name)
+    if missing:
+        for alias, t in (
+            session.query(TeamAlias.alias, Team)
+            .join(Team, TeamAlias.team_id == Team.id)
+            .filter(TeamAlias.alias.in_(missing))
+            .order_by(TeamAlias.id)
+        ):
+            by_name.setdefault(alias, t)
+    return {name: by_name[q] for name, q in wanted.items() if q in by_name}
+
+
 def populate_team_aliases(
     session: Session, source: str = "fantateam", fuzzy_threshold: float = 0.6
 ) -> List[TeamAlias]:
@@ -113,8 +141,16 @@ def populate_team_aliases(
     teams = session.query(Team).all()
     cash_map: Dict[int, List[Team]] = {}
     name_list = [t.name for t in teams]
+    # name lookups and the alias dedupe below read these instead of querying
+    # once per source row; the first team with a given name wins, like .first()
+    team_by_name: Dict[str, Team] = {}
     for t in teams:
         cash_map.setdefault(t.cash, []).append(t)
+        team_by_name.setdefault(t.name, t)
+    existing_aliases = {
+        (team_id, alias.lower())
+        for team_id, alias in session.query(TeamAlias.team_id, TeamAlias.alias)
+    }
 
     for r in rows:
         raw_alias = r[0] or ""
@@ -162,17 +198,13 @@ def populate_team_aliases(
             if rf_process:
                 best_global = rf_process.extractOne(alias_name, name_list)
                 if best_global and best_global[1] / 100.0 >= fuzzy_threshold:
-                    matched_team = (
-                        session.query(Team).filter(Team.name == best_global[0]).first()
-                    )
+                    matched_team = team_by_name.get(best_global[0])
             else:
                 best_global = get_close_matches(
                     alias_name, name_list, n=1, cutoff=fuzzy_threshold
                 )
                 if best_global:
-                    matched_team = (
-                        session.query(Team).filter(Team.name == best_global[0]).first()
-                    )
+                    matched_team = team_by_name.get(best_global[0])
 
         if matched_team:
             # apply canonical mapping override
@@ -181,27 +213,20 @@ def populate_team_aliases(
                 # ensure the canonical team matches target if possible
                 canon = canonical_map[key]
                 # canonical name may differ in case; prefer resolving canon via team name
-                canon_team = session.query(Team).filter(Team.name == canon).first()
+                canon_team = team_by_name.get(canon)
                 if canon_team:
                     matched_team = canon_team
 
-            # dedupe alias insertion (case-insensitive) - skip if no matched team
-            if matched_team:
-                exists = (
-                    session.query(TeamAlias)
-                    .filter(TeamAlias.team_id == matched_team.id)
-                    .filter(TeamAlias.alias.ilike(alias_name))
-                    .first()
-                )
-            else:
-                exists = None
-            if not exists and matched_team:
+            # dedupe alias insertion (case-insensitive)
+            alias_key = (matched_team.id, alias_name.lower())
+            if alias_key not in existing_aliases:
+                existing_aliases.add(alias_key)
                 ta = TeamAlias(team_id=matched_team.id, alias=alias_name)
                 session.add(ta)
                 created.append(ta)
 
     # perform deduplication across teams: if same alias exists for multiple team_ids, keep first and remove others
-    session.commit()
+    # (the query flushes the new aliases; everything commits once below)
     # global dedupe: group by normalized alias
     all_aliases = session.query(TeamAlias).all()
     seen = {}
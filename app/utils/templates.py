@@ -0,0 +1,74 @@
+"""Compiled template lookup and rendered-partial cache for the hot HTML pages."""
+
+import logging
+import os
+from typing import Any, Callable, Dict, Hashable, Iterable
+
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache, Template
+from markupsafe import Markup
+
+
+def init_bytecode_cache(app) -> None:
+    """Keep compiled template bytecode in ``TEMPLATE_CACHE_DIR`` when it is set.
+
+    get_template only saves compilation within one process; the bytecode cache
+    lets a restarted worker skip parsing and code generation as well. Jinja
+    checks the source checksum, so edited templates are still recompiled.
+    """
+    cache_dir = app.config.get("TEMPLATE_CACHE_DIR")
+    if not cache_dir:
+        return
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError as e:
+        logging.debug("Template bytecode cache disabled: %s", e)
+        return
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+
+def get_template(name: str) -> Template:
+    """Return the compiled Template for ``name``, resolved once per app.
+
+    ``render_template`` accepts a Template object, so callers pass the result
+    straight to it and keep context processors and signals, while skipping the
+    loader cache lookup and globals merge Jinja does for every
+    ``render_template(name)``. When ``jinja_env.auto_reload`` is on (debug) the
+    file is still checked and recompiled after edits.
+    """
+    env = current_app.jinja_env
+    templates = current_app.extensions.setdefault("compiled_templates", {})
+    template = templates.get(name)
+    if template is None or (env.auto_reload and not template.is_up_to_date):
+        template = templates[name] = env.get_template(name)
+    return template
+
+
+# Rendered partials kept per app; cleared wholesale when it grows past this
+_RENDERED_MAX = 64
+
+
+def render_cached(
+    name: str, key: Hashable, context: Callable[[], Dict[str, Any]]
+) -> Markup:
+    """Render the partial ``name`` once per ``key`` and reuse the HTML.
+
+    ``key`` must capture everything the output depends on (for data-driven
+    partials, a data version). ``context`` is only called on a miss, so
+    callers can defer the queries that feed the partial.
+    """
+    rendered = current_app.extensions.setdefault("rendered_partials", {})
+    html = rendered.get((name, key))
+    if html is None:
+        if len(rendered) >= _RENDERED_MAX:
+            rendered.clear()
+        html = rendered[(name, key)] = Markup(get_template(name).render(**context()))
+    return html
+
+
+def team_bar(squadre: Iterable[str]) -> Markup:
+    """Jinja global: the fixed team navigation bar for ``squadre``."""
+    squadre = tuple(squadre)
+    return render_cached(
+        "partials/team_bar.html", squadre, lambda: {"squadre": squadre}
+    )
@@ -4,7 +4,7 @@ import sqlite3
 
 import pandas as pd
 
-from app.db import get_connection
+from app.db import ensure_legacy_schema, get_connection
 
 # Percorso del file Excel
 excel_path = os.path.join(
@@ -45,5 +45,9 @@ if "anni_contratto" not in df.columns:
     df["anni_contratto"] = None
 
 df.to_sql("giocatori", conn, if_exists="replace", index=False)
+# to_sql(replace) drops the table together with its indexes, the costo_num and
+# search-index triggers and the generated role_code; the FTS tables it leaves
+# behind still point at the old rowids, so rebuild the whole legacy schema
+ensure_legacy_schema(conn)
 conn.close()
 print("Importazione completata!")
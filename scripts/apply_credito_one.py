@@ -33,10 +33,10 @@ def show_all_teams():
 print("\nBefore update:")
 show_all_teams()
 
-# Find candidate teams matching 'bioparco' (case-insensitive)
-cur.execute("SELECT squadra FROM fantateam")
-teams = [r["squadra"] for r in cur.fetchall()]
-matches = [t for t in teams if "bioparco" in t.lower()]
+# Find candidate teams matching 'bioparco' (case-insensitive), with their cash
+cur.execute("SELECT squadra, cassa_iniziale, cassa_attuale FROM fantateam")
+cash = {r["squadra"]: r for r in cur.fetchall()}
+matches = [t for t in cash if "bioparco" in t.lower()]
 if not matches:
     print('\nNo fantateam row matching "bioparco" found. Exiting.')
     conn.close()
@@ -44,45 +44,35 @@ if not matches:
 
 print("\nTeams matched for update:", matches)
 
+marks = ",".join("?" * len(matches))
+# compute spent for verification, all matched teams in one query
+cur.execute(
+    f"""SELECT squadra, COALESCE(SUM(CAST(REPLACE(REPLACE(REPLACE(COALESCE("Costo","0"), ",", ""), "%", ""), " ", "") AS REAL)),0) as spent FROM giocatori WHERE squadra IN ({marks}) GROUP BY squadra""",
+    matches,
+)
+spent_by_team = {r["squadra"]: float(r["spent"]) for r in cur.fetchall()}
+
 NEW = 31.0
 for team in matches:
-    # compute spent for verification
-    cur.execute(
-        """SELECT COALESCE(SUM(CAST(REPLACE(REPLACE(REPLACE(COALESCE("Costo","0"), ",", ""), "%", ""), " ", "") AS REAL)),0) as spent FROM giocatori WHERE squadra=?""",
-        (team,),
-    )
-    spent_row = cur.fetchone()
-    spent = (
-        float(spent_row["spent"])
-        if spent_row and spent_row["spent"] is not None
-        else 0.0
-    )
-
-    cur.execute(
-        "SELECT cassa_iniziale, cassa_attuale FROM fantateam WHERE squadra=?", (team,)
-    )
-    r = cur.fetchone()
+    r = cash[team]
     before_iniz = (
-        float(r["cassa_iniziale"]) if r and r["cassa_iniziale"] is not None else None
-    )
-    before_att = (
-        float(r["cassa_attuale"]) if r and r["cassa_attuale"] is not None else None
+        float(r["cassa_iniziale"]) if r["cassa_iniziale"] is not None else None
     )
-
+    before_att = float(r["cassa_attuale"]) if r["cassa_attuale"] is not None else None
+    spent = spent_by_team.get(team, 0.0)
     print(
         f"\nUpdating team '{team}': before cassa_attuale={before_att}, starting={before_iniz}, spent={spent}"
     )
-    cur.execute("UPDATE fantateam SET cassa_attuale=? WHERE squadra=?", (NEW, team))
-    conn.commit()
 
-    cur.execute(
-        "SELECT cassa_iniziale, cassa_attuale FROM fantateam WHERE squadra=?", (team,)
-    )
-    r2 = cur.fetchone()
-    after_att = (
-        float(r2["cassa_attuale"]) if r2 and r2["cassa_attuale"] is not None else None
-    )
-    print(f"Updated '{team}': after cassa_attuale={after_att}")
+cur.execute(
+    f"UPDATE fantateam SET cassa_attuale=? WHERE squadra IN ({marks})"
+    " RETURNING squadra, cassa_attuale",
+    (NEW, *matches),
+)
+for r2 in cur.fetchall():
+    after_att = float(r2["cassa_attuale"]) if r2["cassa_attuale"] is not None else None
+    print(f"Updated '{r2['squadra']}': after cassa_attuale={after_att}")
+conn.commit()
 
 print("\nAfter update:")
 show_all_teams()
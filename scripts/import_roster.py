@@ -198,31 +198,24 @@ for team, players in team_players.items():
 
 # After changes, recompute team cash: for each team set cassa_attuale = cassa_iniziale - SUM(Costo of assigned players)
 print("\nUpdating team cash balances...")
-for team in team_players.keys():
-    # ensure fantateam row exists
-    cur.execute(
-        "SELECT cassa_iniziale, cassa_attuale FROM fantateam WHERE squadra=?", (team,)
-    )
-    r = cur.fetchone()
-    if r and r["cassa_iniziale"] is not None:
-        starting = float(r["cassa_iniziale"])
-    else:
-        starting = 300.0
-    cur.execute(
-        'SELECT COALESCE(SUM(CAST(REPLACE(REPLACE(REPLACE(COALESCE("Costo", "0"), ",", ""), "%", ""), " ", "") AS REAL)),0) as spent FROM giocatori WHERE squadra=? AND NOT (opzione = "SI" AND anni_contratto IS NULL)',
-        (team,),
-    )
-    spent_row = cur.fetchone()
-    spent = (
-        float(spent_row["spent"])
-        if spent_row and spent_row["spent"] is not None
-        else 0.0
+# Read all starting pots and per-team spend once, then upsert every row in one batch
+starting_by_team = {
+    r["squadra"]: float(r["cassa_iniziale"])
+    for r in cur.execute("SELECT squadra, cassa_iniziale FROM fantateam")
+    if r["cassa_iniziale"] is not None
+}
+spent_by_team = {
+    r["squadra"]: float(r["spent"] or 0.0)
+    for r in cur.execute(
+        'SELECT squadra, COALESCE(SUM(CAST(REPLACE(REPLACE(REPLACE(COALESCE("Costo", "0"), ",", ""), "%", ""), " ", "") AS REAL)),0) as spent FROM giocatori WHERE squadra IS NOT NULL AND NOT (opzione = "SI" AND anni_contratto IS NULL) GROUP BY squadra'
     )
+}
+cash_rows = []
+for team in team_players.keys():
+    starting = starting_by_team.get(team, 300.0)
+    spent = spent_by_team.get(team, 0.0)
     new_attuale = starting - spent
-    cur.execute(
-        "INSERT OR REPLACE INTO fantateam(squadra, carryover, cassa_iniziale, cassa_attuale) VALUES (?,?,?,?)",
-        (team, 0, starting, new_attuale),
-    )
+    cash_rows.append((team, 0, starting, new_attuale))
     print(
         " Team",
         team,
@@ -234,6 +227,12 @@ for team in team_players.keys():
         new_attuale,
     )
 
+cur.executemany(
+    "INSERT INTO fantateam(squadra, carryover, cassa_iniziale, cassa_attuale) VALUES (?,?,?,?) "
+    "ON CONFLICT(squadra) DO UPDATE SET cassa_iniziale=excluded.cassa_iniziale, cassa_attuale=excluded.cassa_attuale",
+    cash_rows,
+)
+
 conn.commit()
 conn.close()
 
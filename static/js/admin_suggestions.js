@@ -0,0 +1,40 @@
+// Confirmation prompts for the admin suggested-mappings page
+
+// Bulk approve: confirm and submit with selected items
+(function(){
+  const bulkBtn = document.getElementById('bulk-approve');
+  const form = document.getElementById('suggestions-form');
+  if(!bulkBtn || !form) return;
+  bulkBtn.addEventListener('click', function(){
+    const checked = Array.from(form.querySelectorAll('input[type=checkbox][name=selected]:checked'));
+    if(checked.length === 0){
+      alert('Seleziona almeno una proposta da approvare.');
+      return;
+    }
+    const aliases = checked.map(c => c.value).slice(0,5).join(', ');
+    const more = (checked.length>5)? (' e altri ' + (checked.length-5)) : '';
+    const msg = `Approvi ${checked.length} mapping? Esempi: ${aliases}${more} . Procedere?`;
+    if(!confirm(msg)) return;
+    // set hidden action then submit
+    const actionInput = form.querySelector('input[name=action]');
+    if(actionInput) actionInput.value = 'approve';
+    form.submit();
+  });
+})();
+
+// Per-row approve forms: attach confirm to their submit buttons
+(function(){
+  const forms = document.querySelectorAll('form');
+  forms.forEach(f => {
+    const btn = f.querySelector('button[name="action"][value="approve_one"]');
+    if(btn){
+      btn.addEventListener('click', function(e){
+        // find hidden input 'one' value in the form
+        const one = f.querySelector('input[name=one]')?.value || '';
+        if(!confirm(`Approvi la mapping per "${one}"?`)){
+          e.preventDefault();
+        }
+      });
+    }
+  });
+})();
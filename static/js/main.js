@@ -1,19 +1,14 @@
 // Consolidated JS extracted from templates
 document.addEventListener('click', function(e){
-  // header sort link delegation (index page)
-  var a = e.target.closest && e.target.closest('a.header-link');
+  // header sort and pagination link delegation (index page)
+  var a = e.target.closest && e.target.closest('a.header-link, a.page-link');
   if(a){
     e.preventDefault();
     var url = a.getAttribute('href');
-    fetch(url).then(r=>r.text()).then(html=>{
-      var m = html.match(/<div id="players-table">([\s\S]*?)<\/div>/i);
-      if(m){
-        var container = document.getElementById('players-table');
-        if(container) container.innerHTML = m[1];
-      } else {
-        document.body.innerHTML = html;
-      }
-    }).catch(function(err){ console.error('Failed to load sorted table', err); window.location = url; });
+    refreshPlayersTable(url).then(function(ok){
+      if(ok) history.replaceState(null, '', url);
+      else window.location = url;
+    }).catch(function(err){ console.error('Failed to load players table', err); window.location = url; });
     return;
   }
 
@@ -41,6 +36,118 @@ document.addEventListener('click', function(e){
   }
 });
 
+// Replace the players table with the server-rendered fragment for `query`
+// (a "?..." query string); resolves false when the page has no table.
+// A newer call aborts the one still in flight (rapid sort/page clicks), so
+// only the last requested table is fetched to the end and rendered.
+var tableRequest = null;
+// Fragments already fetched, by query string: toggling back to a sort or page
+// seen in the last TABLE_CACHE_MS needs no request. Cleared after an
+// assignment; the oldest entry goes first once TABLE_CACHE_SIZE is reached.
+var TABLE_CACHE_SIZE = 32;
+var TABLE_CACHE_MS = 30000;
+var tableCache = new Map();
+function refreshPlayersTable(query){
+  var container = document.getElementById('players-table');
+  if(!container || !container.dataset.src) return Promise.resolve(false);
+  if(tableRequest) tableRequest.abort();
+  var key = query || '';
+  var hit = tableCache.get(key);
+  if(hit && Date.now() - hit.at < TABLE_CACHE_MS){
+    tableRequest = null;
+    container.innerHTML = hit.html;
+    return Promise.resolve(true);
+  }
+  var ctrl = tableRequest = new AbortController();
+  return fetch(container.dataset.src + key, {signal: ctrl.signal}).then(function(r){
+    if(!r.ok) throw new Error(r.statusText);
+    return r.text();
+  }).then(function(html){
+    if(tableRequest === ctrl) tableRequest = null;
+    tableCache.delete(key);
+    if(tableCache.size >= TABLE_CACHE_SIZE) tableCache.delete(tableCache.keys().next().value);
+    tableCache.set(key, {html: html, at: Date.now()});
+    container.innerHTML = html;
+    return true;
+  }, function(err){
+    // superseded: the newer request renders the table
+    if(err.name === 'AbortError') return true;
+    throw err;
+  });
+}
+
+// Format numbers like the server-side template does (300 -> "300.0")
+function fmtAmount(n){ return Number.isInteger(n) ? n.toFixed(1) : String(n); }
+
+function teamBox(t, extraStyle){
+  var box = document.createElement('div');
+  box.className = 'team-box';
+  box.style.cssText = 'flex:0 1 12.5%; min-width:120px; max-width:12.5%; box-sizing:border-box;' + (extraStyle || '');
+  var name = document.createElement('div');
+  name.className = 'team-name';
+  name.textContent = t.squadra;
+  box.appendChild(name);
+  return box;
+}
+
+function badge(cls, text){
+  var span = document.createElement('span');
+  span.className = cls;
+  span.textContent = text;
+  return span;
+}
+
+// Rebuild the team cash and missing-player boxes from /api/team_cash data
+// (also returned by the assign form when it asks for JSON); a payload equal to
+// the last one rendered leaves the DOM alone.
+var lastTeamCash = null;
+function renderTeamCash(data){
+  var key = JSON.stringify(data);
+  if(key === lastTeamCash) return;
+  lastTeamCash = key;
+  var cash = document.querySelector('.team-cash-container');
+  if(cash){
+    cash.replaceChildren.apply(cash, data.team_casse.map(function(t){
+      var box = teamBox(t);
+      var values = document.createElement('div');
+      values.className = 'team-values';
+      values.append('Cassa attuale: ');
+      var strong = document.createElement('strong');
+      strong.textContent = fmtAmount(t.remaining);
+      values.appendChild(strong);
+      var sub = document.createElement('div');
+      sub.className = 'team-sub';
+      sub.textContent = 'Cassa iniziale: ' + fmtAmount(t.starting);
+      box.append(values, sub);
+      return box;
+    }));
+  }
+  var missing = document.querySelector('.team-missing-container');
+  if(missing){
+    missing.replaceChildren.apply(missing, data.team_casse_missing.map(function(t){
+      var box = teamBox(t, ' background:#f8f8f8;');
+      var outer = document.createElement('div');
+      outer.style.marginTop = '8px';
+      var row = document.createElement('div');
+      row.style.cssText = 'display:flex; gap:8px; align-items:center; flex-wrap:wrap;';
+      var total = badge('team-missing', 'Giocatori mancanti: ');
+      var strong = document.createElement('strong');
+      strong.textContent = t.missing;
+      total.appendChild(strong);
+      row.append(
+        total,
+        badge('role-badge role-p', 'P ' + t.missing_portieri),
+        badge('role-badge role-d', 'D ' + t.missing_dif),
+        badge('role-badge role-c', 'C ' + t.missing_cen),
+        badge('role-badge role-a', 'A ' + t.missing_att)
+      );
+      outer.appendChild(row);
+      box.appendChild(outer);
+      return box;
+    }));
+  }
+}
+
 // Assign popup helper functions
 function openAssignPopup(id, nome) {
     var elId = document.getElementById('assign_id');
@@ -62,14 +169,25 @@ function updateOpzione() {
   else { opzione.checked = true; opzione.disabled = false; }
 }
 
+// set while an assignment is being sent: a second submit (double click, Enter
+// held down) would charge the team twice
+var assignPending = false;
 async function submitAssignForm(){
     var form = document.getElementById('assignForm');
-    if(!form) return false;
+    if(!form || assignPending) return false;
+    assignPending = true;
+    try{ return await sendAssignForm(form); }
+    finally{ assignPending = false; }
+}
+
+async function sendAssignForm(form){
     var formData = new FormData(form);
     var params = new URLSearchParams();
     for (const pair of formData.entries()) params.append(pair[0], pair[1]);
     try{
-        var res = await fetch(form.action, {method:'POST', body: params});
+        // ask for JSON: the response carries the updated team cash and the
+        // players table for the current search, so nothing is fetched again
+        var res = await fetch(form.action + window.location.search, {method:'POST', body: params, headers: {'Accept': 'application/json'}});
         if(!res.ok){
             var text = await res.text();
             var errBox = document.getElementById('assignError');
@@ -79,15 +197,16 @@ async function submitAssignForm(){
         }
         closeAssignPopup();
         try{
-            var rhtml = await fetch('/');
-            var text = await rhtml.text();
-            var m1 = text.match(/<div class="team-cash-container">([\s\S]*?)<\/div>/i);
-            if(m1){
-                var container = document.querySelector('.team-cash-container');
-                if(container) container.outerHTML = '<div class="team-cash-container">' + m1[1] + '</div>';
+            var data = await res.json();
+            tableCache.clear();
+            var container = document.getElementById('players-table');
+            if(container && data.players_html !== undefined){
+              // a table still loading shows the players before this assignment
+              if(tableRequest){ tableRequest.abort(); tableRequest = null; }
+              container.innerHTML = data.players_html;
             }
-            var m2 = text.match(/<div id="players-table">([\s\S]*?)<\/div>/i);
-            if(m2){ var pt = document.getElementById('players-table'); if(pt) pt.innerHTML = m2[1]; }
+            delete data.players_html;
+            renderTeamCash(data);
         }catch(e){ window.location.reload(); }
         return false;
     }catch(e){ var errBox = document.getElementById('assignError'); if(errBox){ errBox.style.display='block'; errBox.innerText = 'Errore invio: ' + e.message; } else alert('Errore invio: ' + e.message); return false; }
@@ -0,0 +1,89 @@
+function openAssignPopup() {
+    document.getElementById('assignPopup').style.display = 'block';
+    document.getElementById('assignError').style.display = 'none';
+}
+
+function closeAssignPopup() {
+    document.getElementById('assignPopup').style.display = 'none';
+}
+
+function submitAssignForm() {
+    const form = document.getElementById('assignForm');
+    const formData = new FormData(form);
+
+    fetch('/market/assign', {
+        method: 'POST',
+        body: formData
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            alert(data.message);
+            location.reload();
+        } else {
+            const errorDiv = document.getElementById('assignError');
+            errorDiv.textContent = data.error || 'Errore durante l\'assegnazione';
+            errorDiv.style.display = 'block';
+        }
+    })
+    .catch(error => {
+        const errorDiv = document.getElementById('assignError');
+        errorDiv.textContent = 'Errore di rete: ' + error.message;
+        errorDiv.style.display = 'block';
+    });
+
+    return false;
+}
+
+function unassignPlayer(playerId, playerName) {
+    if (confirm(`Vuoi svincolari ${playerName}?`)) {
+        const formData = new FormData();
+        formData.append('player_id', playerId);
+
+        fetch('/market/unassign', {
+            method: 'POST',
+            body: formData
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                alert(data.message);
+                location.reload();
+            } else {
+                alert(data.error || 'Errore durante lo svincolamento');
+            }
+        })
+        .catch(error => {
+            alert('Errore di rete: ' + error.message);
+        });
+    }
+}
+
+// Event listeners
+document.addEventListener('DOMContentLoaded', function() {
+    const assignBtn = document.querySelector('.assign-btn');
+    if (assignBtn) {
+        assignBtn.addEventListener('click', function() {
+            openAssignPopup();
+        });
+    }
+
+    const unassignBtn = document.querySelector('.unassign-btn');
+    if (unassignBtn) {
+        unassignBtn.addEventListener('click', function() {
+            const playerId = this.getAttribute('data-id');
+            const playerName = this.getAttribute('data-name');
+            unassignPlayer(playerId, playerName);
+        });
+    }
+
+    // Close popup on background click
+    const assignPopup = document.getElementById('assignPopup');
+    if (assignPopup) {
+        assignPopup.addEventListener('click', function(e) {
+            if (e.target === this) {
+                closeAssignPopup();
+            }
+        });
+    }
+});
@@ -0,0 +1,221 @@
+import sqlite3
+
+import pytest
+from flask import Flask
+
+from app.db import (
+    SEARCH_TABLE,
+    bump_data_version,
+    close_pools,
+    data_version,
+    ensure_legacy_schema,
+    get_connection,
+    get_db,
+    init_app,
+    legacy_schema_ready,
+    table_columns,
+    txn,
+)
+
+
+def test_data_version_changes_on_commit_and_local_bump(tmp_path):
+    db_path = str(tmp_path / "g.db")
+    conn = get_connection(db_path)
+    try:
+        conn.execute("CREATE TABLE giocatori (Nome TEXT)")
+        conn.commit()
+        before = data_version(db_path)
+        assert data_version(db_path) == before
+
+        # a commit from an unrelated connection (another worker/script)
+        other = sqlite3.connect(db_path)
+        other.execute("INSERT INTO giocatori VALUES ('Mario Rossi')")
+        other.commit()
+        other.close()
+        after_write = data_version(db_path)
+        assert after_write != before
+
+        bump_data_version()
+        assert data_version(db_path) != after_write
+    finally:
+        conn.close()
+
+
+def test_table_columns_cache_follows_schema_changes(tmp_path):
+    db_path = str(tmp_path / "g.db")
+    conn = get_connection(db_path)
+    try:
+        assert table_columns(conn, "giocatori") == frozenset()
+        conn.execute('CREATE TABLE giocatori (Nome TEXT, "R." TEXT)')
+        conn.commit()
+        assert table_columns(conn, "giocatori") == {"Nome", "R."}
+
+        # schema change made through another connection invalidates the cache
+        other = sqlite3.connect(db_path)
+        other.execute("ALTER TABLE giocatori ADD COLUMN FantaSquadra TEXT")
+        other.commit()
+        other.close()
+        assert "FantaSquadra" in table_columns(conn, "giocatori")
+    finally:
+        conn.close()
+
+
+def test_txn_commits_once_and_rolls_back_nested_blocks(tmp_path):
+    db_path = str(tmp_path / "g.db")
+    conn = get_connection(db_path)
+    conn.isolation_level = None
+    try:
+        conn.execute("CREATE TABLE fantateam (squadra TEXT PRIMARY KEY, cassa REAL)")
+        with txn(conn):
+            conn.execute("INSERT INTO fantateam VALUES ('TeamA', 300)")
+            with pytest.raises(ValueError):
+                with txn(conn):
+                    conn.execute("UPDATE fantateam SET cassa = 0")
+                    raise ValueError("abort the inner block only")
+            assert conn.in_transaction
+        assert not conn.in_transaction
+        assert conn.execute("SELECT cassa FROM fantateam").fetchone()[0] == 300
+
+        with pytest.raises(RuntimeError):
+            with txn(conn):
+                conn.execute("DELETE FROM fantateam")
+                raise RuntimeError("boom")
+        assert conn.execute("SELECT COUNT(*) FROM fantateam").fetchone()[0] == 1
+    finally:
+        conn.close()
+
+
+def test_get_db_is_read_only_for_get_requests(tmp_path):
+    db_path = str(tmp_path / "g.db")
+    app = Flask(__name__)
+    app.config["DB_PATH"] = db_path
+    init_app(app)
+    try:
+        with app.test_request_context("/", method="POST"):
+            get_db().execute("CREATE TABLE giocatori (Nome TEXT)")
+        with app.test_request_context("/", method="GET"):
+            conn = get_db()
+            assert conn.execute("SELECT COUNT(*) FROM giocatori").fetchone()[0] == 0
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO giocatori VALUES ('Mario Rossi')")
+    finally:
+        close_pools()
+
+
+def test_init_db_command_creates_legacy_schema(tmp_path):
+    db_path = str(tmp_path / "g.db")
+    conn = get_connection(db_path)
+    try:
+        conn.execute('CREATE TABLE giocatori (Nome TEXT, squadra TEXT, "R." TEXT)')
+        conn.commit()
+        assert not legacy_schema_ready(conn)
+
+        app = Flask(__name__)
+        app.config["DB_PATH"] = db_path
+        init_app(app)
+        result = app.test_cli_runner().invoke(args=["init-db"])
+        assert result.exit_code == 0, result.output
+        assert legacy_schema_ready(conn)
+    finally:
+        conn.close()
+
+
+def test_legacy_schema_keeps_costo_num_in_sync(tmp_path):
+    db_path = str(tmp_path / "g.db")
+    conn = get_connection(db_path)
+    try:
+        conn.execute('CREATE TABLE giocatori (Nome TEXT, "Costo" TEXT)')
+        conn.executemany(
+            "INSERT INTO giocatori VALUES (?, ?)", [("A", "1,5"), ("B", None)]
+        )
+        conn.commit()
+        ensure_legacy_schema(conn)
+        assert legacy_schema_ready(conn)
+
+        conn.execute("INSERT INTO giocatori(Nome, \"Costo\") VALUES ('C', '12 €')")
+        conn.execute("UPDATE giocatori SET \"Costo\" = '7' WHERE Nome = 'A'")
+        conn.commit()
+        rows = conn.execute("SELECT Nome, costo_num FROM giocatori ORDER BY Nome")
+        assert [tuple(r) for r in rows] == [("A", 7.0), ("B", None), ("C", 12.0)]
+    finally:
+        conn.close()
+
+
+def test_legacy_schema_adds_indexed_role_code(tmp_path):
+    db_path = str(tmp_path / "g.db")
+    conn = get_connection(db_path)
+    try:
+        conn.execute('CREATE TABLE giocatori (Nome TEXT, "R." TEXT)')
+        conn.executemany(
+            "INSERT INTO giocatori VALUES (?, ?)",
+            [("A", "P"), ("B", "d"), ("C", "Dc"), ("D", None)],
+        )
+        conn.commit()
+        ensure_legacy_schema(conn)
+        assert legacy_schema_ready(conn)
+        assert "role_code" in table_columns(conn, "giocatori")
+
+        # positional inserts still skip the generated column
+        conn.execute("INSERT INTO giocatori VALUES ('E', 'A')")
+        conn.commit()
+        sql = "SELECT Nome FROM giocatori WHERE role_code IN (?, ?) ORDER BY Nome"
+        assert [r[0] for r in conn.execute(sql, ("D", "A"))] == ["B", "C", "E"]
+        plan = " ".join(
+            r[-1] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, ("D", "A"))
+        )
+        assert "ix_giocatori_role_code" in plan
+    finally:
+        conn.close()
+
+
+def test_legacy_schema_indexes_team_probe(tmp_path):
+    db_path = str(tmp_path / "g.db")
+    conn = get_connection(db_path)
+    try:
+        conn.execute("CREATE TABLE giocatori (Nome TEXT, FantaSquadra TEXT)")
+        conn.commit()
+        ensure_legacy_schema(conn)
+        assert legacy_schema_ready(conn)
+        sql = "SELECT 1 FROM giocatori WHERE FantaSquadra = ? LIMIT 1"
+        plan = " ".join(
+            r[-1] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, ("x",))
+        )
+        assert "COVERING INDEX ix_giocatori_fantasquadra" in plan
+    finally:
+        conn.close()
+
+
+def test_search_index_follows_writes(tmp_path):
+    db_path = str(tmp_path / "g.db")
+    conn = get_connection(db_path)
+
+    def search(text):
+        return [
+            r[0]
+            for r in conn.execute(
+                f"SELECT Nome FROM giocatori WHERE rowid IN "
+                f"(SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ?)",
+                (text,),
+            )
+        ]
+
+    try:
+        conn.execute('CREATE TABLE giocatori (Nome TEXT, "Sq." TEXT)')
+        conn.execute("INSERT INTO giocatori VALUES ('Lautaro Martínez', 'INT')")
+        conn.commit()
+        ensure_legacy_schema(conn)
+        if not legacy_schema_ready(conn):
+            pytest.skip("SQLite built without FTS5")
+        assert search('"marti"*') == ["Lautaro Martínez"]
+
+        conn.execute("INSERT INTO giocatori VALUES ('Rafael Leão', 'MIL')")
+        conn.execute("UPDATE giocatori SET \"Sq.\" = 'JUV' WHERE Nome LIKE 'Laut%'")
+        conn.commit()
+        assert search('"leao"*') == ["Rafael Leão"]
+        assert search('"juv"*') == ["Lautaro Martínez"] and search('"int"*') == []
+
+        conn.execute("DELETE FROM giocatori WHERE Nome LIKE 'Rafael%'")
+        conn.commit()
+        assert search('"leao"*') == []
+    finally:
+        conn.close()
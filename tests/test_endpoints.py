@@ -1,3 +1,6 @@
+import gzip
+import html
+import re
 import sqlite3
 
 import pytest
@@ -73,3 +76,217 @@ def test_update_player_json_and_assign_form(client):
     assert r.status_code in (200, 302)
 
     conn.close()
+
+
+def test_legacy_market_pages_revalidate_with_etag(tmp_path):
+    db_path = str(tmp_path / "etag.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE giocatori ("R." TEXT, "Nome" TEXT, squadra TEXT)')
+    conn.execute("INSERT INTO giocatori VALUES ('A', 'Lautaro', NULL)")
+    conn.commit()
+    app = create_app({"DB_PATH": db_path, "TESTING": True, "AUTH_ENABLED": False})
+    with app.test_client() as client:
+        r = client.get("/legacy/market/players_table?q=Lau")
+        etag = r.headers.get("ETag")
+        if etag is None:
+            pytest.skip("ORM backend is not sqlite; pages are not revalidated")
+        assert r.status_code == 200 and b"Lautaro" in r.data
+
+        r = client.get(
+            "/legacy/market/players_table?q=Lau", headers={"If-None-Match": etag}
+        )
+        assert r.status_code == 304 and r.data == b""
+
+        # a different query gets its own tag
+        r = client.get(
+            "/legacy/market/players_table?q=La", headers={"If-None-Match": etag}
+        )
+        assert r.status_code == 200
+
+        # a write from another connection invalidates the tag
+        conn.execute("UPDATE giocatori SET squadra = 'FC Dude'")
+        conn.commit()
+        r = client.get(
+            "/legacy/market/players_table?q=Lau", headers={"If-None-Match": etag}
+        )
+        assert r.status_code == 200
+    conn.close()
+
+
+def test_legacy_market_index_with_few_results_builds_suggestions(tmp_path):
+    db_path = str(tmp_path / "suggest.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE giocatori ("R." TEXT, "Nome" TEXT, squadra TEXT)')
+    conn.executemany(
+        "INSERT INTO giocatori VALUES (?, ?, NULL)",
+        [("A", "Lautaro"), ("A", "Laurienté"), ("C", "Lazaro")],
+    )
+    conn.commit()
+    conn.close()
+    app = create_app({"DB_PATH": db_path, "TESTING": True, "AUTH_ENABLED": False})
+    with app.test_client() as client:
+        # fewer than 5 matches triggers the "Forse intendevi" suggestions path
+        r = client.get("/legacy/market/?q=Lau")
+        assert r.status_code == 200
+        assert b"Lautaro" in r.data
+
+
+def test_legacy_market_keyset_pages_cover_every_row_once(tmp_path):
+    db_path = str(tmp_path / "pages.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE giocatori ("R." TEXT, "Nome" TEXT, "Costo" TEXT)')
+    # duplicate names and costs (and NULL costs) exercise the tiebreakers
+    conn.executemany(
+        "INSERT INTO giocatori VALUES (?, ?, ?)",
+        [
+            ("A", f"Rossi {i % 7}", None if i % 5 == 0 else str(i % 9))
+            for i in range(120)
+        ],
+    )
+    conn.commit()
+    conn.close()
+    app = create_app({"DB_PATH": db_path, "TESTING": True, "AUTH_ENABLED": False})
+    with app.test_client() as client:
+        url = "/legacy/market/players_table?q=Rossi&sort_by=costo&sort_dir=desc"
+        seen = []
+        while url:
+            r = client.get(url)
+            assert r.status_code == 200
+            text = r.get_data(as_text=True)
+            seen += re.findall(r'data-id="(\d+)"', text)
+            m = re.search(r'class="page-link" href="([^"]*)">Successivi', text)
+            url = (
+                "/legacy/market/players_table" + html.unescape(m.group(1))
+                if m
+                else None
+            )
+        assert len(seen) == 120 and len(set(seen)) == 120
+        assert "Pagina 3 di 3" in text
+
+
+def test_legacy_assign_returns_team_cash_json_when_asked(tmp_path):
+    db_path = str(tmp_path / "assign.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        'CREATE TABLE giocatori ("R." TEXT, "Nome" TEXT, squadra TEXT, '
+        '"FantaSquadra" TEXT, "Costo" TEXT, anni_contratto INTEGER, opzione TEXT)'
+    )
+    conn.execute("INSERT INTO giocatori(\"R.\", \"Nome\") VALUES ('A', 'Lautaro')")
+    conn.commit()
+    conn.close()
+    app = create_app({"DB_PATH": db_path, "TESTING": True, "AUTH_ENABLED": False})
+    form = {"id": "1", "squadra": "FC Dude", "costo": "30", "anni_contratto": "2"}
+    with app.test_client() as client:
+        r = client.post(
+            "/legacy/market/assegna_giocatore?q=lau",
+            data=form,
+            headers={"Accept": "application/json"},
+        )
+        assert r.status_code == 200
+        # same payload as /api/team_cash (ORM or sqlite figures, whichever
+        # backend the summaries come from), plus the players table fragment
+        # for the search in the query string
+        data = r.get_json()
+        assert set(data) == {"team_casse", "team_casse_missing", "players_html"}
+        assert "FC Dude" in {t["squadra"] for t in data["team_casse"]}
+        table = client.get("/legacy/market/players_table?q=lau").get_data(True)
+        assert data["players_html"] == table and "Lautaro" in table
+
+        # plain form posts still redirect
+        r = client.post("/legacy/market/assegna_giocatore", data=form)
+        assert r.status_code == 302
+
+
+def test_legacy_rose_page_is_rendered_once_per_data_version(tmp_path):
+    db_path = str(tmp_path / "rose.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        'CREATE TABLE giocatori ("R." TEXT, "Nome" TEXT, "Sq." TEXT, squadra TEXT, '
+        '"FantaSquadra" TEXT, "Costo" TEXT, anni_contratto INTEGER, opzione TEXT)'
+    )
+    conn.execute(
+        'INSERT INTO giocatori("R.", "Nome", "FantaSquadra", "Costo")'
+        " VALUES ('A', 'Lautaro', 'FC Dude', '30')"
+    )
+    conn.commit()
+    app = create_app({"DB_PATH": db_path, "TESTING": True, "AUTH_ENABLED": False})
+    with app.test_client() as client:
+        first = client.get("/legacy/market/rose")
+        if first.headers.get("ETag") is None:
+            pytest.skip("ORM backend is not sqlite; pages are not cached")
+        rendered = app.extensions["rendered_partials"]
+        pages = [k for k in rendered if k[0] == "rose.html"]
+        assert len(pages) == 1 and b"Lautaro" in first.data
+
+        # another visitor gets the stored page
+        assert client.get("/legacy/market/rose").data == first.data
+        assert [k for k in rendered if k[0] == "rose.html"] == pages
+
+        # a write from another connection renders a fresh page
+        conn.execute("UPDATE giocatori SET \"Nome\" = 'Lautaro M.'")
+        conn.commit()
+        assert b"Lautaro M." in client.get("/legacy/market/rose").data
+    conn.close()
+
+
+def test_text_responses_are_gzipped_when_accepted(tmp_path, monkeypatch):
+    app = create_app(
+        {"DB_PATH": str(tmp_path / "g.db"), "TESTING": True, "AUTH_ENABLED": False}
+    )
+    with app.test_client() as client:
+        plain = client.get("/static/js/main.js")
+        # caches must key on Accept-Encoding for the identity variant too
+        assert "Accept-Encoding" in plain.headers["Vary"]
+        r = client.get("/static/js/main.js", headers={"Accept-Encoding": "gzip"})
+        assert r.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in r.headers["Vary"]
+        assert gzip.decompress(r.data) == plain.data
+        assert r.get_etag() == (plain.get_etag()[0], True)
+        plain.close()
+        r.close()
+
+        # the static file is compressed once, later requests reuse the bytes
+        def no_compress(*args, **kwargs):
+            raise AssertionError("static file compressed again")
+
+        monkeypatch.setattr(gzip, "compress", no_compress)
+        again = client.get("/static/js/main.js", headers={"Accept-Encoding": "gzip"})
+        assert again.data == r.data
+        again.close()
+        monkeypatch.undo()
+
+        # tiny bodies go out as they are
+        r = client.get(
+            "/legacy/market/api/team_cash", headers={"Accept-Encoding": "gzip"}
+        )
+        assert r.status_code == 200 and "Content-Encoding" not in r.headers
+
+
+def test_legacy_search_follows_a_reimport(tmp_path):
+    import pandas as pd
+
+    db_path = str(tmp_path / "reimport.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE giocatori ("R." TEXT, "Nome" TEXT, "Costo" TEXT)')
+    conn.execute("INSERT INTO giocatori VALUES ('A', 'Alpha', '10')")
+    conn.commit()
+    conn.close()
+    app = create_app({"DB_PATH": db_path, "TESTING": True, "AUTH_ENABLED": False})
+
+    def names(client, q):
+        r = client.get(f"/legacy/market/players_table?q={q}")
+        assert r.status_code == 200
+        return re.findall(r'data-name="([^"]*)"', r.get_data(True))
+
+    with app.test_client() as client:
+        assert names(client, "Alpha") == ["Alpha"]
+
+        # what importa_giocatori.py does: replace the table from a DataFrame,
+        # dropping its triggers and indexes while the server keeps running
+        df = pd.DataFrame({"R.": ["A"], "Nome": ["Zulu"], "Costo": ["5"]})
+        other = sqlite3.connect(db_path)
+        df.to_sql("giocatori", other, if_exists="replace", index=False)
+        other.close()
+
+        assert names(client, "Alpha") == []
+        assert names(client, "Zulu") == ["Zulu"]
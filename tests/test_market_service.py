@@ -133,3 +133,28 @@ def test_unassign_refunds():
         assert att == 300.0
     finally:
         conn.close()
+
+
+def test_assign_player_on_table_without_contract_columns():
+    svc = MarketService()
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("CREATE TABLE giocatori (Nome TEXT, Costo REAL, squadra TEXT)")
+        pid = conn.execute("INSERT INTO giocatori(Nome) VALUES ('Mario')").lastrowid
+        conn.commit()
+
+        statements = []
+        conn.set_trace_callback(statements.append)
+        res = svc.assign_player(conn, pid, "TeamA", 10, 2, "SI")
+        conn.set_trace_callback(None)
+        assert res.get("success") is True
+        row = conn.execute("SELECT squadra, Costo FROM giocatori").fetchone()
+        assert tuple(row) == ("TeamA", 10.0)
+        # the UPDATE only names existing columns: no failed prepare and retry
+        updates = [s for s in statements if s.startswith("UPDATE giocatori")]
+        assert updates == [
+            f'UPDATE giocatori SET "squadra"=\'TeamA\', "Costo"=10.0 WHERE rowid={pid}'
+        ]
+    finally:
+        conn.close()
@@ -1,6 +1,7 @@
 import sqlite3
 
-from app.services.market_service import MarketService
+from app.db import ensure_legacy_schema, get_connection
+from app.services.market_service import MarketService, _team_summary_sql
 
 
 def setup_schema(conn: sqlite3.Connection):
@@ -109,3 +110,212 @@ def test_get_team_summaries_and_roster():
         assert total_spent >= 0
     finally:
         conn.close()
+
+
+def test_get_all_team_cash_single_query():
+    svc = MarketService()
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    try:
+        setup_schema(conn)
+        cur = conn.cursor()
+        cur.executemany(
+            "INSERT INTO fantateam(squadra, carryover, cassa_iniziale, cassa_attuale) VALUES (?,?,?,?)",
+            [("TeamA", 0, 310.0, 250.0), ("TeamB", 0, None, None)],
+        )
+        conn.commit()
+
+        cash = svc.get_all_team_cash(conn)
+        assert cash["TeamA"] == (310.0, 250.0)
+        # missing values default like get_team_cash does
+        assert cash["TeamB"] == (300.0, 300.0)
+        assert "TeamC" not in cash
+        assert cash["TeamA"] == svc.get_team_cash(conn, "TeamA")
+    finally:
+        conn.close()
+
+
+def test_failed_move_rolls_back_refund():
+    svc = MarketService()
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    try:
+        setup_schema(conn)
+        cur = conn.cursor()
+        cur.execute(
+            'INSERT INTO giocatori(Nome, squadra, "R.", "Costo", FantaSquadra) VALUES (?,?,?,?,?)',
+            ("P1", "TeamA", "P", 10.0, "TeamA"),
+        )
+        cur.execute(
+            "INSERT INTO fantateam(squadra, carryover, cassa_iniziale, cassa_attuale) VALUES (?,?,?,?)",
+            ("TeamA", 0, 300.0, 290.0),
+        )
+        conn.commit()
+
+        # moving to TeamB at a price TeamB cannot afford must not refund TeamA
+        res = svc.assign_player(conn, "1", "TeamB", "400", "1", "NO")
+        assert res["success"] is False and res["available"] == 300.0
+        assert not conn.in_transaction
+        assert svc.get_all_team_cash(conn) == {"TeamA": (300.0, 290.0)}
+        row = conn.execute("SELECT FantaSquadra FROM giocatori").fetchone()
+        assert row[0] == "TeamA"
+    finally:
+        conn.close()
+
+
+def test_update_team_cash_upserts_in_place():
+    svc = MarketService()
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    try:
+        setup_schema(conn)
+        conn.execute(
+            "INSERT INTO fantateam(squadra, carryover, cassa_iniziale, cassa_attuale) VALUES (?,?,?,?)",
+            ("TeamA", 12.0, 312.0, 312.0),
+        )
+        rowid = conn.execute("SELECT rowid FROM fantateam").fetchone()[0]
+
+        svc.update_team_cash(conn, "TeamA", 250.0)
+        svc.update_team_cash(conn, "TeamB", 280.0)
+
+        rows = {
+            r[0]: tuple(r)[1:]
+            for r in conn.execute(
+                "SELECT squadra, rowid, carryover, cassa_iniziale, cassa_attuale FROM fantateam"
+            )
+        }
+        # same row, carryover and starting cash kept
+        assert rows["TeamA"] == (rowid, 12.0, 312.0, 250.0)
+        assert rows["TeamB"][1:] == (0.0, 280.0, 280.0)
+    finally:
+        conn.close()
+
+
+def test_team_summaries_use_the_partial_roster_index(tmp_path):
+    svc = MarketService()
+    conn = get_connection(str(tmp_path / "g.db"))
+    try:
+        setup_schema(conn)
+        conn.executemany(
+            'INSERT INTO giocatori(Nome, "R.", "Costo", anni_contratto, opzione,'
+            " FantaSquadra) VALUES (?,?,?,?,?,?)",
+            [
+                ("P1", "p", "10", 1, "SI", "TeamA"),
+                ("D1", "D", "20", None, None, "TeamA"),
+                # option without a contract: not on the roster
+                ("A1", "A", "99", None, "SI", "TeamA"),
+            ],
+        )
+        conn.commit()
+        ensure_legacy_schema(conn)
+
+        sql = _team_summary_sql("FantaSquadra", 'COALESCE("costo_num", 0)', 1)
+        plan = " ".join(
+            r[-1] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, ("x",))
+        )
+        assert "COVERING INDEX ix_giocatori_rosa" in plan
+
+        rose = {"Portieri": 1, "Difensori": 1, "Centrocampisti": 1, "Attaccanti": 1}
+        (team,) = svc.get_team_summaries(conn, ["TeamA"], rose)
+        assert team["spent"] == 30.0
+        assert (team["missing_portieri"], team["missing_dif"]) == (0, 0)
+        assert (team["missing_cen"], team["missing_att"]) == (1, 1)
+    finally:
+        conn.close()
+
+
+def test_get_team_roster_reads_players_and_cash_in_one_statement():
+    svc = MarketService()
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    try:
+        setup_schema(conn)
+        conn.executemany(
+            'INSERT INTO giocatori(Nome, "R.", "Costo", anni_contratto, opzione,'
+            " FantaSquadra) VALUES (?,?,?,?,?,?)",
+            [
+                ("P1", "G", 10, 1, None, "TeamA"),
+                ("A1", "A", 99, None, "SI", "TeamA"),
+            ],
+        )
+        conn.execute(
+            "INSERT INTO fantateam(squadra, cassa_iniziale) VALUES ('TeamA', 250)"
+        )
+        conn.commit()
+        rose = {"Portieri": 1, "Difensori": 1, "Centrocampisti": 1, "Attaccanti": 1}
+
+        statements = []
+        conn.set_trace_callback(statements.append)
+        roster, starting, spent, cassa = svc.get_team_roster(conn, "TeamA", rose)
+        conn.set_trace_callback(None)
+        # the schema probe aside (cached per connection), one round trip
+        assert len([s for s in statements if not s.startswith("PRAGMA")]) == 1
+        assert [p.nome for p in roster["Portieri"]] == ["P1"]
+        assert roster["Attaccanti"] == []
+        assert (starting, spent, cassa) == (250.0, 10.0, 240.0)
+
+        # a team without players still gets its cash row
+        roster, starting, spent, cassa = svc.get_team_roster(conn, "TeamB", rose)
+        assert not any(roster.values())
+        assert (starting, spent, cassa) == (300.0, 0.0, 300.0)
+    finally:
+        conn.close()
+
+
+def test_get_team_rosters_buckets_roles_in_sql():
+    svc = MarketService()
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    try:
+        setup_schema(conn)
+        conn.executemany(
+            'INSERT INTO giocatori(Nome, "R.", "Costo", anni_contratto, opzione,'
+            " FantaSquadra) VALUES (?,?,?,?,?,?)",
+            [
+                ("P1", "g", 10, 1, None, "TeamA"),
+                ("D1", "Dc", 5, None, None, "TeamA"),
+                ("C2", " c", 2, None, None, "TeamA"),
+                ("X1", "?", 1, None, None, "TeamA"),
+                ("A1", "A", 99, None, "SI", "TeamB"),
+                ("C1", "C", 3, None, None, "Other"),
+            ],
+        )
+        conn.commit()
+        rose = {"Portieri": 1, "Difensori": 1, "Centrocampisti": 1, "Attaccanti": 1}
+
+        rosters = svc.get_team_rosters(conn, ["TeamA", "TeamB"], rose)
+        assert list(rosters) == ["TeamA", "TeamB"]
+        team_a = rosters["TeamA"]
+        assert [(p.nome, p.ruolo) for p in team_a["Portieri"]] == [("P1", "P")]
+        assert [(p.nome, p.ruolo) for p in team_a["Difensori"]] == [("D1", "D")]
+        # leading blanks in "R." are skipped, as on the ORM paths
+        assert [(p.nome, p.ruolo) for p in team_a["Centrocampisti"]] == [("C2", "C")]
+        assert team_a["Attaccanti"] == []
+        # an option without a contract is not on the roster
+        assert not any(rosters["TeamB"].values())
+    finally:
+        conn.close()
+
+
+def test_refund_uses_the_counted_cost(tmp_path):
+    svc = MarketService()
+    conn = get_connection(str(tmp_path / "g.db"))
+    try:
+        setup_schema(conn)
+        conn.execute(
+            'INSERT INTO giocatori(Nome, "Costo", squadra, FantaSquadra)'
+            " VALUES ('Mario', '12 €', 'TeamA', 'TeamA')"
+        )
+        conn.execute(
+            "INSERT INTO fantateam(squadra, cassa_iniziale, cassa_attuale)"
+            " VALUES ('TeamA', 300, 288)"
+        )
+        conn.commit()
+        ensure_legacy_schema(conn)
+
+        # the summaries count "12 €" as 12 spent; unassigning gives 12 back
+        res = svc.assign_player(conn, 1, None, None, None, None)
+        assert res.get("success") is True
+        assert svc.get_team_cash(conn, "TeamA") == (300.0, 300.0)
+    finally:
+        conn.close()
@@ -1,5 +1,6 @@
 import sqlite3
 
+from app.db import NAME_TRIGRAM_TABLE, ensure_legacy_schema
 from app.services.market_service import MarketService
 
 
@@ -26,3 +27,30 @@ def test_get_name_suggestions_db_error():
     # Should not raise, should return empty list on db errors
     res = svc.get_name_suggestions(conn, "Ma")
     assert res == []
+
+
+def test_get_name_suggestions_uses_trigram_index():
+    svc = MarketService()
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE giocatori (Nome TEXT)")
+    conn.executemany(
+        "INSERT INTO giocatori (Nome) VALUES (?)",
+        [("Mario Rossi",), ("Rossini",), ("Verdi",)],
+    )
+    conn.commit()
+    ensure_legacy_schema(conn)
+    assert conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (NAME_TRIGRAM_TABLE,)
+    ).fetchone()
+    # rows added afterwards reach the index through its triggers
+    conn.execute("INSERT INTO giocatori (Nome) VALUES ('De Rossi')")
+    conn.commit()
+
+    assert svc.get_name_suggestions(conn, "ross") == [
+        "Rossini",
+        "De Rossi",
+        "Mario Rossi",
+    ]
+    # two letters are too short for a trigram: prefix match
+    assert svc.get_name_suggestions(conn, "ve") == ["Verdi"]
+    conn.close()
@@ -29,3 +29,73 @@ def test_resolve_team_by_alias():
         assert found2 is not None and found2.id == t.id
     finally:
         s.close()
+
+
+def test_populate_team_aliases_matches_by_cash_and_name():
+    import sqlalchemy as sa
+
+    from app.utils.team_utils import populate_team_aliases
+
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    s = Session()
+    try:
+        league = League(slug="test", name="Test League")
+        s.add(league)
+        s.commit()
+        s.add_all(
+            [
+                Team(name="FC Bioparco", cash=120, league_id=league.id),
+                Team(name="Nova Spes", cash=80, league_id=league.id),
+            ]
+        )
+        s.commit()
+        s.execute(
+            sa.text(
+                "CREATE TABLE fantateam (squadra TEXT PRIMARY KEY, carryover REAL,"
+                " cassa_iniziale REAL, cassa_attuale REAL)"
+            )
+        )
+        s.execute(
+            sa.text(
+                "INSERT INTO fantateam VALUES"
+                " ('Bioparco', 0, 300, 120), ('Nova Spes FC', 0, 300, 5)"
+            )
+        )
+        s.commit()
+
+        created = populate_team_aliases(s)
+        by_alias = {a.alias: a.team.name for a in created}
+        assert by_alias == {"Bioparco": "FC Bioparco", "Nova Spes FC": "Nova Spes"}
+
+        # a second run finds the stored aliases and adds nothing
+        assert populate_team_aliases(s) == []
+        assert s.query(TeamAlias).count() == 2
+    finally:
+        s.close()
+
+
+def test_resolve_teams_by_alias_batches_names_and_aliases():
+    from app.utils.team_utils import resolve_team_by_alias, resolve_teams_by_alias
+
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    s = Session()
+    try:
+        s.add_all([Team(name="FC Bioparco", cash=120), Team(name="Nova Spes")])
+        s.commit()
+        s.add(TeamAlias(team_id=2, alias="Nova"))
+        s.commit()
+
+        names = ["FC Bioparco", "Nova", "Good Old Boys"]
+        found = resolve_teams_by_alias(s, names)
+        assert {k: t.name for k, t in found.items()} == {
+            "FC Bioparco": "FC Bioparco",
+            "Nova": "Nova Spes",
+        }
+        for name in names:
+            assert found.get(name) is resolve_team_by_alias(s, name)
+    finally:
+        s.close()